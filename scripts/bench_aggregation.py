@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# scripts/bench_aggregation.py - 日汇总聚合后端基准
+"""
+日汇总聚合后端基准
+
+随机生成一年跨度的任务（含跨午夜、仅日期、无结束时间、睡眠/娱乐任务），
+分别用纯 Python 和 NumPy 列式后端构建按天汇总，比较耗时并校验两者的统计结果完全一致。
+不使用本地存储，每次都是全量重建。
+
+用法:
+    python scripts/bench_aggregation.py                       # 默认 1万、10万 任务
+    python scripts/bench_aggregation.py --tasks 100000 200000 --runs 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from src.columnar import numpy_available  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.rollup import combine_rollups, trend_stats  # noqa: E402
+from src.summarizer import TaskSummarizer  # noqa: E402
+
+CATEGORIES = ["Work", "Study", "Life", "Health", "Entertainment"]
+TITLES = ["写代码", "开会", "阅读", "睡觉", "刷视频", "看剧", "健身"]
+
+
+def make_tasks(count: int, timezone: str, seed: int = 42) -> List[Dict]:
+    import pytz
+
+    rnd = random.Random(seed)
+    tz = pytz.timezone(timezone)
+    base = datetime(2025, 1, 1)
+    tasks = []
+    for index in range(count):
+        start = base + timedelta(minutes=rnd.randrange(365 * 24 * 60))
+        kind = rnd.random()
+        if kind < 0.05:
+            start_iso, end_iso = start.date().isoformat(), None
+        else:
+            start_iso = tz.localize(start).isoformat()
+            minutes = rnd.choice([15, 25, 50, 90, 120, 480])
+            end_iso = None if kind < 0.1 else tz.localize(start + timedelta(minutes=minutes)).isoformat()
+        tasks.append({
+            "id": str(index),
+            "last_edited_time": "2025-12-31T00:00:00.000Z",
+            "properties": {
+                "任务名称": {"title": [{"plain_text": rnd.choice(TITLES)}]},
+                "分类": {"select": {"name": rnd.choice(CATEGORIES)}},
+                "优先级": {"select": {"name": rnd.choice(["MIT", "次要", "随缘"])}},
+                "计划日期": {"date": {"start": start_iso, "end": end_iso}},
+                "XP": {"formula": {"number": rnd.choice([0, 1, 5, 10])}},
+                "番茄数": {"formula": {"number": rnd.choice([0, 1, 2, 4])}},
+                "实际用时(min)": {"formula": {"number": rnd.choice([0, 25, 50, 100])}},
+            },
+        })
+    return tasks
+
+
+def measure(backend: str, tasks: List[Dict], timezone: str, runs: int):
+    summarizer = TaskSummarizer(config=Config(notion_token="", notion_db_id="", timezone=timezone,
+                                              aggregation_backend=backend))
+    records = summarizer.parse_tasks(tasks)
+    timings = []
+    rollups = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        rollups = summarizer.get_daily_rollups(tasks, records)
+        timings.append(time.perf_counter() - started)
+    rows = [row for day_rows in rollups.values() for row in day_rows]
+    stats = (combine_rollups(rows, summarizer.tz), trend_stats(rows))
+    return statistics.median(timings), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日汇总聚合后端基准")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10000, 100000], help="任务数量（可多个）")
+    parser.add_argument("--runs", type=int, default=3, help="每个规模重复次数，取中位数")
+    parser.add_argument("--timezone", default="America/Toronto")
+    args = parser.parse_args()
+
+    if not numpy_available():
+        print("❌ 未安装 numpy，无法比较列式后端（pip install numpy）")
+        sys.exit(1)
+
+    failed = False
+    print(f"{'任务数':>10} {'Python':>10} {'NumPy':>10} {'加速比':>8}  结果")
+    for count in args.tasks:
+        tasks = make_tasks(count, args.timezone)
+        python_seconds, python_stats = measure("python", tasks, args.timezone, args.runs)
+        numpy_seconds, numpy_stats = measure("numpy", tasks, args.timezone, args.runs)
+        same = python_stats == numpy_stats
+        failed = failed or not same
+        print(f"{count:>10} {python_seconds:>9.3f}s {numpy_seconds:>9.3f}s "
+              f"{python_seconds / numpy_seconds:>7.1f}x  {'✅ 一致' if same else '❌ 不一致'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# scripts/bench_parallel.py - 多进程解析基准
+"""
+多进程解析基准
+
+用与 bench_aggregation.py 相同的随机任务（一年跨度，含跨午夜、仅日期、无结束时间的任务），
+按不同的 PARSE_WORKERS 计算完整的周期统计（解析 + 按天汇总 + 合并），
+比较耗时并校验结果与单进程完全一致。进程池在计时前先预热一次，不计入启动开销。
+
+用法:
+    python scripts/bench_parallel.py                          # 默认 10万 任务，1/2/4/8 个进程
+    python scripts/bench_parallel.py --tasks 200000 --workers 1 4 8 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_aggregation import make_tasks  # noqa: E402
+from src import parallel  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.summarizer import TaskSummarizer  # noqa: E402
+
+
+def measure(workers: int, tasks, timezone: str, runs: int):
+    # 只比较纯 Python 聚合与进程池，避免装有 numpy 时走列式后端
+    summarizer = TaskSummarizer(config=Config(notion_token="", notion_db_id="", timezone=timezone,
+                                              aggregation_backend="python", parse_workers=workers))
+    stats = summarizer.get_detailed_stats(tasks, "monthly")  # 预热：启动进程池
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        stats = summarizer.get_detailed_stats(tasks, "monthly")
+        timings.append(time.perf_counter() - started)
+    if summarizer._parallel is not None:
+        summarizer._parallel.close()
+    return statistics.median(timings), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程解析基准")
+    parser.add_argument("--tasks", type=int, default=100000, help="任务数量")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="进程数（可多个）")
+    parser.add_argument("--runs", type=int, default=3, help="每种进程数重复次数，取中位数")
+    parser.add_argument("--timezone", default="America/Toronto")
+    args = parser.parse_args()
+
+    parallel.PARALLEL_MIN_TASKS = min(parallel.PARALLEL_MIN_TASKS, args.tasks)
+    tasks = make_tasks(args.tasks, args.timezone)
+    print(f"任务数 {args.tasks}，CPU 核数 {os.cpu_count()}")
+    print(f"{'进程数':>6} {'耗时':>10} {'吞吐(任务/s)':>14} {'加速比':>8}  结果")
+
+    failed = False
+    baseline = expected = None
+    for workers in args.workers:
+        seconds, stats = measure(workers, tasks, args.timezone, args.runs)
+        if baseline is None:
+            baseline, expected = seconds, stats
+        same = stats == expected
+        failed = failed or not same
+        print(f"{workers:>6} {seconds:>9.3f}s {args.tasks / seconds:>14,.0f} {baseline / seconds:>7.2f}x  "
+              f"{'✅ 一致' if same else '❌ 不一致'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
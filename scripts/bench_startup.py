@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# scripts/bench_startup.py - 冷启动导入耗时基准
+"""
+CLI 入口冷启动耗时基准
+
+使用 `python -X importtime` 测量 `python -m src.main` 在真正开始工作之前的
+模块导入开销（src.main 的累计导入耗时），并与预算比较。
+每次 cron 触发都是一个全新的进程，这部分时间每次都要付出。
+
+用法:
+    python scripts/bench_startup.py                 # 默认预算 50ms，运行 5 次取中位数
+    python scripts/bench_startup.py --budget-ms 80 --runs 10 --top 15
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 这些依赖必须按需导入，出现在启动阶段即视为回归
+EAGER_FORBIDDEN = ["openai", "requests", "smtplib", "email.mime", "pytz", "dotenv"]
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_once() -> Tuple[int, float, Dict[str, Tuple[int, int]]]:
+    """冷启动一次，返回 src.main 累计导入耗时(us)、`-m src.main --help` 墙钟耗时(ms)及各模块耗时"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"src.main 导入失败:\n{proc.stderr}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+
+    # 墙钟时间包含解释器启动本身，仅作参考
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "src.main", "--help"],
+                   cwd=ROOT, capture_output=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    return modules["src.main"][1], wall_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 冷启动导入耗时基准")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_BUDGET_MS", "50")),
+                        help="导入耗时预算（毫秒，中位数）")
+    parser.add_argument("--runs", type=int, default=5, help="重复运行次数")
+    parser.add_argument("--top", type=int, default=10, help="显示自身耗时最高的模块数")
+    args = parser.parse_args()
+
+    totals: List[int] = []
+    walls: List[float] = []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        total_us, wall_ms, modules = measure_once()
+        totals.append(total_us)
+        walls.append(wall_ms)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"🚀 src.main 导入耗时: 中位数 {median_ms:.1f}ms "
+          f"(最小 {min(totals) / 1000:.1f}ms, 最大 {max(totals) / 1000:.1f}ms, {args.runs} 次)")
+    print(f"⏱️  python -m src.main --help 墙钟耗时: 中位数 {statistics.median(walls):.1f}ms（含解释器启动）")
+
+    print(f"\n自身耗时 Top {args.top}:")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"  {self_us / 1000:7.2f}ms  (累计 {cumulative_us / 1000:7.2f}ms)  {name}")
+
+    eager = sorted(name for name in modules
+                   if any(name == dep or name.startswith(dep + ".") for dep in EAGER_FORBIDDEN))
+    failed = False
+    if eager:
+        print(f"\n❌ 启动阶段导入了应按需加载的依赖: {', '.join(eager)}")
+        failed = True
+
+    if median_ms > args.budget_ms:
+        print(f"\n❌ 超出预算: {median_ms:.1f}ms > {args.budget_ms:.1f}ms")
+        failed = True
+    else:
+        print(f"\n✅ 预算内: {median_ms:.1f}ms <= {args.budget_ms:.1f}ms")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# src/backfill.py - 历史报告并行回填
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+from .utils import setup_logger, iter_period_windows
+from .llm_client import LLM_FAILURE_PREFIX
+from .profiling import get_profiler, span
+
+logger = setup_logger(__name__)
+
+# 单次 Notion 查询覆盖的最大天数，保证分片可以并行拉取
+FETCH_CHUNK_DAYS = 31
+
+
+def parse_backfill_range(value: str) -> Tuple[date, date]:
+    """解析 --backfill 参数，格式为 START..END（如 2025-01-01..2025-12-31）"""
+    try:
+        start_str, end_str = value.split("..", 1)
+        start, end = date.fromisoformat(start_str.strip()), date.fromisoformat(end_str.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的回填区间: {value}（格式: YYYY-MM-DD..YYYY-MM-DD）")
+    if start > end:
+        raise argparse.ArgumentTypeError(f"回填区间开始日期 {start} 晚于结束日期 {end}")
+    return start, end
+
+
+def window_label(period: str, start: date, end: date) -> str:
+    """报告窗口的文件名标签"""
+    if period == "monthly":
+        return start.strftime("%Y-%m")
+    if period == "weekly":
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    # daily / three-days / trend 以窗口最后一天命名
+    return end.isoformat()
+
+
+def fetch_range_tasks(notion, start: date, end: date, workers: int = 4) -> List[Dict]:
+    """将长区间切成若干分片，用有界线程池并行查询 Notion"""
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=FETCH_CHUNK_DAYS - 1), end)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+
+    logger.info(f"📥 分 {len(chunks)} 片拉取 {start} 到 {end} 的任务（并发 {workers}）")
+    profiler = get_profiler()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(profiler.bind(lambda chunk: notion._query_tasks(*chunk)), chunks)
+        tasks = [task for chunk_tasks in results for task in chunk_tasks]
+
+    # 分片边界不重叠，但仍按 id 去重以防 Notion 侧日期被编辑
+    seen = set()
+    unique = []
+    for task in tasks:
+        task_id = task.get("id")
+        if task_id is not None and task_id in seen:
+            continue
+        seen.add(task_id)
+        unique.append(task)
+    return unique
+
+
+def run_backfill(notion, summarizer, llm, period: str, start: date, end: date,
+                 output_dir: str = "backfill", workers: int = 4,
+                 fetch_workers: int = 4, trend_days: int = 7) -> Dict[str, str]:
+    """回填 [start, end] 内的历史报告，返回 {标签: 状态}
+
+    已存在的报告文件会被跳过，因此中断后重跑只会补齐缺失的部分；
+    LLM 调用失败的窗口不写文件，下次重跑时重试。
+    """
+    from .main import run_report
+
+    windows = iter_period_windows(period, start, end, trend_days)
+    period_dir = os.path.join(output_dir, period)
+    os.makedirs(period_dir, exist_ok=True)
+
+    pending = []
+    results: Dict[str, str] = {}
+    for window in windows:
+        label = window_label(period, *window)
+        path = os.path.join(period_dir, f"{label}.md")
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            results[label] = "skipped"
+        else:
+            pending.append((label, window, path))
+
+    logger.info(f"🗂️ 回填 {period}: 共 {len(windows)} 个窗口，待生成 {len(pending)} 个 → {period_dir}")
+    if not pending:
+        return results
+
+    fetch_start = min(window[0] for _, window, _ in pending)
+    fetch_end = max(window[1] for _, window, _ in pending)
+    with span("fetch", start=fetch_start.isoformat(), end=fetch_end.isoformat()):
+        tasks = fetch_range_tasks(notion, fetch_start, fetch_end, fetch_workers)
+    with span("slice", tasks=len(tasks)):
+        tasks_by_date = summarizer.group_tasks_by_date(tasks)
+
+    def generate(label: str, window: Tuple[date, date], path: str) -> str:
+        window_tasks = []
+        day = window[0]
+        while day <= window[1]:
+            window_tasks.extend(tasks_by_date.get(day, []))
+            day += timedelta(days=1)
+
+        answer = run_report(notion, summarizer, llm, period, tasks=window_tasks, window=window,
+                            trend_days=trend_days)
+        if answer.startswith(LLM_FAILURE_PREFIX):
+            logger.error(f"❌ {label}: {answer}")
+            return "failed"
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(answer)
+        logger.info(f"✅ {label}: {len(window_tasks)} 个任务 → {path}")
+        return "written"
+
+    profiler = get_profiler()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {label: pool.submit(profiler.bind(generate), label, window, path)
+                   for label, window, path in pending}
+        for label, future in futures.items():
+            try:
+                results[label] = future.result()
+            except Exception as e:
+                logger.error(f"❌ {label} 生成失败: {e}")
+                results[label] = "failed"
+
+    return dict(sorted(results.items()))
@@ -0,0 +1,70 @@
+# src/buckets.py - 时间分桶：日历周期窗口与多个报告共用的自定义窗口
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+BucketKey = Tuple[str, date]  # (窗口名, 窗口的开始日期)
+
+
+def bucket_window(granularity: str, day: date) -> Tuple[date, date]:
+    """day 所在的日历桶（闭区间）：当天 / 周一至周日 / 自然月"""
+    if granularity == "daily":
+        return day, day
+    if granularity == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if granularity == "monthly":
+        start = day.replace(day=1)
+        next_month = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError(f"不支持的周期: {granularity}")
+
+
+def local_midnight(tz, day: date) -> datetime:
+    """某个本地日期的开始时刻
+
+    夏令时切换恰好发生在 0 点时：0 点不存在（时钟跳过）取切换时刻，
+    0 点出现两次（时钟回拨）取第一次，保证相邻两天的边界首尾相接、不重不漏。
+    """
+    from pytz.exceptions import AmbiguousTimeError, NonExistentTimeError
+
+    naive = datetime.combine(day, time())
+    try:
+        return tz.localize(naive, is_dst=None)
+    except AmbiguousTimeError:
+        return tz.localize(naive, is_dst=True)
+    except NonExistentTimeError:
+        return tz.localize(naive, is_dst=False)
+
+
+class Bucketer:
+    """预先计算 [start, end] 内每个本地日的边界和包含它的报告窗口
+
+    - bounds：第 i 个本地日的开始时刻（UTC 秒，夏令时切换日长 23 或 25 小时）
+    - keys：本地日期 → 包含它的全部窗口，O(1)
+    """
+
+    def __init__(self, tz, start: date, end: date, windows: Dict[str, Tuple[date, date]]):
+        if start > end:
+            raise ValueError(f"开始日期 {start} 晚于结束日期 {end}")
+        self.tz = tz
+        self.start = start
+        self.days = (end - start).days + 1
+        # 末尾多一个 end 次日的 0 点
+        self.bounds = [local_midnight(tz, start + timedelta(days=i)).timestamp() for i in range(self.days + 1)]
+
+        self.windows: Dict[BucketKey, Tuple[date, date]] = {}
+        self._keys: List[Tuple[BucketKey, ...]] = [() for _ in range(self.days)]
+        for name, (window_start, window_end) in windows.items():
+            key = (name, window_start)
+            self.windows[key] = (window_start, window_end)
+            first = max((window_start - start).days, 0)
+            last = min((window_end - start).days, self.days - 1)
+            for i in range(first, last + 1):
+                self._keys[i] += (key,)
+
+    def keys(self, day: Optional[date]) -> Tuple[BucketKey, ...]:
+        """本地日期所属的全部窗口（范围之外或没有日期时为空）"""
+        if day is None:
+            return ()
+        index = (day - self.start).days
+        return self._keys[index] if 0 <= index < self.days else ()
@@ -0,0 +1,215 @@
+# src/checkpoint.py - 可续跑的分阶段检查点
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 流水线阶段（按执行顺序）及其落盘文件
+STAGES = ["tasks", "stats", "prompt", "answer", "delivery"]
+STAGE_FILES = {
+    "tasks": "tasks.json",
+    "stats": "stats.json",
+    "prompt": "prompt.txt",
+    "answer": "answer.md",
+    "delivery": "delivery.json",
+}
+# 上次查询到的任务集合指纹（不属于流水线阶段，用于判断窗口内的数据是否变化）
+FINGERPRINT_FILE = "fingerprint.txt"
+
+
+class TasksDigest:
+    """窗口内任务集合的指纹，可逐个加入（流式查询时无需保留任务列表）
+
+    每个任务的键为页面 id + last_edited_time（没有编辑时间时退化为内容哈希），
+    各键哈希按 2^160 取模相加，结果与任务的先后顺序无关。
+    """
+
+    def __init__(self):
+        self._sum = 0
+
+    def add(self, task: Dict) -> None:
+        edited = task.get("last_edited_time")
+        if edited:
+            key = f"{task.get('id')}@{edited}"
+        else:
+            key = json.dumps(task, sort_keys=True, ensure_ascii=False, default=str)
+        self._sum = (self._sum + int(hashlib.sha1(key.encode()).hexdigest(), 16)) % (1 << 160)
+
+    def hexdigest(self) -> str:
+        return f"{self._sum:040x}"
+
+
+def tasks_fingerprint(tasks: List[Dict]) -> str:
+    """窗口内任务集合的指纹：任务增删或任一任务被编辑都会改变指纹"""
+    digest = TasksDigest()
+    for task in tasks:
+        digest.add(task)
+    return digest.hexdigest()
+
+
+class RunCheckpoint:
+    """一次报告运行的检查点目录：<run_dir>/<period>/<窗口>/
+
+    每个阶段完成后把输出写入对应文件；重跑时已存在的阶段直接读取，
+    从第一个未完成的阶段继续。root 为空时不落盘（等价于关闭检查点）。
+    """
+
+    def __init__(self, root: Optional[str], period: str,
+                 window: Optional[Tuple[date, date]] = None):
+        self.period = period
+        self.window = window
+        self.directory = None
+        # 上一次完整成功运行的 {fingerprint, answer, delivery}，数据未变化时直接沿用
+        self.previous: Optional[Dict] = None
+        # 由外部预先算好的阶段结果（如多报告共用一次遍历得到的统计），首次取用时视同计算完成
+        self._primed: Dict[str, Any] = {}
+        self._unsaved: set = set()
+        if root and window:
+            start, end = window
+            label = start.isoformat() if start == end else f"{start.isoformat()}_{end.isoformat()}"
+            self.directory = os.path.join(root, period, label)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.directory, STAGE_FILES[stage])
+
+    def has(self, stage: str) -> bool:
+        return self.enabled and os.path.exists(self._path(stage))
+
+    def load(self, stage: str) -> Any:
+        with open(self._path(stage), "r", encoding="utf-8") as f:
+            if STAGE_FILES[stage].endswith(".json"):
+                return json.load(f)
+            return f.read()
+
+    def save(self, stage: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(stage)
+        # 先写临时文件再原子替换，进程中途被杀也不会留下半截的检查点
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if STAGE_FILES[stage].endswith(".json"):
+                json.dump(value, f, ensure_ascii=False, default=str)
+            else:
+                f.write(value)
+        os.replace(tmp_path, path)
+
+    def prime(self, stage: str, value: Any, save: bool = True) -> None:
+        """提供某阶段的结果，该阶段被调用时不再计算（已有检查点时仍以检查点为准）
+
+        save=False 时结果只在本次运行中使用、不写检查点（如流式聚合只保留了前 N 个任务，
+        不能当作完整的任务列表供续跑复用）。
+        """
+        self._primed[stage] = value
+        if not save:
+            self._unsaved.add(stage)
+
+    def load_fingerprint(self) -> Optional[str]:
+        path = os.path.join(self.directory, FINGERPRINT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+
+    def save_fingerprint(self, fingerprint: str) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, FINGERPRINT_FILE), "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+
+    def unchanged(self, fingerprint: str) -> bool:
+        """本次查询到的任务与上一次成功运行完全相同"""
+        return self.previous is not None and self.previous["fingerprint"] == fingerprint
+
+    def restore_previous(self) -> str:
+        """沿用上一次成功运行的答案与推送结果，返回答案"""
+        self.save_fingerprint(self.previous["fingerprint"])
+        self.save("answer", self.previous["answer"])
+        self.save("delivery", self.previous["delivery"])
+        return self.previous["answer"]
+
+    def invalidate(self, from_stage: str) -> None:
+        """删除 from_stage 及其之后所有阶段的输出，强制重算"""
+        if not self.enabled:
+            return
+        for stage in STAGES[STAGES.index(from_stage):]:
+            if os.path.exists(self._path(stage)):
+                os.remove(self._path(stage))
+
+    def first_incomplete(self) -> Optional[str]:
+        """最后一个已完成阶段的下一阶段（无任务时会跳过 stats / prompt）"""
+        done = [stage for stage in STAGES if self.has(stage)]
+        if not done:
+            return STAGES[0]
+        index = STAGES.index(done[-1]) + 1
+        return STAGES[index] if index < len(STAGES) else None
+
+    def is_complete(self) -> bool:
+        """所有阶段都已完成且每个推送渠道都成功"""
+        if not self.has("delivery"):
+            return False
+        return all(self.load("delivery").values())
+
+    def stage(self, name: str, cache_if: Optional[Callable[[Any], bool]] = None):
+        """把一个无参函数包装成带检查点、只计算一次的阶段
+
+        已有检查点时直接读取；否则计算并保存（cache_if 返回 False 的结果不保存，
+        例如 LLM 失败的占位文本，下次重跑会重新调用）。
+        """
+        def decorator(compute: Callable[[], Any]) -> Callable[[], Any]:
+            cache = []
+
+            @wraps(compute)
+            def thunk():
+                if not cache:
+                    if self.has(name):
+                        logger.info(f"♻️ {self.period}: 复用检查点 {name} ← {self.directory}")
+                        cache.append(self.load(name))
+                    else:
+                        value = self._primed.pop(name) if name in self._primed else compute()
+                        if name not in self._unsaved and (cache_if is None or cache_if(value)):
+                            self.save(name, value)
+                        cache.append(value)
+                return cache[0]
+            return thunk
+        return decorator
+
+
+def open_checkpoint(run_dir: Optional[str], period: str, window: Tuple[date, date],
+                    from_stage: Optional[str] = None, force: bool = False) -> RunCheckpoint:
+    """打开某个周期/窗口的检查点
+
+    - 指定 from_stage 时，从该阶段起强制重算
+    - 上一次运行已完整成功时从头开始（续跑只针对中断或失败的运行）；
+      其指纹、答案和推送结果保留在 checkpoint.previous 中，重新查询后数据未变化则直接沿用
+      （force 为 True 时不保留，总是重新生成并推送）
+    """
+    checkpoint = RunCheckpoint(run_dir or None, period, window)
+    if not checkpoint.enabled:
+        return checkpoint
+
+    if from_stage:
+        checkpoint.invalidate(from_stage)
+    elif checkpoint.is_complete():
+        fingerprint = checkpoint.load_fingerprint()
+        if fingerprint and checkpoint.has("answer") and not force:
+            checkpoint.previous = {"fingerprint": fingerprint, "answer": checkpoint.load("answer"),
+                                   "delivery": checkpoint.load("delivery")}
+        shutil.rmtree(checkpoint.directory, ignore_errors=True)
+    else:
+        stage = checkpoint.first_incomplete()
+        if stage != "tasks":
+            logger.info(f"⏯️ {period}: 从阶段 {stage} 续跑 ({checkpoint.directory})")
+    return checkpoint
@@ -0,0 +1,73 @@
+# src/codec.py - HTTP 请求/响应体的 JSON 编解码：装有 orjson / msgspec 时使用，否则退回标准库
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Tuple, Union
+
+# (名称, 解码, 编码)，首次使用时探测
+_backend: Optional[Tuple[str, Callable[[Any], Any], Callable[[Any], bytes]]] = None
+
+
+def _std_loads(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def _std_default(obj):
+    # 与 orjson 一致：日期和时间编码为 ISO 8601 字符串
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _std_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_std_default).encode("utf-8")
+
+
+def _msgspec_backend():
+    import msgspec
+
+    decoder, encoder = msgspec.json.Decoder(), msgspec.json.Encoder()
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # 与标准库一致抛出 ValueError，调用方的异常处理无需区分后端
+            raise ValueError(str(e)) from e
+
+    return "msgspec", loads, encoder.encode
+
+
+def _load_backend():
+    global _backend
+    if _backend is None:
+        try:
+            import orjson
+
+            _backend = ("orjson", orjson.loads, orjson.dumps)
+        except ImportError:
+            try:
+                _backend = _msgspec_backend()
+            except ImportError:
+                _backend = ("json", _std_loads, _std_dumps)
+    return _backend
+
+
+def backend_name() -> str:
+    return _load_backend()[0]
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """解码 JSON；orjson / msgspec 直接从字节解码，不经过中间的 str"""
+    return _load_backend()[1](data)
+
+
+def dumps(obj: Any) -> bytes:
+    """编码为紧凑的 UTF-8 JSON 字节（中文不转义）"""
+    return _load_backend()[2](obj)
+
+
+def response_json(response) -> Any:
+    """requests 响应体 → 对象，直接从 response.content 的字节解码"""
+    return loads(response.content)
@@ -0,0 +1,252 @@
+# src/columnar.py - 基于 NumPy 的列式日汇总后端（可选依赖）
+import importlib.util
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+from .rollup import ALL_CATEGORIES, DayRollup
+from .records import TaskRecord
+from .taxonomy import BUILTIN_CLASSES
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 任务数达到此规模时 auto 后端才切换到列式计算（小数据量下数组转换的开销不划算）
+COLUMNAR_MIN_TASKS = 2000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# 与 intervals.sweep 一致：同一时刻先处理结束再处理开始
+_END, _START = 0, 1
+
+
+def numpy_available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
+
+
+def _micros(moment: datetime) -> int:
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _hours(micros):
+    # 与 timedelta.total_seconds() / 3600 逐位一致
+    return micros / 1e6 / 3600
+
+
+def _scalar(total, contributions: int, has_float: bool):
+    """还原纯 Python 累加的结果类型：无累加项为 int 0，全为整数时为 int"""
+    if not contributions:
+        return 0
+    return float(total) if has_float else int(total)
+
+
+def _group_sum(np, keys, values, size: int, mask=None):
+    """按 keys 分组顺序累加（np.bincount 逐元素累加，与 Python 循环的浮点结果一致）"""
+    if mask is not None:
+        keys, values = keys[mask], values[mask]
+    return np.bincount(keys, weights=values, minlength=size), np.bincount(keys, minlength=size)
+
+
+def _first_per_group(np, keys, order_values, size: int):
+    """每组中 order_values 最小的第一个元素的位置（并列时取最先出现的），没有元素的组为 -1"""
+    first = np.full(size, -1, dtype=np.int64)
+    if len(keys):
+        order = np.lexsort((order_values, keys))
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        first[sorted_keys[starts]] = order[starts]
+    return first
+
+
+def _sweep_groups(np, keys, starts, ends, inserted, size: int):
+    """对多组区间同时做扫描线，返回 (活跃时长, 重叠时长, 空档时长) 及各自的累加次数
+
+    keys 为区间所属的组，inserted 为区间在组内的插入顺序（决定同一时刻事件的先后）。
+    """
+    count = len(keys)
+    times = np.concatenate([starts, ends])
+    kinds = np.concatenate([np.full(count, _START), np.full(count, _END)])
+    deltas = np.concatenate([np.ones(count, dtype=np.int64), -np.ones(count, dtype=np.int64)])
+    event_keys = np.concatenate([keys, keys])
+    sequence = np.concatenate([inserted * 2, inserted * 2 + 1])
+
+    order = np.lexsort((sequence, kinds, times, event_keys))
+    times, event_keys = times[order], event_keys[order]
+    # 每组事件的净变化为 0，全局累加和即组内并发数
+    active = np.cumsum(deltas[order])[:-1]
+    elapsed = np.diff(times)
+    groups = event_keys[:-1]
+    counted = (groups == event_keys[1:]) & (elapsed > 0)
+    hours = _hours(elapsed)
+
+    busy = _group_sum(np, groups, hours, size, counted & (active > 0))
+    overlap = _group_sum(np, groups, hours, size, counted & (active >= 2))
+    idle = _group_sum(np, groups, hours, size, counted & (active == 0))
+    return busy, overlap, idle
+
+
+def build_rollups_columnar(owned: Dict[date, List[TaskRecord]], spills: Dict[date, List[TaskRecord]],
+                           tz) -> Dict[date, List[DayRollup]]:
+    """一次向量化计算多天的汇总行，结果与逐天调用 build_day_rollups(day, records, tz, spill) 一致
+
+    owned 为按开始日期归属到各天的任务，spills 为前几天开始、跨午夜延续到当天的任务。
+    计数、XP、番茄、MIT、最早开始/最晚结束、睡眠与娱乐时长用分组累加，
+    工作时间线（合并工时、重叠、空档、分类切换、分类用时）用按天分组的扫描线计算。
+    """
+    import numpy as np
+
+    days = list(owned)
+    day_count = len(days)
+    if not day_count:
+        return {}
+
+    records = [record for day in days for record in owned[day]]
+    day_codes = np.repeat(np.arange(day_count), [len(owned[day]) for day in days])
+    categories: Dict[str, int] = {}
+    cat_codes = np.fromiter((categories.setdefault(r.category, len(categories)) for r in records),
+                            dtype=np.int64, count=len(records))
+
+    spill_records, spill_days = [], []
+    for code, day in enumerate(days):
+        for record in spills.get(day, ()):
+            if record.start and record.end and not record.is_sleep:
+                spill_records.append(record)
+                spill_days.append(code)
+    spill_cats = np.fromiter((categories.setdefault(r.category, len(categories)) for r in spill_records),
+                             dtype=np.int64, count=len(spill_records))
+    spill_days = np.asarray(spill_days, dtype=np.int64)
+
+    cat_count = len(categories)
+    size = day_count * cat_count
+    keys = day_codes * cat_count + cat_codes
+
+    # ---- 列：一次遍历取出所有字段 ----
+    numeric = np.array([(r.xp, r.tomatoes, r.actual_minutes, r.is_mit) for r in records],
+                       dtype=np.float64).reshape(len(records), 4)
+    flags = np.array([(type(r.xp) is float, type(r.tomatoes) is float, type(r.actual_minutes) is float,
+                       r.start is not None, r.end is not None, r.is_sleep, r.is_entertainment) for r in records],
+                     dtype=bool).reshape(len(records), 7)
+    spans = np.array([(_micros(r.start), _micros(r.span_end)) if r.start else (0, 0) for r in records],
+                     dtype=np.int64).reshape(len(records), 2)
+    has_start, is_sleep, is_entertainment = flags[:, 3], flags[:, 5], flags[:, 6]
+    timed = has_start & flags[:, 4]
+    start_us, end_us = spans[:, 0], spans[:, 1]
+    durations = _hours(end_us - start_us)
+
+    def grouped(values, mask=None, floats=None):
+        """(合计行, 分类行) 两个层级的 (和, 累加次数, 是否含浮点)"""
+        result = []
+        for group_keys, group_size in ((day_codes, day_count), (keys, size)):
+            total, contributions = _group_sum(np, group_keys, values, group_size, mask)
+            if floats is None:
+                has_float = np.ones(group_size, dtype=bool)
+            else:
+                float_mask = floats if mask is None else floats & mask
+                has_float = np.bincount(group_keys[float_mask], minlength=group_size) > 0
+            result.append((total, contributions, has_float))
+        return result
+
+    numbers = {attr: grouped(numeric[:, i], floats=flags[:, i])
+               for i, attr in enumerate(("xp", "tomatoes", "actual_minutes"))}
+    mit = grouped(numeric[:, 3])
+    sleep = grouped(durations, timed & is_sleep)
+    activity_names = list(dict.fromkeys(name for r in records for name in r.activities if name not in BUILTIN_CLASSES))
+    activities = {name: grouped(durations, timed & np.array([name in r.activities for r in records], dtype=bool))
+                  for name in activity_names}
+    entertainment = grouped(durations, timed & ~is_sleep & is_entertainment)
+
+    started = np.flatnonzero(has_start)
+    earliest, latest = [], []
+    for group_keys, group_size in ((day_codes, day_count), (keys, size)):
+        first = _first_per_group(np, group_keys[started], start_us[started], group_size)
+        last = _first_per_group(np, group_keys[started], -end_us[started], group_size)
+        for positions, target in ((first, earliest), (last, latest)):
+            indexes = np.full(group_size, -1, dtype=np.int64)
+            found = positions >= 0
+            indexes[found] = started[positions[found]]
+            target.append(indexes)
+
+    # ---- 工作时间线：裁剪到各天本地 0 点到 24 点后按天扫描 ----
+    bounds = np.array([[_micros(tz.localize(datetime.combine(day + timedelta(days=offset), time())))
+                        for offset in (0, 1)] for day in days], dtype=np.int64)
+    working = np.flatnonzero(timed & ~is_sleep)
+    spill_start = np.fromiter((_micros(r.start) for r in spill_records), dtype=np.int64, count=len(spill_records))
+    spill_end = np.fromiter((_micros(r.end) for r in spill_records), dtype=np.int64, count=len(spill_records))
+
+    piece_days = np.concatenate([day_codes[working], spill_days])
+    piece_cats = np.concatenate([cat_codes[working], spill_cats])
+    piece_start = np.maximum(np.concatenate([start_us[working], spill_start]), bounds[piece_days, 0])
+    piece_end = np.minimum(np.concatenate([end_us[working], spill_end]), bounds[piece_days, 1])
+    # 当天自有任务在前、跨午夜延续的任务在后，与 build_day_rollups 的区间顺序一致
+    inserted = np.concatenate([working, len(records) + np.arange(len(spill_records))])
+    kept = piece_end > piece_start
+    piece_days, piece_cats = piece_days[kept], piece_cats[kept]
+    piece_start, piece_end, inserted = piece_start[kept], piece_end[kept], inserted[kept]
+
+    busy, overlap, idle = _sweep_groups(np, piece_days, piece_start, piece_end, inserted, day_count)
+    piece_keys = piece_days * cat_count + piece_cats
+    category_busy = _sweep_groups(np, piece_keys, piece_start, piece_end, inserted, size)[0]
+
+    switch_order = np.lexsort((inserted, piece_start, piece_days))
+    switch_days, switch_cats = piece_days[switch_order], piece_cats[switch_order]
+    switches = np.bincount(switch_days[1:][(switch_days[1:] == switch_days[:-1]) & (switch_cats[1:] != switch_cats[:-1])],
+                           minlength=day_count)
+
+    # ---- 组装汇总行 ----
+    names = list(categories)
+
+    def fill(row: DayRollup, level: int, index: int) -> DayRollup:
+        for attr, stats in numbers.items():
+            total, contributions, has_float = stats[level]
+            setattr(row, attr, _scalar(total[index], contributions[index], has_float[index]))
+        row.count = int(mit[level][1][index])
+        row.mit_count = int(mit[level][0][index])
+        row.sleep_hours = _scalar(sleep[level][0][index], sleep[level][1][index], True)
+        row.entertainment_hours = _scalar(entertainment[level][0][index], entertainment[level][1][index], True)
+        for name, stats in activities.items():
+            if stats[level][1][index]:
+                row.activity_hours[name] = float(stats[level][0][index])
+        if earliest[level][index] >= 0:
+            row.earliest_start = records[earliest[level][index]].start
+            row.latest_end = records[latest[level][index]].span_end
+        return row
+
+    owned_keys = np.unique(keys, return_index=True)
+    first_seen = owned_keys[0][np.argsort(owned_keys[1], kind="stable")]
+    rollups: Dict[date, List[DayRollup]] = {}
+    for code, day in enumerate(days):
+        total = fill(DayRollup(day=day, category=ALL_CATEGORIES), 0, code)
+        total.work_hours = _scalar(busy[0][code], busy[1][code], True)
+        total.overlap_hours = _scalar(overlap[0][code], overlap[1][code], True)
+        total.idle_hours = _scalar(idle[0][code], idle[1][code], True)
+        total.context_switches = int(switches[code])
+        rollups[day] = [total]
+
+    def category_row(key: int) -> DayRollup:
+        day_code, cat_code = divmod(int(key), cat_count)
+        row = DayRollup(day=days[day_code], category=names[cat_code])
+        row.work_hours = _scalar(category_busy[0][key], category_busy[1][key], True)
+        return row
+
+    for key in first_seen:
+        row = fill(category_row(key), 1, key)
+        rollups[days[key // cat_count]].append(row)
+    seen = set(int(key) for key in first_seen)
+    for day_code, cat_code in zip(spill_days.tolist(), spill_cats.tolist()):
+        key = day_code * cat_count + cat_code
+        if key not in seen:
+            seen.add(key)
+            rollups[days[day_code]].append(category_row(key))
+    return rollups
+
+
+def resolve_backend(backend: Optional[str], task_count: int) -> str:
+    """返回实际使用的聚合后端：python 或 numpy"""
+    backend = (backend or "auto").lower()
+    if backend == "python":
+        return "python"
+    if not numpy_available():
+        if backend == "numpy":
+            logger.warning("⚠️ 未安装 numpy，列式聚合后端不可用，改用纯 Python 聚合")
+        return "python"
+    if backend == "numpy":
+        return "numpy"
+    return "numpy" if task_count >= COLUMNAR_MIN_TASKS else "python"
@@ -0,0 +1,156 @@
+# src/compaction.py - 按 token 预算压缩提示词中的任务清单
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# 标题中独立的数字（前面不是字母）：“D333 Quiz 20题” → “D333 Quiz N题”，课程编号 D333 保留
+_NUMBER = re.compile(r"(?<![A-Za-z\d.])\d+(?:\.\d+)?")
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_SPACES = re.compile(r"\s+")
+
+# 压缩级别
+LEVEL_NONE, LEVEL_DUPLICATES, LEVEL_NEAR_DUPLICATES, LEVEL_DROP = 0, 1, 2, 3
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文字符按 1 个 token，其余字符约 4 个 1 个 token（偏保守）"""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def normalize_title(title: str) -> str:
+    """近似重复判定用的标题：去掉大小写和多余空白，独立数字统一为 N"""
+    return _NUMBER.sub("N", _SPACES.sub(" ", title.strip().lower()))
+
+
+@dataclass
+class CompactionResult:
+    """任务清单压缩结果"""
+    text: str
+    original_tokens: int
+    tokens: int
+    level: int = LEVEL_NONE
+    dropped: int = 0  # 被并入“其余”行的任务数
+
+    @property
+    def ratio(self) -> float:
+        """压缩后 / 压缩前的 token 比例（1.0 表示未压缩）"""
+        return round(self.tokens / self.original_tokens, 3) if self.original_tokens else 1.0
+
+
+def _task_line(task: Dict) -> str:
+    mit_str = " (MIT)" if task['is_mit'] else ""
+    time_str = f"{task['start_time']}-{task['end_time']}"
+    efficiency = f"{task['xp']}/{task['tomatoes']}" if task['tomatoes'] > 0 else "0/0"
+    return f"- {task['title']}{mit_str} | {time_str} | {efficiency}"
+
+
+def _group_title(tasks: List[Dict]) -> str:
+    titles = list(dict.fromkeys(task['title'] for task in tasks))
+    if len(titles) == 1:
+        return titles[0]
+    # 只有一个数字位置不同的标题写成 “D333 Quiz N题（N=10、20、30）”
+    numbers = [_NUMBER.findall(title) for title in titles]
+    pattern = _NUMBER.sub("N", titles[0])
+    if all(len(found) == 1 for found in numbers):
+        values = sorted(dict.fromkeys(found[0] for found in numbers), key=float)
+        shown = "、".join(values[:5]) + ("等" if len(values) > 5 else "")
+        return f"{pattern}（N={shown}）"
+    return f"{titles[0]} 等"
+
+
+def _group_line(tasks: List[Dict]) -> str:
+    if len(tasks) == 1:
+        return _task_line(tasks[0])
+    mit = sum(1 for task in tasks if task['is_mit'])
+    mit_str = f" (MIT×{mit})" if mit else ""
+    xp = sum(task['xp'] for task in tasks)
+    tomatoes = sum(task['tomatoes'] for task in tasks)
+    return f"- {_group_title(tasks)} ×{len(tasks)}{mit_str} | {xp}/{tomatoes}"
+
+
+def _groups(tasks: List[Dict], level: int) -> List[List[Dict]]:
+    """按开始时间排序后分组；未压缩时每个任务一组"""
+    ordered = sorted(tasks, key=lambda x: x['start_time'])
+    if level == LEVEL_NONE:
+        return [[task] for task in ordered]
+    groups: Dict[str, List[Dict]] = {}
+    for task in ordered:
+        key = task['title'] if level == LEVEL_DUPLICATES else normalize_title(task['title'])
+        groups.setdefault(key, []).append(task)
+    return list(groups.values())
+
+
+def _informativeness(group: List[Dict]) -> Tuple:
+    """越小越先被舍弃：非 MIT、XP 和番茄少、重复次数少的任务信息量最低"""
+    return (sum(1 for task in group if task['is_mit']),
+            sum(task['xp'] for task in group),
+            sum(task['tomatoes'] for task in group),
+            len(group))
+
+
+def _render(by_category: Dict[str, List[List[Dict]]], dropped: Dict[str, List[Dict]]) -> str:
+    lines = []
+    for category in sorted(by_category):
+        lines.append(f"【{category}】")
+        lines.extend(_group_line(group) for group in by_category[category])
+        rest = dropped.get(category)
+        if rest:
+            xp = sum(task['xp'] for task in rest)
+            tomatoes = sum(task['tomatoes'] for task in rest)
+            lines.append(f"- 其余 {len(rest)} 项 | {xp}/{tomatoes}")
+    return "\n".join(lines)
+
+
+def render_task_list(task_details: List[Dict], budget_tokens: Optional[int] = None) -> CompactionResult:
+    """按分类输出任务清单；超出 budget_tokens 时逐级压缩
+
+    1. 合并同名任务为一行（次数、XP/番茄合计）
+    2. 合并只有数字不同的近似任务（如 “D333 Quiz 10题 / 20题”）
+    3. 按信息量从低到高把任务组并入各分类的“其余 N 项”行，直到满足预算
+    """
+    if not task_details:
+        text = "无已完成任务"
+        tokens = estimate_tokens(text)
+        return CompactionResult(text=text, original_tokens=tokens, tokens=tokens)
+
+    tasks_by_cat: Dict[str, List[Dict]] = {}
+    for task in task_details:
+        tasks_by_cat.setdefault(task['category'], []).append(task)
+
+    def build(level: int) -> Dict[str, List[List[Dict]]]:
+        return {category: _groups(tasks, level) for category, tasks in tasks_by_cat.items()}
+
+    text = _render(build(LEVEL_NONE), {})
+    original_tokens = tokens = estimate_tokens(text)
+    if budget_tokens is None or tokens <= budget_tokens:
+        return CompactionResult(text=text, original_tokens=original_tokens, tokens=tokens)
+
+    for level in (LEVEL_DUPLICATES, LEVEL_NEAR_DUPLICATES):
+        by_category = build(level)
+        text = _render(by_category, {})
+        tokens = estimate_tokens(text)
+        if tokens <= budget_tokens:
+            return CompactionResult(text=text, original_tokens=original_tokens, tokens=tokens, level=level)
+
+    # 逐组舍弃：按行估算节省的 token，避免每次都重新渲染整个清单
+    candidates = sorted(((category, group) for category, groups in by_category.items() for group in groups),
+                        key=lambda item: _informativeness(item[1]))
+    removed = set()
+    dropped: Dict[str, List[Dict]] = {}
+    for category, group in candidates:
+        if tokens <= budget_tokens:
+            break
+        removed.add(id(group))
+        rest = dropped.setdefault(category, [])
+        if not rest:
+            tokens += estimate_tokens("\n- 其余 0 项 | 0/0")
+        rest.extend(group)
+        tokens -= estimate_tokens("\n" + _group_line(group))
+
+    kept = {category: [group for group in groups if id(group) not in removed]
+            for category, groups in by_category.items()}
+    text = _render(kept, dropped)
+    return CompactionResult(text=text, original_tokens=original_tokens, tokens=estimate_tokens(text),
+                            level=LEVEL_DROP, dropped=sum(len(rest) for rest in dropped.values()))
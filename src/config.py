@@ -14,7 +14,7 @@ class Config:
     deepseek_key: Optional[str] = None
     openai_key: Optional[str] = None
     llm_provider: str = "deepseek"  # deepseek, openai
-    llm_model: str = os.getenv("LLM_MODEL", "deepseek-reasoner")
+    llm_model: str = "deepseek-reasoner"
 
     # 通知配置 - 支持两个不同的Bot
     telegram_bot_token: Optional[str] = None  # 主Bot token
@@ -29,8 +29,22 @@ class Config:
     # 系统配置
     timezone: str = "America/Toronto"
     max_retries: int = 3
+    run_timeout: int = 0  # 整次运行的时间预算（秒），按阶段切分给查询/LLM/推送，0 表示只限制单个请求
+    run_dir: str = "runs"  # 分阶段检查点目录，留空则不落盘
+    store_dir: str = "store"  # 按天物化汇总的本地存储目录，留空则每次全量计算
+    offline: bool = False  # 从 store_dir 中导入的数据库导出读取任务，不访问 Notion API
+    taxonomy_file: Optional[str] = None  # 活动分类规则文件（睡眠、娱乐、运动……），留空使用内置规则
+    goals_file: Optional[str] = None  # “每日确保”目标规则文件（学习时长、锻炼、MIT……），留空使用内置规则
+    aggregation_backend: str = "auto"  # auto / python / numpy，auto 在任务量大且装有 numpy 时用列式聚合
+    parse_workers: int = 0  # 任务量大时用多少个进程并行解析与按天汇总，0 或 1 表示在本进程内完成
+    progressive_delivery: bool = False  # 先推送本地统计报告，AI 分析生成后以回复的形式补发
+    streaming_aggregation: bool = False  # 逐页流式聚合，内存与窗口大小无关，提示词只保留 stream_top_tasks 个任务
+    stream_top_tasks: int = 200
+    hierarchical_reports: bool = False  # 周报由缓存的日报复盘拼成、月报由周报复盘拼成（需要 store_dir）
 
-    focus_goal: str = os.getenv("FOCUS_GOAL", "保持高效且有序的一天")
+    prompt_token_budget: int = 6000  # 日报/周报/月报提示词的 token 预算，超出时压缩任务清单，0 表示不压缩
+
+    focus_goal: str = "保持高效且有序的一天"
 
     @classmethod
     def from_env(cls) -> 'Config':
@@ -50,6 +64,8 @@ class Config:
             deepseek_key=os.getenv("DEEPSEEK_KEY"),
             openai_key=os.getenv("OPENAI_KEY"),
             llm_provider=llm_provider,
+            # 在 from_env 中读取，确保 load_dotenv() 之后的 .env 值生效
+            llm_model=os.getenv("LLM_MODEL", "deepseek-reasoner"),
             telegram_bot_token=os.getenv("TELEGRAM_BOT_TOKEN"),
             telegram_chat_id=os.getenv("TELEGRAM_CHAT_ID"),
             telegram_bot_token_2=os.getenv("TELEGRAM_BOT_TOKEN_2"),  # 第二个Bot的token
@@ -58,5 +74,19 @@ class Config:
             email_username=os.getenv("EMAIL_USERNAME"),
             email_password=os.getenv("EMAIL_PASSWORD"),
             timezone=os.getenv("TIMEZONE", "America/Toronto") or "America/Toronto",
-            max_retries=int(os.getenv("MAX_RETRIES", "3"))
+            max_retries=int(os.getenv("MAX_RETRIES", "3")),
+            run_timeout=int(os.getenv("RUN_TIMEOUT", "0") or 0),
+            run_dir=os.getenv("RUN_DIR", "runs"),
+            store_dir=os.getenv("STORE_DIR", "store"),
+            offline=os.getenv("NOTION_OFFLINE", "").lower() in ("1", "true", "yes"),
+            taxonomy_file=os.getenv("TAXONOMY_FILE") or None,
+            goals_file=os.getenv("GOALS_FILE") or None,
+            aggregation_backend=os.getenv("AGGREGATION_BACKEND", "auto") or "auto",
+            parse_workers=int(os.getenv("PARSE_WORKERS", "0") or 0),
+            progressive_delivery=os.getenv("PROGRESSIVE_DELIVERY", "").lower() in ("1", "true", "yes"),
+            streaming_aggregation=os.getenv("STREAMING_AGGREGATION", "").lower() in ("1", "true", "yes"),
+            stream_top_tasks=int(os.getenv("STREAM_TOP_TASKS", "200") or 200),
+            hierarchical_reports=os.getenv("HIERARCHICAL_REPORTS", "").lower() in ("1", "true", "yes"),
+            prompt_token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "6000") or 6000),
+            focus_goal=os.getenv("FOCUS_GOAL", "保持高效且有序的一天")
         )
\ No newline at end of file
@@ -0,0 +1,68 @@
+# src/deadline.py - 整次运行的截止时间与分阶段时间预算
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 各阶段必须在整次运行预算的多少比例之前结束（累计比例）：
+# 查询 Notion 最多用到 30%，LLM 最多用到 85%，剩余时间保留给推送，
+# 这样即使 LLM 卡住，统计报告/降级结果也总有时间发出去
+STAGE_BUDGETS = {"fetch": 0.30, "llm": 0.85, "notify": 1.0}
+
+# 单次请求的超时上限（秒），未设置 RUN_TIMEOUT 时同样生效，避免请求无限挂起
+REQUEST_TIMEOUTS = {"fetch": 30.0, "llm": 300.0, "notify": 15.0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """某阶段的时间预算已用完：不再重试，由调用方降级处理"""
+
+
+class Deadline:
+    """一次运行的截止时间（monotonic 时钟），按阶段切分预算并换算成每个请求的 timeout
+
+    seconds 为 0 时不限制整次运行时长，只使用 REQUEST_TIMEOUTS 中的单请求上限。
+    """
+
+    def __init__(self, seconds: float = 0, budgets: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.seconds = max(0.0, float(seconds or 0))
+        self.budgets = budgets or STAGE_BUDGETS
+        self.clock = clock
+        self.started = clock()
+
+    def remaining(self, stage: Optional[str] = None) -> Optional[float]:
+        """某阶段（默认整次运行）剩余的秒数，不限时返回 None"""
+        if not self.seconds:
+            return None
+        share = self.budgets.get(stage, 1.0) if stage else 1.0
+        return self.started + self.seconds * share - self.clock()
+
+    def expired(self, stage: Optional[str] = None) -> bool:
+        remaining = self.remaining(stage)
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, stage: str) -> float:
+        """本阶段下一次请求可用的 timeout；预算已用完时抛出 DeadlineExceeded"""
+        cap = REQUEST_TIMEOUTS.get(stage, 30.0)
+        remaining = self.remaining(stage)
+        if remaining is None:
+            return cap
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{stage} 阶段超出时间预算（RUN_TIMEOUT={self.seconds:g}s）")
+        return min(cap, remaining)
+
+
+_lock = threading.Lock()
+_deadline = Deadline()
+
+
+def start_deadline(seconds: float = 0) -> Deadline:
+    """开始一次运行的计时（CLI 每次运行、serve 模式每个定时任务各调用一次）"""
+    global _deadline
+    with _lock:
+        _deadline = Deadline(seconds)
+    return _deadline
+
+
+def get_deadline() -> Deadline:
+    """当前运行的截止时间，未调用 start_deadline 时不限时"""
+    return _deadline
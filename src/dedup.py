@@ -0,0 +1,219 @@
+# src/dedup.py - 本地识别重复 MIT 与 Quiz 题量，作为事实写入提示词
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Set
+from .compaction import normalize_title
+
+# 题量：“30题”“30 道题”“30 questions”
+_QUESTIONS = re.compile(r"(\d+)\s*(?:道)?题|(\d+)\s*(?:questions?|qs?)\b", re.IGNORECASE)
+# 去掉题量和末尾的编号后剩下的“核心标题”：“d333 quiz N题” → “d333 quiz”
+_COUNT_SUFFIX = re.compile(r"\s*(?:第?N\s*(?:道)?题|N\s*(?:questions?|qs?)\b|#?N)\s*$")
+_NOISE = re.compile(r"[\s\-_·,，。:：()（）\[\]【】]+")
+
+# 一道 Quiz 题按考试时长 3 分钟计；累计 50 题算一个 MIT（100 题算两个），不足 50 题也算一个
+QUIZ_MINUTES_PER_QUESTION = 3
+QUESTIONS_PER_MIT = 50
+# 核心标题的字符二元组 Jaccard 相似度达到此值即视为同一事项
+SIMILARITY_THRESHOLD = 0.7
+
+
+@dataclass
+class TaskCluster:
+    """同一事项的一组任务（如 D333 Quiz 10题 / 20题 / 30题）"""
+    title: str  # 组内第一个任务的标题
+    count: int
+    questions: int = 0
+    minutes: int = 0
+    mit_credits: int = 1
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def quiz_questions(title: str) -> int:
+    """标题中的题量（没有则为 0）"""
+    total = 0
+    for match in _QUESTIONS.finditer(title):
+        total += int(match.group(1) or match.group(2))
+    return total
+
+
+def core_title(title: str) -> str:
+    """去掉大小写、数字变化和题量后缀后的核心标题"""
+    core = normalize_title(title)
+    previous = None
+    while previous != core:
+        previous, core = core, _COUNT_SUFFIX.sub("", core)
+    return _NOISE.sub("", core) or _NOISE.sub("", normalize_title(title))
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def _similar(a: Set[str], b: Set[str]) -> bool:
+    return len(a & b) / len(a | b) >= SIMILARITY_THRESHOLD
+
+
+def _group_cores(cores: Sequence[str]) -> List[List[int]]:
+    """按字符二元组 Jaccard 相似度把核心标题并成组，返回各组的位置（按首个位置排序）"""
+    parent = list(range(len(cores)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    grams = [_bigrams(core) for core in cores]
+    for i in range(len(cores)):
+        for j in range(i + 1, len(cores)):
+            if find(i) != find(j) and _similar(grams[i], grams[j]):
+                parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for position in range(len(cores)):
+        groups.setdefault(find(position), []).append(position)
+    return sorted(groups.values(), key=lambda positions: positions[0])
+
+
+def cluster_titles(titles: Sequence[str]) -> List[List[int]]:
+    """把近似重复的标题聚成组，返回各组的下标（按首次出现排序）
+
+    核心标题相同的直接合并；不同的核心标题之间按字符二元组 Jaccard 相似度合并。
+    比较在去重后的核心标题之间进行，重复任务越多越省。
+    """
+    cores: Dict[str, List[int]] = {}
+    for index, title in enumerate(titles):
+        cores.setdefault(core_title(title), []).append(index)
+    keys = list(cores)
+    return sorted((sorted(index for position in positions for index in cores[keys[position]])
+                   for positions in _group_cores(keys)), key=lambda indexes: indexes[0])
+
+
+class TitleTally:
+    """逐个加入任务标题，按核心标题累计次数与题量，内存只与不同核心标题的数量有关
+
+    clusters() 与对全部标题调用 cluster_titles 后逐组统计的结果一致。limit 限制保留的核心标题数
+    （流式聚合时与窗口大小无关），之后才出现的新核心标题只计入 omitted。
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        # 核心标题 → [首个标题, 次数, 题量]，按首次出现排序
+        self._cores: Dict[str, List] = {}
+        self.omitted = {"count": 0, "questions": 0}
+
+    def __len__(self) -> int:
+        return len(self._cores)
+
+    def add(self, title: str) -> None:
+        questions = quiz_questions(title)
+        core = core_title(title)
+        entry = self._cores.get(core)
+        if entry is None:
+            if self.limit is not None and len(self._cores) >= self.limit:
+                self.omitted["count"] += 1
+                self.omitted["questions"] += questions
+                return
+            entry = self._cores[core] = [title, 0, 0]
+        entry[1] += 1
+        entry[2] += questions
+
+    def clusters(self) -> List[TaskCluster]:
+        entries = list(self._cores.values())
+        clusters = []
+        for positions in _group_cores(list(self._cores)):
+            questions = sum(entries[position][2] for position in positions)
+            clusters.append(TaskCluster(
+                title=entries[positions[0]][0],
+                count=sum(entries[position][1] for position in positions),
+                questions=questions,
+                minutes=questions * QUIZ_MINUTES_PER_QUESTION,
+                mit_credits=max(1, questions // QUESTIONS_PER_MIT),
+            ))
+        return clusters
+
+
+def _cluster(titles: Sequence[str]) -> List[TaskCluster]:
+    tally = TitleTally()
+    for title in titles:
+        tally.add(title)
+    return tally.clusters()
+
+
+def mit_summary(task_details: List[Dict]) -> Dict:
+    """MIT 去重与 Quiz 题量统计（确定性计算，结果作为事实写入提示词）
+
+    - distinct_mit: 逐日去重后的 MIT 事项数之和（MIT 规则按天判定）
+    - mit_credits: 按题量折算的 MIT 数（同一 Quiz 当天累计 50 题算一个，100 题算两个）
+    - quiz_questions / quiz_minutes: 所有任务的题量合计及按每题 3 分钟折算的时长
+    """
+    mit_by_day: Dict[str, List[str]] = {}
+    for task in task_details:
+        if task.get('is_mit'):
+            mit_by_day.setdefault(task.get('date') or "", []).append(task['title'])
+
+    mit_clusters = []
+    for day, titles in mit_by_day.items():
+        for cluster in _cluster(titles):
+            mit_clusters.append({"date": day or None, **cluster.to_dict()})
+
+    quiz = TitleTally()
+    for task in task_details:
+        if quiz_questions(task['title']):
+            quiz.add(task['title'])
+    return {
+        "distinct_mit": len(mit_clusters),
+        "mit_credits": sum(cluster["mit_credits"] for cluster in mit_clusters),
+        "mit_clusters": mit_clusters,
+        **quiz_summary(quiz),
+    }
+
+
+def quiz_summary(tally: TitleTally) -> Dict:
+    """Quiz 标题累计结果 → 题量、折算时长与各组明细（超出 limit 的部分记为 quiz_omitted）"""
+    clusters = tally.clusters()
+    questions = sum(cluster.questions for cluster in clusters) + tally.omitted["questions"]
+    summary = {
+        "quiz_questions": questions,
+        "quiz_minutes": questions * QUIZ_MINUTES_PER_QUESTION,
+        "quiz_clusters": [cluster.to_dict() for cluster in clusters],
+    }
+    if tally.omitted["count"]:
+        summary["quiz_omitted"] = dict(tally.omitted)
+    return summary
+
+
+def format_mit_facts(stats: Dict) -> str:
+    """提示词中的 MIT 去重结论"""
+    if not stats.get("mit_count"):
+        return "无 MIT 任务"
+    text = (f"标记 {stats['mit_count']} 个，去重后 {stats.get('distinct_mit', stats['mit_count'])} 项，"
+            f"按题量折算 {stats.get('mit_credits', stats['mit_count'])} 个")
+    clusters = stats.get("mit_clusters") or []
+    days = {cluster.get("date") for cluster in clusters}
+    merged = [cluster for cluster in clusters if cluster["count"] > 1 or cluster["questions"]]
+    # 明细被截断（流式聚合只保留前 N 组）时无法确定只有一天，不列明细
+    if len(days) <= 1 and merged and not stats.get("mit_clusters_omitted"):
+        parts = []
+        for cluster in merged:
+            detail = f"{cluster['title']} 等 {cluster['count']} 个" if cluster["count"] > 1 else cluster['title']
+            if cluster["questions"]:
+                detail += f"，共 {cluster['questions']} 题"
+            parts.append(f"{detail} → {cluster['mit_credits']} 个")
+        text += "（" + "；".join(parts) + "）"
+    return text
+
+
+def format_quiz_facts(stats: Dict) -> str:
+    """提示词中的 Quiz 题量与折算时长"""
+    if not stats.get("quiz_questions"):
+        return "无"
+    parts = [f"{cluster['title']} 等 {cluster['count']} 次共 {cluster['questions']} 题" if cluster["count"] > 1
+             else f"{cluster['title']}" for cluster in stats.get("quiz_clusters") or []]
+    omitted = stats.get("quiz_omitted")
+    if omitted:
+        parts.append(f"其余 {omitted['count']} 次共 {omitted['questions']} 题")
+    return (f"共 {stats['quiz_questions']} 题，按每题 {QUIZ_MINUTES_PER_QUESTION} 分钟折合 "
+            f"{stats['quiz_minutes']} 分钟（{round(stats['quiz_minutes'] / 60, 1)} 小时）：" + "；".join(parts))
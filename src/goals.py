@@ -0,0 +1,231 @@
+# src/goals.py - “每日确保”目标的本地规则引擎（学习时长、锻炼、MIT 数、维生素……）
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from .records import TaskRecord
+from .rollup import merge_intervals
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 规则可以引用的统计项（get_detailed_stats 的键），字典型统计用 “键.子键”，如 category_hours.Study
+METRICS = ("total", "xp", "tomatoes", "xp_per_tomato", "mit_count", "distinct_mit", "mit_credits",
+           "work_hours", "busy_hours", "overlap_hours", "idle_hours", "context_switches",
+           "quiz_questions", "quiz_minutes", "category_hours", "activity_hours")
+MEASURES = ("count", "hours", "minutes")
+PERIODS = ("daily", "weekly", "monthly")
+
+# 与日报/周报模板中“每日确保”一致的内置规则
+DEFAULT_RULES = [
+    {"name": "study", "label": "学习", "metric": "category_hours.Study", "min": 4, "unit": "小时"},
+    {"name": "exercise", "label": "锻炼", "keywords": ["锻炼", "健身", "跑步", "运动", "普拉提", "瑜伽",
+                                                       "exercise", "workout", "gym"],
+     "measure": "minutes", "min": 30},
+    {"name": "mit", "label": "MIT", "metric": "mit_credits", "min": 3, "unit": "个"},
+    {"name": "vitamins", "label": "维生素", "keywords": ["维生素", "vitamin"], "min": 1},
+    {"name": "weekly_study", "label": "学习", "metric": "category_hours.Study", "min": 35, "unit": "小时",
+     "periods": ["weekly"]},
+    {"name": "weekly_work", "label": "工作", "metric": "category_hours.Work", "min": 25, "unit": "小时",
+     "periods": ["weekly"]},
+]
+
+_UNITS = {"count": "次", "hours": "小时", "minutes": "分钟"}
+
+
+@dataclass(frozen=True)
+class GoalRule:
+    """一条目标：统计项（metric）或按关键词/分类筛出的任务（count / hours / minutes）与阈值比较"""
+    name: str
+    label: str
+    metric: Optional[str] = None
+    keywords: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    measure: str = "count"
+    min: Optional[float] = None
+    max: Optional[float] = None
+    unit: str = ""
+    periods: Tuple[str, ...] = ("daily",)
+
+    def target(self) -> str:
+        """阈值的文字描述，如 “≥4小时”“1~3次”"""
+        unit = self.unit or _UNITS[self.measure]
+        if self.min is not None and self.max is not None:
+            return f"{_number(self.min)}~{_number(self.max)}{unit}"
+        if self.min is not None:
+            return f"≥{_number(self.min)}{unit}"
+        return f"≤{_number(self.max)}{unit}"
+
+    def matches(self, record: TaskRecord) -> bool:
+        if self.categories and record.category not in self.categories:
+            return False
+        if self.keywords:
+            title = record.title.lower()
+            return any(keyword.lower() in title for keyword in self.keywords)
+        return True
+
+
+@dataclass
+class GoalResult:
+    """一条目标的核对结果"""
+    name: str
+    label: str
+    value: float
+    target: str
+    unit: str
+    passed: bool
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else round(value, 1)
+
+
+def _metric(stats: Dict, path: str) -> float:
+    value = stats
+    for key in path.split("."):
+        value = value.get(key, 0) if isinstance(value, dict) else 0
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _task_hours(records: Iterable[TaskRecord]) -> float:
+    """任务时长（重叠部分只算一次）；没有结束时间的任务按 Notion 的实际用时计"""
+    spans = []
+    minutes = 0.0
+    for record in records:
+        if record.start and record.end:
+            spans.append((record.start, record.end))
+        else:
+            minutes += record.actual_minutes
+    busy = sum((end - start).total_seconds() for start, end in merge_intervals(spans)) / 3600
+    return busy + minutes / 60
+
+
+def measure(rule: GoalRule, stats: Dict, records: Sequence[TaskRecord]) -> float:
+    """规则对应的实测值"""
+    if rule.metric:
+        return _metric(stats, rule.metric)
+    matched = [record for record in records if rule.matches(record)]
+    if rule.measure == "count":
+        return len(matched)
+    hours = _task_hours(matched)
+    return round(hours * 60) if rule.measure == "minutes" else round(hours, 1)
+
+
+def evaluate_goals(rules: Sequence[GoalRule], stats: Dict, records: Sequence[TaskRecord],
+                   period: str = "daily", measured: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """逐条核对适用于 period 的目标，返回 GoalResult 字典列表（按规则顺序）
+
+    measured 为已增量算好的 {规则名: 实测值}（流式聚合），其中的规则不再遍历 records。
+    """
+    measured = measured or {}
+    results = []
+    for rule in rules:
+        if period not in rule.periods:
+            continue
+        value = measured[rule.name] if rule.name in measured else measure(rule, stats, records)
+        passed = (rule.min is None or value >= rule.min) and (rule.max is None or value <= rule.max)
+        results.append(GoalResult(name=rule.name, label=rule.label, value=_number(value), target=rule.target(),
+                                  unit=rule.unit or _UNITS[rule.measure], passed=passed).to_dict())
+    return results
+
+
+def format_goal_facts(goals: List[Dict]) -> str:
+    """提示词中的目标核对结论，如 “学习 5.5小时（目标≥4小时，达成）；锻炼 0分钟（目标≥30分钟，未达成）”"""
+    if not goals:
+        return "无"
+    passed = sum(1 for goal in goals if goal["passed"])
+    parts = [f"{goal['label']} {goal['value']}{goal['unit']}（目标{goal['target']}，{'达成' if goal['passed'] else '未达成'}）"
+             for goal in goals]
+    return f"达成 {passed}/{len(goals)}：" + "；".join(parts)
+
+
+def _build(entries: List[Dict]) -> List[GoalRule]:
+    rules = []
+    names = set()
+    for index, entry in enumerate(entries):
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"第 {index + 1} 条目标缺少 name")
+        if name in names:
+            raise ValueError(f"目标名称重复: {name}")
+        names.add(name)
+        unknown = set(entry) - {field for field in GoalRule.__dataclass_fields__}
+        if unknown:
+            raise ValueError(f"目标 {name} 包含未知配置项: {', '.join(sorted(unknown))}")
+
+        metric = entry.get("metric")
+        if metric and metric.split(".")[0] not in METRICS:
+            raise ValueError(f"目标 {name} 的 metric 无效: {metric}（可选: {', '.join(METRICS)}）")
+        if metric and (entry.get("keywords") or entry.get("categories")):
+            raise ValueError(f"目标 {name} 不能同时指定 metric 和 keywords / categories")
+        if not metric and not (entry.get("keywords") or entry.get("categories")):
+            raise ValueError(f"目标 {name} 需要 metric 或 keywords / categories")
+        measure_name = entry.get("measure", "count")
+        if measure_name not in MEASURES:
+            raise ValueError(f"目标 {name} 的 measure 无效: {measure_name}（可选: {', '.join(MEASURES)}）")
+        if entry.get("min") is None and entry.get("max") is None:
+            raise ValueError(f"目标 {name} 需要 min 或 max")
+        periods = tuple(entry.get("periods", ("daily",)))
+        if set(periods) - set(PERIODS):
+            raise ValueError(f"目标 {name} 的 periods 无效: {', '.join(periods)}（可选: {', '.join(PERIODS)}）")
+
+        rules.append(GoalRule(
+            name=name,
+            label=entry.get("label") or name,
+            metric=metric,
+            keywords=tuple(entry.get("keywords", ())),
+            categories=tuple(entry.get("categories", ())),
+            measure=measure_name,
+            min=entry.get("min"),
+            max=entry.get("max"),
+            unit=entry.get("unit", ""),
+            periods=periods,
+        ))
+    return rules
+
+
+DEFAULT_GOALS = _build(DEFAULT_RULES)
+
+# {路径: (mtime, 规则)}，常驻进程中规则文件修改后自动重新加载
+_loaded: Dict[str, Tuple[float, List[GoalRule]]] = {}
+_lock = threading.Lock()
+
+
+def load_goals(path: Optional[str]) -> List[GoalRule]:
+    """加载目标规则文件；未配置时使用与模板“每日确保”一致的内置规则
+
+    格式::
+
+        {
+          "goals": [
+            {"name": "study", "label": "学习", "metric": "category_hours.Study", "min": 4, "unit": "小时"},
+            {"name": "exercise", "label": "锻炼", "keywords": ["锻炼", "跑步"], "measure": "minutes", "min": 30},
+            {"name": "vitamins", "label": "维生素", "keywords": ["维生素"], "min": 1},
+            {"name": "weekly_work", "label": "工作", "metric": "category_hours.Work", "min": 25,
+             "unit": "小时", "periods": ["weekly"]}
+          ]
+        }
+
+    metric 取统计项（见 METRICS）；否则按 keywords（标题包含，不区分大小写）和 categories 筛选任务，
+    measure 为 count（任务数）、hours 或 minutes（重叠部分只算一次）。periods 默认只用于日报。
+    """
+    if not path:
+        return DEFAULT_GOALS
+
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rules = _build(data.get("goals", []))
+    logger.info(f"🎯 从 {path} 加载 {len(rules)} 条目标: {', '.join(rule.name for rule in rules)}")
+    with _lock:
+        _loaded[path] = (mtime, rules)
+    return rules
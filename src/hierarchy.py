@@ -0,0 +1,154 @@
+# src/hierarchy.py - 分层报告：周报由逐日复盘拼成，月报由逐周复盘拼成
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from .compaction import estimate_tokens
+from .llm_client import LLM_FAILURE_PREFIX
+from .profiling import get_profiler, span
+from .rollup import day_fingerprint
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 父周期 → 由哪一级的复盘拼成
+CHILD_PERIOD = {"weekly": "daily", "monthly": "weekly"}
+WEEKDAYS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+# 缺失的下级复盘并发补齐的数量
+FILL_WORKERS = 4
+
+
+@dataclass
+class PeriodSummary:
+    """一个周期（某天 / 某周）的 LLM 复盘及其统计，持久化在 LocalStore 中供上级报告复用"""
+    period: str
+    start: date
+    end: date
+    fingerprint: str
+    stats: Dict
+    summary: str
+
+    @property
+    def label(self) -> str:
+        if self.period == "daily":
+            return f"{self.start.isoformat()} {WEEKDAYS[self.start.weekday()]}"
+        return f"{self.start.isoformat()} ~ {self.end.isoformat()}"
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["start"], data["end"] = self.start.isoformat(), self.end.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PeriodSummary":
+        return cls(**{**data, "start": date.fromisoformat(data["start"]), "end": date.fromisoformat(data["end"])})
+
+
+def child_windows(period: str, window: Tuple[date, date]) -> List[Tuple[str, Tuple[date, date]]]:
+    """父窗口拆成的下级窗口：周 → 每天；月 → 完整落在月内的自然周 + 月初/月末零散的天"""
+    start, end = window
+    children = []
+    day = start
+    while day <= end:
+        week_end = day + timedelta(days=6)
+        if period == "monthly" and day.weekday() == 0 and week_end <= end:
+            children.append(("weekly", (day, week_end)))
+            day = week_end + timedelta(days=1)
+        else:
+            children.append(("daily", (day, day)))
+            day += timedelta(days=1)
+    return children
+
+
+def _clip(text: str, tokens: int) -> str:
+    """按 token 估算截断过长的下级复盘"""
+    if estimate_tokens(text) <= tokens:
+        return text
+    cut = len(text)
+    while cut > 0 and estimate_tokens(text[:cut]) > tokens:
+        cut = int(cut * 0.9)
+    return text[:cut].rstrip() + "…"
+
+
+class HierarchicalReporter:
+    """按需生成并缓存下级复盘，把它们拼进上级报告的提示词
+
+    提示词规模随下级周期数（周报 7 天、月报 4~5 周）增长，而不是随任务数增长；
+    任务有增删或被编辑时对应周期的指纹变化，该周期的复盘会重新生成。
+    """
+
+    def __init__(self, summarizer, llm):
+        self.summarizer = summarizer
+        self.llm = llm
+        self.store = summarizer.store
+
+    def fingerprint(self, period: str, window: Tuple[date, date], tasks: List[Dict]) -> str:
+        return day_fingerprint(tasks, self.summarizer.config.timezone,
+                               f"{self.summarizer.taxonomy.digest}|{period}|{window[0]}|{window[1]}")
+
+    def remember(self, period: str, window: Tuple[date, date], tasks: List[Dict],
+                 stats: Dict, summary: str) -> None:
+        """保存一次正常运行得到的复盘（日报 / 周报），之后的上级报告直接复用"""
+        if self.store is None or not tasks or summary.startswith(LLM_FAILURE_PREFIX):
+            return
+        self.store.save_summary(PeriodSummary(period, window[0], window[1],
+                                              self.fingerprint(period, window, tasks), stats, summary))
+
+    def summary(self, period: str, window: Tuple[date, date], tasks: List[Dict]) -> PeriodSummary:
+        """读取已缓存的复盘；缺失或任务有变化时现场生成"""
+        fingerprint = self.fingerprint(period, window, tasks)
+        cached = self.store.load_summary(period, window[0], fingerprint) if self.store is not None else None
+        if cached is not None:
+            return cached
+
+        stats, details = self.summarizer.get_detailed_stats(tasks, period)
+        if period in CHILD_PERIOD:
+            prompt = self.build_prompt(period, window, tasks, stats, details)
+        else:
+            prompt = self.summarizer.build_prompt(stats, details, period)
+        logger.info(f"🧩 补齐 {period} 复盘 {window[0]} ~ {window[1]}（{len(tasks)} 个任务）")
+        with span(f"llm.{period}"):
+            answer = self.llm.ask_llm(prompt)
+        result = PeriodSummary(period, window[0], window[1], fingerprint, stats, answer)
+        if self.store is not None and not answer.startswith(LLM_FAILURE_PREFIX):
+            self.store.save_summary(result)
+        return result
+
+    def children(self, period: str, window: Tuple[date, date], tasks: List[Dict]) -> List[PeriodSummary]:
+        """父窗口内每个有任务的下级周期的复盘（按时间顺序）"""
+        by_date = self.summarizer.group_tasks_by_date(tasks)
+        pending = []
+        for child, (start, end) in child_windows(period, window):
+            child_tasks = [task for offset in range((end - start).days + 1)
+                           for task in by_date.get(start + timedelta(days=offset), [])]
+            if child_tasks:
+                pending.append((child, (start, end), child_tasks))
+
+        profiler = get_profiler()
+        with ThreadPoolExecutor(max_workers=FILL_WORKERS) as pool:
+            futures = [pool.submit(profiler.bind(self.summary), *item) for item in pending]
+            return [future.result() for future in futures]
+
+    def build_prompt(self, period: str, window: Tuple[date, date], tasks: List[Dict],
+                     stats: Optional[Dict] = None, details: Optional[List[Dict]] = None) -> str:
+        """上级报告的提示词：本地统计照常计算，任务清单换成下级复盘"""
+        if stats is None:
+            stats, details = self.summarizer.get_detailed_stats(tasks, period)
+        children = self.children(period, window, tasks)
+
+        budget = getattr(self.summarizer.config, "prompt_token_budget", 0) or 0
+        share = max(budget - estimate_tokens(self.summarizer._load_template(period)), 0) // max(len(children), 1)
+        blocks = []
+        for child in children:
+            child_stats = child.stats
+            header = (f"【{child.label}】任务 {child_stats.get('total', 0)} 个，XP {child_stats.get('xp', 0)}，"
+                      f"MIT {child_stats.get('mit_count', 0)} 个")
+            goals = child_stats.get("goals") or []
+            if goals:
+                header += f"，目标达成 {sum(1 for goal in goals if goal['passed'])}/{len(goals)}"
+            body = _clip(child.summary.strip(), share) if budget else child.summary.strip()
+            blocks.append(f"{header}\n{body}")
+
+        task_list = "\n\n".join(blocks) or "无已完成任务"
+        logger.info(f"🧩 {period} 分层提示词: {len(children)} 份下级复盘（{len(tasks)} 个任务）")
+        return self.summarizer.build_prompt(stats, details or [], period, task_list=task_list)
@@ -0,0 +1,99 @@
+# src/intervals.py - 扫描线时间区间引擎
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# (开始, 结束, 分类)，开始/结束均为带时区的时间
+Interval = Tuple[datetime, datetime, str]
+
+# 同一时刻先处理结束再处理开始：首尾相接的两个任务不算重叠，也不产生空档
+_END, _START = 0, 1
+
+
+@dataclass
+class TimeAccount:
+    """一组时间区间的时间账"""
+    busy_hours: float = 0            # 至少一个任务进行中的时长（合并重叠后）
+    overlap_hours: float = 0         # 两个及以上任务同时进行的时长
+    idle_hours: float = 0            # 第一个任务开始到最后一个任务结束之间的空档
+    idle_gaps: List[Tuple[datetime, datetime]] = field(default_factory=list)
+    context_switches: int = 0        # 按开始时间排序，相邻两个任务分类不同的次数
+    category_hours: Dict[str, float] = field(default_factory=dict)  # 各分类合并后的时长
+
+
+def _hours(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 3600
+
+
+def sweep(intervals: Iterable[Interval]) -> TimeAccount:
+    """一次扫描线遍历（排序 O(n log n)，扫描 O(n)）得到整组区间的时间账
+
+    零长度或结束早于开始的区间不计时长。
+    """
+    events = []
+    for start, end, category in intervals:
+        if end > start:
+            events.append((start, _START, category))
+            events.append((end, _END, category))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    account = TimeAccount()
+    active = 0
+    active_by_category: Dict[str, int] = {}
+    previous = None
+    idle_start = None
+    last_category = None
+
+    for moment, kind, category in events:
+        if previous is not None and moment > previous and active:
+            elapsed = _hours(previous, moment)
+            account.busy_hours += elapsed
+            if active >= 2:
+                account.overlap_hours += elapsed
+            for active_category in active_by_category:
+                account.category_hours[active_category] = account.category_hours.get(active_category, 0) + elapsed
+
+        if kind == _START:
+            if active == 0 and idle_start is not None and moment > idle_start:
+                account.idle_gaps.append((idle_start, moment))
+                account.idle_hours += _hours(idle_start, moment)
+            active += 1
+            active_by_category[category] = active_by_category.get(category, 0) + 1
+            if last_category is not None and category != last_category:
+                account.context_switches += 1
+            last_category = category
+        else:
+            active -= 1
+            remaining = active_by_category[category] - 1
+            if remaining:
+                active_by_category[category] = remaining
+            else:
+                del active_by_category[category]
+            if active == 0:
+                idle_start = moment
+        previous = moment
+
+    return account
+
+
+def split_at_midnight(start: datetime, end: datetime, tz) -> List[Tuple[date, datetime, datetime]]:
+    """把跨越本地午夜的区间切成每天一段：[(本地日期, 段开始, 段结束), ...]（按时区规则处理夏令时）"""
+    pieces = []
+    current = start
+    while current < end:
+        day = current.astimezone(tz).date()
+        next_midnight = tz.localize(datetime.combine(day + timedelta(days=1), time()))
+        piece_end = min(end, next_midnight)
+        pieces.append((day, current, piece_end))
+        current = piece_end
+    return pieces
+
+
+def clip_to_day(intervals: Iterable[Interval], day: date, tz) -> List[Interval]:
+    """只保留各区间落在本地日期 day 内的部分"""
+    clipped = []
+    for start, end, category in intervals:
+        for piece_day, piece_start, piece_end in split_at_midnight(start, end, tz):
+            if piece_day == day:
+                clipped.append((piece_start, piece_end, category))
+    return clipped
@@ -1,16 +1,26 @@
 # src/llm_client.py
 
 from __future__ import annotations
-from typing import Dict
-from openai import OpenAI, BadRequestError
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Dict, Optional
 from .config import Config
 from .utils import retry_on_failure, setup_logger
+from .profiling import span
+from .deadline import DeadlineExceeded, get_deadline
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = setup_logger(__name__)
 
+# ask_llm 失败时返回的占位文本前缀；调用方据此判断不写检查点、不缓存、不推送
+LLM_FAILURE_PREFIX = "[LLM 调用失败]"
+
 class LLMClient:
-    def __init__(self, cfg: Config) -> None:
+    def __init__(self, cfg: Config, limiter: Optional[object] = None) -> None:
         self.cfg = cfg
+        # 可选的并发上限（如 threading.Semaphore），批量运行时全局共享
+        self.limiter = limiter
         self.client: OpenAI
         self.model: str
         self._setup_client()
@@ -19,6 +29,9 @@ class LLMClient:
     # 初始化：根据 provider 创建 Client，并设定默认模型
     # ------------------------------------------------------------------
     def _setup_client(self) -> None:
+        # openai 只在真正创建客户端时导入，读取 LLM_FAILURE_PREFIX 的模块不必加载它
+        from openai import OpenAI
+
         provider = self.cfg.llm_provider.lower()
 
         if provider == "deepseek":
@@ -52,6 +65,8 @@ class LLMClient:
         max_tokens: int = 8000,
         temperature: float = 0.8,
     ) -> str:
+        from openai import BadRequestError
+
         system_msg = (
             "你是一个专业的个人效率助手，善于总结任务完成情况并给出实用建议。"
             "请用中文回复，保持简洁有条理。"
@@ -69,7 +84,13 @@ class LLMClient:
         }
 
         try:
-            resp = self.client.chat.completions.create(**params)
+            # 每次调用的超时取 LLM 阶段剩余的预算；在限流队列中等到预算耗尽也直接放弃
+            with self.limiter or nullcontext(), span("llm.request", model=self.model) as attrs:
+                params["timeout"] = get_deadline().timeout("llm")
+                resp = self.client.chat.completions.create(**params)
+                usage = getattr(resp, "usage", None)
+                if isinstance(getattr(usage, "total_tokens", None), int):
+                    attrs["tokens"] = usage.total_tokens
             msg = resp.choices[0].message
 
             # ① 先取标准 content
@@ -86,9 +107,12 @@ class LLMClient:
             logger.info(f"LLM 返回字数：{len(content)}")
             return content
 
+        except DeadlineExceeded as e:
+            logger.error(f"⏰ LLM 调用取消: {e}")
+            return f"{LLM_FAILURE_PREFIX} {e}"
         except BadRequestError as e:
             logger.error(f"LLM 调用失败 (BadRequest): {e}")
-            return f"[LLM 调用失败] {e}"
+            return f"{LLM_FAILURE_PREFIX} {e}"
         except Exception as e:
             logger.error(f"LLM 调用失败: {e}")
-            return f"[LLM 调用失败] {e}"
+            return f"{LLM_FAILURE_PREFIX} {e}"
@@ -1,92 +1,637 @@
 # src/main.py - 🔄 最终完整重构版
 
+from __future__ import annotations
+
 import argparse
+import os
 import sys
 import logging
-from datetime import datetime, timedelta
-import pytz
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from .config import Config
-from .notion_client import NotionClient
-from .summarizer import TaskSummarizer
-from .llm_client import LLMClient
-from .notifier import Notifier
-from .utils import setup_logger
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
+from .utils import setup_logger, get_report_window
+from .profiling import get_profiler, span
+from .backfill import parse_backfill_range
+from .checkpoint import STAGES, RunCheckpoint, open_checkpoint, tasks_fingerprint
+from .deadline import DeadlineExceeded, start_deadline
+from .llm_client import LLM_FAILURE_PREFIX
+
+# ⚡ openai / requests / smtplib / pytz 等重依赖均在首次使用时才导入，
+# 每次 cron 冷启动都要付出模块导入的代价（见 scripts/bench_startup.py）
+if TYPE_CHECKING:
+    from .notion_client import NotionClient
+    from .summarizer import TaskSummarizer
+    from .llm_client import LLMClient
 
 logger = setup_logger("task_master.main")
 
+PERIOD_CHOICES = ["daily", "three-days", "trend", "weekly", "monthly"]
+
+# --period trend 默认覆盖的天数（--days）
+DEFAULT_TREND_DAYS = 7
+
+# serve 模式默认调度（按 TIMEZONE 的本地时间）：所有报告都针对“昨天所在的周期”
+DEFAULT_SERVE_SCHEDULES = [
+    ("daily,three-days", "0 7 * * *"),  # 每天 07:00 昨日日报 + 三日趋势
+    ("weekly", "0 8 * * 1"),            # 每周一 08:00 上周周报
+    ("monthly", "0 9 1 * *"),           # 每月1号 09:00 上月月报
+]
+
+# 查询 Notion 超出时间预算时降级结果的开头（见 _overrun_answer），运行最终以状态码 1 退出
+FETCH_TIMEOUT_PREFIX = "[查询超时]"
+
+
+def parse_periods(value: str) -> List[str]:
+    """解析 --period 参数，支持逗号分隔的多个周期（如 daily,three-days）"""
+    periods = []
+    for item in value.split(","):
+        period = item.strip()
+        if not period:
+            continue
+        if period not in PERIOD_CHOICES:
+            raise argparse.ArgumentTypeError(
+                f"不支持的周期: {period}（可选: {', '.join(PERIOD_CHOICES)}）")
+        if period not in periods:
+            periods.append(period)
+    if not periods:
+        raise argparse.ArgumentTypeError("至少需要指定一个周期")
+    return periods
+
+
+def parse_schedule(value: str) -> Tuple[List[str], str]:
+    """解析 --schedule 参数，格式为 PERIODS=CRON（如 "daily,three-days=0 7 * * *"）"""
+    from .scheduler import CronSchedule
+
+    if "=" not in value:
+        raise argparse.ArgumentTypeError(f"无效的调度: {value}（格式: PERIODS=CRON）")
+    periods_str, cron = value.split("=", 1)
+    try:
+        CronSchedule(cron)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return parse_periods(periods_str), cron.strip()
 
-def handle_daily_report(notion: NotionClient, summarizer: TaskSummarizer,
-                        llm: LLMClient, is_yesterday: bool = False) -> str:
-    """处理日报生成"""
-    if is_yesterday:
-        tasks = notion.get_yesterday_tasks()
-    else:
-        tasks = notion.query_period_tasks("daily")
 
-    logger.info(f"📋 找到 {len(tasks)} 个已完成任务")
+def _answer_ok(answer: str) -> bool:
+    """LLM 失败的占位文本不写入检查点，续跑时会重新调用"""
+    return not answer.startswith(LLM_FAILURE_PREFIX)
 
-    if not tasks:
-        return "# Daily Review\n\n暂无已完成任务，继续努力！💪"
 
-    # ✅ 调用为日报设计的详细统计方法
-    stats, task_details = summarizer.get_detailed_stats(tasks)
-    logger.info(f"📊 统计: {stats}")
+def _fallback(text: str, report: Callable[[], str],
+              preview: Optional[Callable[[str], None]] = None) -> str:
+    """LLM 失败（包括超出 RUN_TIMEOUT 的时间预算被取消）时附上本地统计报告作为降级结果
 
-    # ✅ 将详细的 task_details 传递给 build_prompt
-    prompt = summarizer.build_prompt(stats, task_details, "daily")
-    return llm.ask_llm(prompt)
+    仍以失败前缀开头，因此不会写入答案检查点，续跑时会重新调用 LLM；
+    两阶段推送已经发出统计报告，不再重复附带。
+    """
+    if _answer_ok(text) or preview is not None:
+        return text
+    logger.warning("⚠️ LLM 不可用，降级为本地统计报告")
+    return f"{text}\n\n{report()}"
 
 
-def handle_three_days_report(notion: NotionClient, summarizer: TaskSummarizer,
-                             llm: LLMClient) -> str:
-    """处理三天趋势分析"""
-    logger.info("🔄 开始三天趋势分析...")
+def _overrun_answer(checkpoint: Optional[RunCheckpoint], error: DeadlineExceeded) -> str:
+    """查询超出时间预算时的降级结果
 
-    tz = pytz.timezone(notion.config.timezone)
-    today = datetime.now(tz).date()
-    three_days_stats = {}
+    同一窗口上次成功运行的报告仍在时沿用它（它已推送过，只打印、不重复发送；下次运行重新查询，
+    数据未变化时照常沿用），否则推送一条超时说明，重跑时重新查询。
+    """
+    notice = f"{FETCH_TIMEOUT_PREFIX} {error}"
+    if checkpoint is not None and checkpoint.previous is not None:
+        logger.warning(f"⚠️ {checkpoint.period}: 查询超时，沿用上次成功运行的报告")
+        return f"{notice}，以下为上次成功运行的报告（之后补记的任务未计入）\n\n{checkpoint.restore_previous()}"
+    return f"{notice}，本次没有生成报告，重跑时会重新查询"
 
-    for days_ago in [1, 2, 3]:
-        target_date = today - timedelta(days=days_ago)
-        # 使用精确的日期边界查询
-        tasks = notion._query_tasks(target_date, target_date)
-        logger.info(f"📅 {target_date}: 找到 {len(tasks)} 个任务")
 
-        # ✅ 调用为三日报告设计的趋势统计方法
-        stats = summarizer.get_trend_stats(tasks)
+def _streaming(summarizer: TaskSummarizer) -> bool:
+    """流式聚合不保留完整任务列表，与需要逐日任务的分层报告互斥"""
+    return bool(getattr(summarizer.config, "streaming_aggregation", False)) and not _hierarchical(summarizer)
 
-        three_days_stats[target_date.isoformat()] = stats
 
-    # 计算三天总计
-    total_tasks = sum(s.get('total', 0) for s in three_days_stats.values())
-    total_xp = sum(s.get('xp', 0) for s in three_days_stats.values())
-    logger.info(f"📊 三天总计: {total_tasks} 个任务, {total_xp} XP")
+def _moving_windows(periods: List[str], windows: Dict[str, Tuple[date, date]]) -> Dict[str, int]:
+    """三日/趋势报告的滑动均值窗口（与 handle_trend_report 一致）"""
+    return {period: moving_window_for((windows[period][1] - windows[period][0]).days + 1)
+            for period in periods if period in ("three-days", "trend")}
 
-    prompt = summarizer.build_three_day_prompt(three_days_stats)
-    return llm.ask_llm(prompt, max_tokens=1200)
+
+def _prompt_tokens(text: str) -> int:
+    from .compaction import estimate_tokens
+    return estimate_tokens(text)
+
+
+def _hierarchical(summarizer: TaskSummarizer) -> bool:
+    """分层报告需要本地存储来保存各级复盘"""
+    return bool(getattr(summarizer.config, "hierarchical_reports", False)) and summarizer.store is not None
+
+
+def handle_daily_report(notion: NotionClient, summarizer: TaskSummarizer,
+                        llm: LLMClient, is_yesterday: bool = False,
+                        tasks: Optional[List[Dict]] = None,
+                        checkpoint: Optional[RunCheckpoint] = None,
+                        preview: Optional[Callable[[str], None]] = None,
+                        task_count: Optional[int] = None) -> str:
+    """处理日报生成（传入 tasks 时不再查询 Notion；传入 checkpoint 时各阶段可续跑）
+
+    llm 为 None 时不调用 LLM，直接输出本地统计报告（--stats-only）；
+    传入 preview 时先把本地统计报告交给它推送，再调用 LLM（两阶段推送）。
+    task_count 为窗口内的任务总数（流式聚合时 tasks 只是其中信息量最高的前 N 个）。
+    """
+    checkpoint = checkpoint or RunCheckpoint(None, "daily")
+
+    @checkpoint.stage("tasks")
+    def fetch_tasks():
+        if tasks is not None:
+            return tasks
+        with span("fetch"):
+            if is_yesterday:
+                return notion.get_yesterday_tasks()
+            return notion.query_period_tasks("daily")
+
+    @checkpoint.stage("stats")
+    def aggregate():
+        # ✅ 调用为日报设计的详细统计方法
+        with span("aggregate", tasks=len(fetch_tasks())):
+            result = summarizer.get_detailed_stats(fetch_tasks(), "daily")
+        logger.info(f"📊 统计: {result[0]}")
+        return result
+
+    @checkpoint.stage("prompt")
+    def prompt():
+        stats, task_details = aggregate()
+        # ✅ 将详细的 task_details 传递给 build_prompt
+        with span("prompt") as attrs:
+            text = summarizer.build_prompt(stats, task_details, "daily")
+            attrs["chars"] = len(text)
+            attrs["tokens"] = _prompt_tokens(text)
+        return text
+
+    @checkpoint.stage("answer", cache_if=_answer_ok)
+    def answer():
+        count = len(fetch_tasks()) if task_count is None else task_count
+        logger.info(f"📋 找到 {count} 个已完成任务")
+        if not count:
+            return "# Daily Review\n\n暂无已完成任务，继续努力！💪"
+        if llm is None:
+            return summarizer.build_stats_report(*aggregate(), "daily")
+        if preview is not None:
+            preview(summarizer.build_stats_report(*aggregate(), "daily"))
+        with span("llm"):
+            text = _fallback(llm.ask_llm(prompt()),
+                             lambda: summarizer.build_stats_report(*aggregate(), "daily"), preview)
+        days = summarizer.group_tasks_by_date(fetch_tasks())
+        if _hierarchical(summarizer) and len(days) == 1:
+            from .hierarchy import HierarchicalReporter
+            day = next(iter(days))
+            HierarchicalReporter(summarizer, llm).remember("daily", (day, day), fetch_tasks(), aggregate()[0], text)
+        return text
+
+    return answer()
+
+
+def moving_window_for(days: int) -> int:
+    """滑动均值的窗口：两周及以上的趋势用 7 日均线，其余用 3 日均线"""
+    return 7 if days >= 14 else 3
+
+
+def handle_trend_report(notion: NotionClient, summarizer: TaskSummarizer,
+                        llm: LLMClient, period: str = "trend",
+                        tasks: Optional[List[Dict]] = None,
+                        window: Optional[Tuple[date, date]] = None,
+                        checkpoint: Optional[RunCheckpoint] = None,
+                        days: int = DEFAULT_TREND_DAYS,
+                        preview: Optional[Callable[[str], None]] = None) -> str:
+    """处理 N 天趋势分析（一次查询整个窗口，再由日汇总一次遍历得到逐日统计和滑动均值）
+
+    window 默认为截至昨天的 days 天，回填历史报告时可指定任意窗口。
+    """
+    start_date, end_date = window or get_report_window(period, notion.config.timezone, days=days)
+    days = (end_date - start_date).days + 1
+    logger.info(f"🔄 开始{days}天趋势分析...")
+    checkpoint = checkpoint or RunCheckpoint(None, period)
+
+    @checkpoint.stage("tasks")
+    def fetch_tasks():
+        if tasks is not None:
+            return tasks
+        with span("fetch"):
+            return notion._query_tasks(start_date, end_date)
+
+    @checkpoint.stage("stats")
+    def aggregate():
+        with span("aggregate", tasks=len(fetch_tasks()), days=days):
+            daily_stats = summarizer.get_trend_series(fetch_tasks(), start_date, end_date,
+                                                      moving_window_for(days))
+        for day, stats in daily_stats.items():
+            logger.info(f"📅 {day}: 找到 {stats['total']} 个任务")
+
+        total_tasks = sum(s.get('total', 0) for s in daily_stats.values())
+        total_xp = sum(s.get('xp', 0) for s in daily_stats.values())
+        logger.info(f"📊 {days}天总计: {total_tasks} 个任务, {total_xp} XP")
+        return daily_stats
+
+    @checkpoint.stage("prompt")
+    def prompt():
+        with span("prompt") as attrs:
+            text = summarizer.build_trend_prompt(aggregate(), period)
+            attrs["chars"] = len(text)
+            attrs["tokens"] = _prompt_tokens(text)
+        return text
+
+    @checkpoint.stage("answer", cache_if=_answer_ok)
+    def answer():
+        if preview is not None:
+            preview(summarizer.build_trend_stats_report(aggregate(), period))
+        with span("llm"):
+            return _fallback(llm.ask_llm(prompt(), max_tokens=1200 if days <= 7 else 1600),
+                             lambda: summarizer.build_trend_stats_report(aggregate(), period), preview)
+
+    return answer()
+
+
+def handle_three_days_report(notion: NotionClient, summarizer: TaskSummarizer,
+                             llm: LLMClient, tasks: Optional[List[Dict]] = None,
+                             window: Optional[Tuple[date, date]] = None,
+                             checkpoint: Optional[RunCheckpoint] = None,
+                             preview: Optional[Callable[[str], None]] = None) -> str:
+    """处理三天趋势分析（window 默认为昨天往前的三天）"""
+    return handle_trend_report(notion, summarizer, llm, "three-days", tasks=tasks,
+                               window=window, checkpoint=checkpoint, preview=preview)
 
 
 def handle_period_report(notion: NotionClient, summarizer: TaskSummarizer,
-                         llm: LLMClient, period: str) -> str:
-    """处理周报/月报"""
-    tasks = notion.query_period_tasks(period)
-    logger.info(f"📋 找到 {len(tasks)} 个已完成任务")
+                         llm: LLMClient, period: str,
+                         tasks: Optional[List[Dict]] = None,
+                         checkpoint: Optional[RunCheckpoint] = None,
+                         window: Optional[Tuple[date, date]] = None,
+                         preview: Optional[Callable[[str], None]] = None,
+                         task_count: Optional[int] = None) -> str:
+    """处理周报/月报（llm 为 None 时输出本地统计报告；task_count 同 handle_daily_report）
+
+    开启 HIERARCHICAL_REPORTS 时，周报的任务清单换成逐日复盘、月报换成逐周复盘（缺失的现场补齐）。
+    """
+    checkpoint = checkpoint or RunCheckpoint(None, period)
+    if window is None and _hierarchical(summarizer):
+        window = get_report_window(period, summarizer.config.timezone)
+
+    @checkpoint.stage("tasks")
+    def fetch_tasks():
+        if tasks is not None:
+            return tasks
+        with span("fetch"):
+            return notion.query_period_tasks(period)
+
+    @checkpoint.stage("stats")
+    def aggregate():
+        # ✅ 周报和月报也使用详细统计方法
+        with span("aggregate", tasks=len(fetch_tasks())):
+            result = summarizer.get_detailed_stats(fetch_tasks(), period)
+        logger.info(f"📊 统计: {result[0]}")
+        return result
+
+    @checkpoint.stage("prompt")
+    def prompt():
+        stats, task_details = aggregate()
+        # ✅ 将详细的 task_details 传递给 build_prompt
+        with span("prompt") as attrs:
+            if _hierarchical(summarizer):
+                from .hierarchy import HierarchicalReporter
+                text = HierarchicalReporter(summarizer, llm).build_prompt(period, window, fetch_tasks(),
+                                                                          stats, task_details)
+            else:
+                text = summarizer.build_prompt(stats, task_details, period)
+            attrs["chars"] = len(text)
+            attrs["tokens"] = _prompt_tokens(text)
+        return text
+
+    @checkpoint.stage("answer", cache_if=_answer_ok)
+    def answer():
+        count = len(fetch_tasks()) if task_count is None else task_count
+        logger.info(f"📋 找到 {count} 个已完成任务")
+        if not count:
+            return f"# {period.title()} Review\n\n暂无已完成任务，继续努力！💪"
+        if llm is None:
+            return summarizer.build_stats_report(*aggregate(), period)
+        if preview is not None:
+            preview(summarizer.build_stats_report(*aggregate(), period))
+        with span("llm"):
+            text = _fallback(llm.ask_llm(prompt()),
+                             lambda: summarizer.build_stats_report(*aggregate(), period), preview)
+        if _hierarchical(summarizer) and period == "weekly":
+            from .hierarchy import HierarchicalReporter
+            HierarchicalReporter(summarizer, llm).remember(period, window, fetch_tasks(), aggregate()[0], text)
+        return text
+
+    return answer()
+
+
+def run_report(notion: NotionClient, summarizer: TaskSummarizer, llm: LLMClient,
+               period: str, is_yesterday: bool = False,
+               tasks: Optional[List[Dict]] = None,
+               window: Optional[Tuple[date, date]] = None,
+               checkpoint: Optional[RunCheckpoint] = None,
+               trend_days: int = DEFAULT_TREND_DAYS,
+               preview: Optional[Callable[[str], None]] = None,
+               task_count: Optional[int] = None) -> str:
+    """根据不同的period执行不同逻辑（window 仅对需要逐日切分的三日/趋势报告有意义）"""
+    with span(f"report.{period}"):
+        if period == "daily":
+            return handle_daily_report(notion, summarizer, llm, is_yesterday, tasks=tasks,
+                                       checkpoint=checkpoint, preview=preview, task_count=task_count)
+        elif period == "three-days":
+            return handle_three_days_report(notion, summarizer, llm, tasks=tasks, window=window,
+                                            checkpoint=checkpoint, preview=preview)
+        elif period == "trend":
+            return handle_trend_report(notion, summarizer, llm, period, tasks=tasks, window=window,
+                                       checkpoint=checkpoint, days=trend_days, preview=preview)
+        elif period in ["weekly", "monthly"]:
+            return handle_period_report(notion, summarizer, llm, period, tasks=tasks,
+                                        checkpoint=checkpoint, window=window, preview=preview,
+                                        task_count=task_count)
+        raise ValueError(f"不支持的周期: {period}")
+
+
+def open_checkpoints(cfg: Config, periods: List[str], is_yesterday: bool = False,
+                     run_dir: Optional[str] = None, from_stage: Optional[str] = None,
+                     trend_days: int = DEFAULT_TREND_DAYS, force: bool = False) -> Dict[str, RunCheckpoint]:
+    """为每个周期打开 <run_dir>/<period>/<窗口> 下的检查点（run_dir 为空时不落盘）"""
+    return {
+        period: open_checkpoint(
+            run_dir, period, get_report_window(period, cfg.timezone, is_yesterday, trend_days), from_stage,
+            force)
+        for period in periods
+    }
+
+
+def run_reports(notion: NotionClient, summarizer: TaskSummarizer, llm: LLMClient,
+                periods: List[str], is_yesterday: bool = False,
+                checkpoints: Optional[Dict[str, RunCheckpoint]] = None,
+                trend_days: int = DEFAULT_TREND_DAYS,
+                preview: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+    """多报告模式：一次查询所有周期的并集窗口，本地切分后并发调用 LLM
+
+    传入 checkpoints 时，已有任务或答案检查点的周期不参与查询；查询到的任务与上一次
+    成功运行完全相同（指纹一致）的周期直接沿用上次的答案，不再统计、调用 LLM 和推送。
+    指纹由完整查询的结果计算，因此窗口查询本身不会省略。
+    preview(period, text) 在各报告调用 LLM 之前收到本地统计报告（见 PreviewSender）。
+    查询超出时间预算时，需要查询的周期返回以 FETCH_TIMEOUT_PREFIX 开头的降级结果（见 _overrun_answer）。
+    """
+    timezone = notion.config.timezone
+    windows = {p: get_report_window(p, timezone, is_yesterday, trend_days) for p in periods}
+    checkpoints = dict(checkpoints or {})
+    to_fetch = [
+        p for p in periods
+        if p not in checkpoints or not (checkpoints[p].has("tasks") or checkpoints[p].has("answer"))
+    ]
+
+    tasks_by_period: Dict[str, Optional[List[Dict]]] = {p: None for p in periods}
+    streamed = {}
+    overrun: Dict[str, str] = {}
+    if to_fetch:
+        union_start = min(windows[p][0] for p in to_fetch)
+        union_end = max(windows[p][1] for p in to_fetch)
+        if len(to_fetch) > 1:
+            logger.info(f"📦 多报告模式: {', '.join(to_fetch)} → 共享查询 {union_start} 到 {union_end}")
+        try:
+            if _streaming(summarizer):
+                from .streaming import StreamingAggregator
+
+                # 逐页拉取、逐个聚合，不保留完整任务列表；各报告只留下提示词所需的前 N 个任务
+                with span("fetch", start=union_start.isoformat(), end=union_end.isoformat(), streaming=True):
+                    streamed = StreamingAggregator(
+                        summarizer, {p: windows[p] for p in to_fetch}, _moving_windows(to_fetch, windows),
+                        summarizer.config.stream_top_tasks).feed(notion.iter_tasks(union_start, union_end))
+                for period in to_fetch:
+                    # 只保留了前 N 个任务，不写入 tasks 检查点（续跑时重新流式查询）
+                    checkpoints.setdefault(period, RunCheckpoint(None, period)).prime(
+                        "tasks", streamed[period].tasks, save=False)
+                    logger.info(f"🌊 {period}: 流式聚合 {streamed[period].count} 个任务，保留 {len(streamed[period].tasks)} 个")
+            else:
+                with span("fetch", start=union_start.isoformat(), end=union_end.isoformat()):
+                    all_tasks = notion._query_tasks(union_start, union_end)
+                for period in to_fetch:
+                    tasks_by_period[period] = summarizer.filter_tasks_by_date(all_tasks, *windows[period])
+        except DeadlineExceeded as e:
+            # 不完整的任务列表不能用来统计：这些周期降级，已有检查点的周期照常生成
+            logger.error(f"⏰ 查询超出时间预算: {e}")
+            overrun = {period: _overrun_answer(checkpoints.get(period), e) for period in to_fetch}
+            to_fetch = []
+
+    unchanged: Dict[str, str] = {}
+    for period in to_fetch:
+        checkpoint = checkpoints.get(period)
+        if checkpoint is None:
+            continue
+        fingerprint = streamed[period].fingerprint if streamed else tasks_fingerprint(tasks_by_period[period])
+        if checkpoint.unchanged(fingerprint):
+            logger.info(f"⏭️ {period}: 任务自上次成功运行后没有变化，沿用上次的报告（--force 可强制重新生成）")
+            unchanged[period] = checkpoint.restore_previous()
+        else:
+            checkpoint.save_fingerprint(fingerprint)
+
+    pending = [period for period in periods if period not in unchanged and period not in overrun]
+    fetched = [period for period in to_fetch if period in pending]
+    shared = {period: streamed[period].stats for period in fetched} if streamed else {}
+    if len(fetched) > 1 and not streamed:
+        # 共享查询的各报告一次遍历同时得到统计，而不是每个报告各自解析、聚合一遍
+        with span("aggregate.shared", tasks=len(all_tasks), reports=len(fetched)):
+            shared = summarizer.get_report_stats(all_tasks, {period: windows[period] for period in fetched},
+                                                 _moving_windows(fetched, windows))
+    for period, stats in shared.items():
+        checkpoint = checkpoints.setdefault(period, RunCheckpoint(None, period))
+        checkpoint.prime("stats", stats)
+
+    profiler = get_profiler()
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        futures = {
+            period: pool.submit(
+                profiler.bind(run_report), notion, summarizer, llm, period, is_yesterday,
+                tasks_by_period[period], windows[period], checkpoints.get(period), trend_days,
+                partial(preview, period) if preview else None,
+                streamed[period].count if period in streamed else None
+            )
+            for period in pending
+        }
+        answers = {period: future.result() for period, future in futures.items()}
+    answers.update(unchanged)
+    answers.update(overrun)
+    return {period: answers[period] for period in periods}
+
+
+def build_title(period: str, is_yesterday: bool = False, trend_days: int = DEFAULT_TREND_DAYS) -> str:
+    """构建通知标题"""
+    if period == "three-days":
+        return f"Task-Master 3-Day Trend Analysis · {datetime.now().date()}"
+    elif period == "trend":
+        return f"Task-Master {trend_days}-Day Trend Analysis · {datetime.now().date()}"
+    elif period == "daily" and is_yesterday:
+        yesterday = (datetime.now() - timedelta(days=1)).date()
+        return f"Task-Master Daily Review · {yesterday}"
+    return f"Task-Master {period.title()} Review · {datetime.now().date()}"
+
+
+def open_store(cfg: Config):
+    """本地存储按数据库隔离，多租户共用同一目录也不会互相覆盖；STORE_DIR 为空时返回 None"""
+    from .store import LocalStore
+
+    return LocalStore(os.path.join(cfg.store_dir, cfg.notion_db_id)) if cfg.store_dir else None
+
+
+def build_clients(cfg: Config, session=None, rate_limiter=None, llm: Optional[LLMClient] = None,
+                  with_llm: bool = True):
+    """初始化 Notion / Summarizer / LLM / Notifier（重依赖在此处才导入）
+
+    session / rate_limiter / llm 用于常驻与批量模式下共享连接池、限流器和 LLM 客户端。
+    with_llm=False 时不创建 LLM 客户端（返回 None），也不导入 openai，如 --stats-only。
+    """
+    from .notion_client import NotionClient
+    from .summarizer import TaskSummarizer
+    from .notifier import Notifier
+
+    with span("init"):
+        store = open_store(cfg)
+        if cfg.offline:
+            from .offline import OfflineNotionClient
+
+            if store is None:
+                raise ValueError("离线模式需要设置 STORE_DIR")
+            notion = OfflineNotionClient(cfg, store)
+        else:
+            notion = NotionClient(cfg, session=session, rate_limiter=rate_limiter)
+        # ✅ 正确地初始化 Summarizer，使用关键字参数以增加清晰度
+        summarizer = TaskSummarizer(config=cfg, store=store)
+        if llm is None and with_llm:
+            from .llm_client import LLMClient
+
+            llm = LLMClient(cfg)
+        notifier = Notifier(cfg, session=session)
+    return notion, summarizer, llm, notifier
+
+
+class PreviewSender:
+    """两阶段推送的第一阶段：统计算完立即推送本地统计报告，记录各渠道的消息引用
+
+    deliver_reports 收到 refs 后，AI 分析以回复这条统计消息的形式发出；LLM 不可用时只保留统计报告。
+    """
+
+    def __init__(self, notifier, is_yesterday: bool = False, dry_run: bool = False,
+                 trend_days: int = DEFAULT_TREND_DAYS):
+        self.notifier = notifier
+        self.is_yesterday = is_yesterday
+        self.dry_run = dry_run
+        self.trend_days = trend_days
+        self.refs: Dict[str, Dict] = {}
+
+    def __call__(self, period: str, text: str) -> None:
+        print("\n" + "=" * 60)
+        print(text)
+        print("=" * 60 + "\n")
+        if self.dry_run:
+            self.refs[period] = {}
+            return
+
+        title = build_title(period, self.is_yesterday, self.trend_days)
+        with span(f"notify.preview.{period}"):
+            refs = self.notifier.notify_preview(title, text)
+        self.refs[period] = {channel: ref for channel, ref in refs.items() if ref is not None}
+        logger.info(f"⚡ {period}: 统计报告已推送 {list(self.refs[period])}，AI 分析生成后以回复补发")
+
+
+def deliver_reports(notifier, answers: Dict[str, str], is_yesterday: bool = False,
+                    dry_run: bool = False,
+                    checkpoints: Optional[Dict[str, RunCheckpoint]] = None,
+                    trend_days: int = DEFAULT_TREND_DAYS,
+                    previews: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict[str, bool]]:
+    """打印并推送各报告，返回 {周期: {渠道: 是否成功}}
+
+    传入 checkpoints 时推送结果写入检查点，续跑时只重试上次失败的渠道。
+    previews 为 PreviewSender.refs：已推送统计报告的周期，AI 分析作为回复发出，LLM 失败时不再推送。
+    """
+    checkpoints = checkpoints or {}
+    previews = previews or {}
+    deliveries = {}
+    for period, answer in answers.items():
+        # 打印结果
+        print("\n" + "=" * 60)
+        print(answer)
+        print("=" * 60 + "\n")
 
-    if not tasks:
-        return f"# {period.title()} Review\n\n暂无已完成任务，继续努力！💪"
+        # 发送通知
+        if dry_run:
+            logger.info("🏃 Dry-run mode → 不发送任何通知")
+            continue
+        if period in previews and not _answer_ok(answer):
+            logger.warning(f"⚠️ {period}: LLM 不可用，只保留已推送的统计报告（重跑时重试 AI 分析）")
+            continue
+
+        checkpoint = checkpoints.get(period)
+        previous = checkpoint.load("delivery") if checkpoint and checkpoint.has("delivery") else {}
+        retry = [k for k, v in previous.items() if not v] if previous else None
+        if retry == []:
+            logger.info(f"⏭️ {period}: 上次已成功推送且数据没有变化，不再重复发送")
+            deliveries[period] = previous
+            continue
+        if retry is not None:
+            logger.info(f"⏯️ {period}: 已推送成功的渠道不再重复发送，仅重试 {retry}")
+
+        title = build_title(period, is_yesterday, trend_days)
+        with span(f"notify.{period}"):
+            push_results = {**previous, **notifier.notify_all(title, answer, only=retry,
+                                                               reply_to=previews.get(period))}
+        deliveries[period] = push_results
+        if checkpoint:
+            checkpoint.save("delivery", push_results)
 
-    # ✅ 周报和月报也使用详细统计方法
-    stats, task_details = summarizer.get_detailed_stats(tasks)
-    logger.info(f"📊 统计: {stats}")
+        # 统计结果
+        succ = [k for k, v in push_results.items() if v]
+        fail = [k for k, v in push_results.items() if not v]
 
-    # ✅ 将详细的 task_details 传递给 build_prompt
-    prompt = summarizer.build_prompt(stats, task_details, period)
-    return llm.ask_llm(prompt)
+        logger.info("=" * 60)
+        logger.info(f"📨 {period} 推送完成:")
+        logger.info(f"   ✅ 成功: {succ}")
+        logger.info(f"   ❌ 失败: {fail}")
+        logger.info("=" * 60)
+    return deliveries
+
+
+def serve(cfg: Config, schedules: List[Tuple[List[str], str]], dry_run: bool = False,
+          profile: bool = False, trend_days: int = DEFAULT_TREND_DAYS) -> None:
+    """常驻模式：进程内按 cron 调度各报告，客户端与 HTTP 连接池在多次运行间保持常热"""
+    import requests
+    from .scheduler import Scheduler
+
+    session = requests.Session()
+    notion, summarizer, llm, notifier = build_clients(cfg, session=session)
+    scheduler = Scheduler(cfg.timezone)
+    profiler = get_profiler()
+
+    def make_job(periods: List[str]):
+        def job():
+            profiler.reset()
+            start_deadline(cfg.run_timeout)
+            checkpoints = open_checkpoints(cfg, periods, is_yesterday=True,
+                                           run_dir=None if dry_run else cfg.run_dir, trend_days=trend_days)
+            preview = PreviewSender(notifier, True, dry_run, trend_days) if cfg.progressive_delivery else None
+            answers = run_reports(notion, summarizer, llm, periods, is_yesterday=True,
+                                  checkpoints=checkpoints, trend_days=trend_days, preview=preview)
+            deliver_reports(notifier, answers, is_yesterday=True, dry_run=dry_run,
+                            checkpoints=checkpoints, trend_days=trend_days,
+                            previews=preview.refs if preview else None)
+            if profile:
+                profiler.log_summary()
+        return job
+
+    for periods, cron in schedules:
+        scheduler.add_job(",".join(periods), cron, make_job(periods))
+
+    logger.info(f"🛰️ serve 模式启动，共 {len(schedules)} 个定时任务（时区 {cfg.timezone}，Dry-run: {dry_run}）")
+    scheduler.install_signal_handlers()
+    try:
+        scheduler.run_forever()
+    finally:
+        session.close()
 
 
 def main():
@@ -94,32 +639,201 @@ def main():
     parser = argparse.ArgumentParser(description="Generate periodical summaries")
     parser.add_argument(
         "--period",
-        choices=["daily", "three-days", "weekly", "monthly"],
-        required=True,
-        help="Summary period to run"
+        type=parse_periods,
+        help="Summary period(s) to run, comma separated "
+             "(daily, three-days, trend, weekly, monthly), e.g. daily,three-days"
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DEFAULT_TREND_DAYS,
+        help=f"Number of days covered by --period trend (default: {DEFAULT_TREND_DAYS})"
     )
     parser.add_argument(
         "--yesterday",
         action="store_true",
-        help="Generate report for yesterday (only for daily period)"
+        help="Report on yesterday (daily) or the week/month containing yesterday (weekly/monthly)"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a long-lived daemon with an in-process cron scheduler"
+    )
+    parser.add_argument(
+        "--schedule",
+        type=parse_schedule,
+        action="append",
+        metavar="PERIODS=CRON",
+        help="Schedule for --serve in TIMEZONE local time, repeatable "
+             "(default: 'daily,three-days=0 7 * * *', 'weekly=0 8 * * 1', 'monthly=0 9 1 * *')"
     )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Skip all notifications - only print summary"
     )
+    parser.add_argument(
+        "--stats-only",
+        action="store_true",
+        help="Skip the LLM and deliver a local stats report with the goal checklist (daily, weekly, monthly)"
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
         help="Enable verbose logging"
     )
+    parser.add_argument(
+        "--run-dir",
+        metavar="DIR",
+        help="Checkpoint directory for resumable runs (default: RUN_DIR or 'runs'; '' disables)"
+    )
+    parser.add_argument(
+        "--from-stage",
+        choices=STAGES,
+        help="Discard checkpoints from this stage on and recompute "
+             "(tasks, stats, prompt, answer, delivery)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate and resend reports even if the queried tasks are unchanged since the last successful run"
+    )
+    parser.add_argument(
+        "--tenants",
+        metavar="FILE",
+        help="Run --period for every tenant in a JSON tenants file concurrently"
+    )
+    parser.add_argument(
+        "--tenant-workers",
+        type=int,
+        default=4,
+        help="Tenants processed concurrently in --tenants mode"
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=2,
+        help="Global cap on concurrent LLM calls in --tenants mode"
+    )
+    parser.add_argument(
+        "--notion-rps",
+        type=float,
+        default=3.0,
+        help="Request rate limit per Notion token in --tenants mode"
+    )
+    parser.add_argument(
+        "--batch-report",
+        metavar="FILE",
+        help="Write per-tenant results of --tenants mode as JSON"
+    )
+    parser.add_argument(
+        "--backfill",
+        type=parse_backfill_range,
+        metavar="START..END",
+        help="Generate historical reports for every window of --period in "
+             "START..END (e.g. 2025-01-01..2025-12-31) into --output-dir"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="backfill",
+        help="Directory for backfilled reports (default: backfill)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent report generations (aggregation + LLM) in backfill mode"
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=4,
+        help="Concurrent Notion queries in backfill mode"
+    )
+    parser.add_argument(
+        "--ingest",
+        metavar="FILE",
+        help="Import a Notion database export (.csv / .json / .jsonl) into STORE_DIR; "
+             "with --period the reports then run offline against it"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Read tasks from the imported export in STORE_DIR instead of the Notion API"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        metavar="FILE",
+        help="Write a JSON per-stage timing report (default: profile.json)"
+    )
+    parser.add_argument(
+        "--pstats",
+        metavar="FILE",
+        help="Also dump cProfile statistics of the main thread to FILE"
+    )
     args = parser.parse_args()
 
+    if not args.serve and not args.period and not args.ingest:
+        parser.error("需要 --period（或使用 --serve / --ingest）")
+    if args.ingest and (args.serve or args.tenants):
+        parser.error("--ingest 不能与 --serve / --tenants 同时使用")
+    if args.tenants and (args.serve or args.backfill):
+        parser.error("--tenants 不能与 --serve / --backfill 同时使用")
+    if args.backfill and (not args.period or len(args.period) != 1):
+        parser.error("--backfill 只支持单个 --period")
+    if args.days < 1:
+        parser.error("--days 必须为正整数")
+    if args.stats_only and (args.serve or args.tenants or args.backfill):
+        parser.error("--stats-only 不能与 --serve / --tenants / --backfill 同时使用")
+    if args.stats_only and set(args.period) - {"daily", "weekly", "monthly"}:
+        parser.error("--stats-only 只支持 daily / weekly / monthly")
+
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
         logger.setLevel(logging.DEBUG)
 
-    cfg = Config.from_env()
+    profiler = get_profiler()
+    profiler.log_spans = bool(args.profile)
+
+    cprofile = None
+    if args.pstats:
+        # cProfile 只统计主线程；并发的 LLM 调用请看 --profile 的 span 报告
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    try:
+        _run(args)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(args.pstats)
+            logger.info(f"📝 cProfile 统计已写入 {args.pstats}")
+        if args.profile:
+            profiler.log_summary()
+            profiler.write_json(args.profile)
+
+
+def _run(args: argparse.Namespace) -> None:
+    """执行一次完整的报告流程"""
+    with span("config"):
+        # 加载环境变量（放在解析参数之后，--help 无需任何额外开销）
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        cfg = Config.from_env()
+        if args.run_dir is not None:
+            cfg.run_dir = args.run_dir
+        if args.offline or args.ingest:
+            cfg.offline = True
+    # 整次运行的截止时间，按阶段切分后传给每个 Notion / LLM / 推送请求
+    start_deadline(cfg.run_timeout)
+
+    if args.tenants:
+        _run_tenants(args, cfg.run_dir)
+        return
 
     logger.info(f"🔧 配置加载完成:")
     logger.info(f"   - NOTION_TOKEN: {'已设置' if cfg.notion_token else '未设置'}")
@@ -127,71 +841,112 @@ def main():
     logger.info(f"   - LLM_PROVIDER: {cfg.llm_provider}")
     logger.info(f"   - TIMEZONE: {cfg.timezone}")
 
-    if not cfg.notion_token or not cfg.notion_db_id:
+    # 离线模式不需要 token，NOTION_DB_ID 仍用于区分本地存储中的数据库
+    if not (cfg.notion_token or cfg.offline) or not cfg.notion_db_id:
         logger.error("❌ 环境变量 NOTION_TOKEN 或 NOTION_DB_ID 未设置")
         sys.exit(1)
 
+    if args.ingest:
+        from .offline import ingest_export
+
+        store = open_store(cfg)
+        if store is None:
+            logger.error("❌ 导入需要设置 STORE_DIR")
+            sys.exit(1)
+        try:
+            ingest_export(args.ingest, store, cfg.timezone)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ 导入失败: {e}")
+            sys.exit(1)
+        if not args.period:
+            return
+
+    if args.serve:
+        serve(cfg, args.schedule or [(parse_periods(p), cron) for p, cron in DEFAULT_SERVE_SCHEDULES],
+              dry_run=args.dry_run, profile=bool(args.profile), trend_days=args.days)
+        return
+
     try:
-        # 初始化组件
-        notion = NotionClient(cfg)
-        # ✅ 正确地初始化 Summarizer，使用关键字参数以增加清晰度
-        summarizer = TaskSummarizer(config=cfg)
-        llm = LLMClient(cfg)
-        notifier = Notifier(cfg)
+        import pytz
+
+        # 统计报告不调用 LLM，不创建客户端（也不要求配置 API Key）
+        notion, summarizer, llm, notifier = build_clients(cfg, with_llm=not args.stats_only)
+
+        periods = args.period
+
+        if args.backfill:
+            from .backfill import run_backfill
+
+            start_date, end_date = args.backfill
+            results = run_backfill(
+                notion, summarizer, llm, periods[0], start_date, end_date,
+                output_dir=args.output_dir, workers=args.workers,
+                fetch_workers=args.fetch_workers, trend_days=args.days
+            )
+            failed = [label for label, status in results.items() if status == "failed"]
+            logger.info("=" * 60)
+            logger.info(f"🗂️ 回填完成: 生成 {sum(1 for v in results.values() if v == 'written')} 个, "
+                        f"跳过 {sum(1 for v in results.values() if v == 'skipped')} 个, 失败 {failed}")
+            logger.info("=" * 60)
+            if failed:
+                sys.exit(1)
+            return
 
-        period = args.period
         logger.info("=" * 60)
-        logger.info(f"🚀 Task-Master {period} 总结启动")
+        logger.info(f"🚀 Task-Master {', '.join(periods)} 总结启动")
         logger.info(f"📅 时间: {datetime.now(pytz.timezone(cfg.timezone)).strftime('%Y-%m-%d %H:%M:%S %Z')}")
         logger.info(f"🔄 Dry-run: {args.dry_run}")
         logger.info("=" * 60)
 
-        # 根据不同的period执行不同逻辑
-        if period == "daily":
-            answer = handle_daily_report(notion, summarizer, llm, args.yesterday)
-        elif period == "three-days":
-            answer = handle_three_days_report(notion, summarizer, llm)
-        elif period in ["weekly", "monthly"]:
-            answer = handle_period_report(notion, summarizer, llm, period)
-        else:
-            raise ValueError(f"不支持的周期: {period}")
-
-        # 打印结果
-        print("\n" + "=" * 60)
-        print(answer)
-        print("=" * 60 + "\n")
+        # 统计报告与 dry-run 不写检查点：它们没有推送，写下的阶段会被之后的正式运行当作中断的运行续跑，
+        # 直接推送旧答案且不再查询预览之后变化的任务
+        run_dir = None if args.stats_only or args.dry_run else cfg.run_dir
+        checkpoints = open_checkpoints(cfg, periods, args.yesterday, run_dir, args.from_stage, args.days,
+                                       args.force)
+        # 两阶段推送：先发本地统计报告，AI 分析生成后以回复补发
+        preview = PreviewSender(notifier, args.yesterday, args.dry_run, args.days) \
+            if cfg.progressive_delivery and llm is not None else None
+        answers = run_reports(notion, summarizer, llm, periods, args.yesterday, checkpoints, args.days, preview)
+        deliver_reports(notifier, answers, args.yesterday, args.dry_run, checkpoints, args.days,
+                        preview.refs if preview else None)
+        overran = [period for period, answer in answers.items() if answer.startswith(FETCH_TIMEOUT_PREFIX)]
+        if overran:
+            logger.error(f"⏰ {', '.join(overran)} 查询超出时间预算，已输出降级结果")
+            sys.exit(1)
+
+    except DeadlineExceeded as e:
+        logger.error(f"⏰ 运行超出时间预算，已取消: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ 运行失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
-        # 发送通知
-        if args.dry_run:
-            logger.info("🏃 Dry-run mode → 不发送任何通知")
-            return
 
-        # 构建标题
-        if period == "three-days":
-            title = f"Task-Master 3-Day Trend Analysis · {datetime.now().date()}"
-        elif period == "daily" and args.yesterday:
-            yesterday = (datetime.now() - timedelta(days=1)).date()
-            title = f"Task-Master Daily Review · {yesterday}"
-        else:
-            title = f"Task-Master {period.title()} Review · {datetime.now().date()}"
+def _run_tenants(args: argparse.Namespace, run_dir: Optional[str] = None) -> None:
+    """多租户批量运行，任一租户失败时以状态码 1 退出"""
+    import json
+    from .tenants import load_tenants, run_batch
 
-        # 发送通知
-        push_results = notifier.notify_all(title, answer)
-
-        # 统计结果
-        succ = [k for k, v in push_results.items() if v]
-        fail = [k for k, v in push_results.items() if not v]
+    try:
+        tenants = load_tenants(args.tenants)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ 租户配置无效: {e}")
+        sys.exit(1)
 
-        logger.info("=" * 60)
-        logger.info(f"📨 推送完成:")
-        logger.info(f"   ✅ 成功: {succ}")
-        logger.info(f"   ❌ 失败: {fail}")
-        logger.info("=" * 60)
+    results = run_batch(
+        tenants, args.period, is_yesterday=args.yesterday, dry_run=args.dry_run,
+        workers=args.tenant_workers, llm_concurrency=args.llm_concurrency,
+        notion_rps=args.notion_rps, run_dir=run_dir, from_stage=args.from_stage,
+        trend_days=args.days, force=args.force
+    )
+    if args.batch_report:
+        with open(args.batch_report, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        logger.info(f"📝 批量运行结果已写入 {args.batch_report}")
 
-    except Exception as e:
-        logger.error(f"❌ 运行失败: {e}")
-        import traceback
-        traceback.print_exc()
+    if any(result["status"] != "ok" for result in results.values()):
         sys.exit(1)
 
 
@@ -1,19 +1,20 @@
 # src/notifier.py - 支持两个不同的Bot
-import smtplib
-import requests
 import re
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional, Dict, List, Tuple
+from typing import Any, Optional, Dict, Iterable, List, Tuple
+from . import codec
 from .config import Config
 from .utils import retry_on_failure, setup_logger
+from .profiling import span
+from .deadline import get_deadline
 
 logger = setup_logger(__name__)
 
 
 class Notifier:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, session=None):
         self.config = config
+        # 常驻进程传入 requests.Session 复用到 Telegram 的连接
+        self.session = session
 
     def _clean_markdown(self, text: str) -> str:
         """清理文本中的Markdown格式"""
@@ -49,14 +50,20 @@ class Notifier:
 
         return text.strip()
 
-    @retry_on_failure(max_retries=2)
     def send_telegram_with_token(self, message: str, title: str = "",
-                                 bot_token: str = None, chat_id: str = None) -> bool:
-        """使用指定的bot token发送消息到指定chat_id"""
+                                 bot_token: str = None, chat_id: str = None,
+                                 reply_to: Optional[int] = None) -> bool:
+        """使用指定的bot token发送消息到指定chat_id（reply_to 为要回复的消息 id）"""
+        return self._send_telegram(message, title, bot_token, chat_id, reply_to) is not None
+
+    @retry_on_failure(max_retries=2)
+    def _send_telegram(self, message: str, title: str = "", bot_token: str = None, chat_id: str = None,
+                       reply_to: Optional[int] = None) -> Optional[int]:
+        """发送 Telegram 消息，成功时返回消息 id（API 未返回时为 0），失败返回 None"""
 
         if not (bot_token and chat_id):
             logger.warning(f"Telegram配置不完整，跳过推送")
-            return False
+            return None
 
         try:
             # 清理消息中的Markdown格式
@@ -73,6 +80,8 @@ class Notifier:
             if len(full_message) > 8000:
                 full_message = full_message[:7997] + "..."
 
+            import requests
+
             url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
 
             # 确保 chat_id 是整数
@@ -80,92 +89,139 @@ class Notifier:
                 chat_id_int = int(chat_id)
             except (ValueError, TypeError):
                 logger.error(f"无效的 Telegram Chat ID: {chat_id}")
-                return False
+                return None
 
             payload = {
                 "chat_id": chat_id_int,
                 "text": full_message
             }
+            if reply_to:
+                # 两阶段推送：AI 分析作为统计消息的回复发出
+                payload["reply_to_message_id"] = reply_to
+                payload["allow_sending_without_reply"] = True
 
-            response = requests.post(url, json=payload, timeout=10)
+            with span("notify.telegram"):
+                response = (self.session or requests).post(url, json=payload,
+                                                           timeout=get_deadline().timeout("notify"))
 
             if response.status_code == 200:
                 logger.info(f"Telegram通知发送成功到 {chat_id}")
-                return True
+                try:
+                    return int((codec.response_json(response).get("result") or {}).get("message_id") or 0)
+                except (ValueError, TypeError, AttributeError):
+                    return 0
             else:
                 logger.error(f"Telegram API 错误 {response.status_code}: {response.text}")
-                return False
+                return None
 
         except Exception as e:
             logger.error(f"Telegram通知发送失败: {e}")
-            return False
-
-    def notify_all(self, title: str, content: str) -> Dict[str, bool]:
-        """发送所有可用的通知"""
+            return None
+
+    def notify_all(self, title: str, content: str,
+                   only: Optional[Iterable[str]] = None,
+                   reply_to: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+        """发送所有可用的通知
+
+        only 为渠道名集合（与返回值的键相同）时只发送这些渠道，用于续跑时仅重试失败的渠道。
+        reply_to 为 notify_preview 返回的 {渠道: 消息引用}，有引用的渠道以回复的形式发送。
+        未配置邮件时结果中不包含 email。
+        """
+        return {channel: ref is not None for channel, ref in self._dispatch(title, content, only, reply_to).items()}
+
+    def notify_preview(self, title: str, content: str) -> Dict[str, Any]:
+        """两阶段推送的第一条消息，返回 {渠道: 消息引用}（Telegram 为消息 id，邮件为 Message-ID，失败为 None）"""
+        return self._dispatch(title, content)
+
+    def _dispatch(self, title: str, content: str, only: Optional[Iterable[str]] = None,
+                  reply_to: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        reply_to = reply_to or {}
         results = {}
 
+        def wanted(channel: str) -> bool:
+            return only is None or channel in only
+
         # 发送到主账号（使用主Bot）
-        if self.config.telegram_bot_token and self.config.telegram_chat_id:
+        if self.config.telegram_bot_token and self.config.telegram_chat_id \
+                and wanted(f'telegram_{self.config.telegram_chat_id}'):
             logger.info(f"发送到主账号 (Bot 1): ...{self.config.telegram_chat_id[-4:]}")
-            success = self.send_telegram_with_token(
+            channel = f'telegram_{self.config.telegram_chat_id}'
+            results[channel] = self._send_telegram(
                 content, title,
                 self.config.telegram_bot_token,
-                self.config.telegram_chat_id
+                self.config.telegram_chat_id,
+                reply_to.get(channel)
             )
-            results[f'telegram_{self.config.telegram_chat_id}'] = success
 
         # 发送到副账号（使用副Bot或主Bot）
-        if self.config.telegram_chat_id_2:
+        if self.config.telegram_chat_id_2 and wanted(f'telegram_{self.config.telegram_chat_id_2}'):
             # 如果有专用的第二个Bot token，使用它；否则使用主Bot token
             bot_token_2 = self.config.telegram_bot_token_2 or self.config.telegram_bot_token
 
             if bot_token_2:
                 logger.info(
                     f"发送到副账号 (Bot {'2' if self.config.telegram_bot_token_2 else '1'}): ...{self.config.telegram_chat_id_2[-4:]}")
-                success = self.send_telegram_with_token(
+                channel = f'telegram_{self.config.telegram_chat_id_2}'
+                results[channel] = self._send_telegram(
                     content, title,
                     bot_token_2,
-                    self.config.telegram_chat_id_2
+                    self.config.telegram_chat_id_2,
+                    reply_to.get(channel)
                 )
-                results[f'telegram_{self.config.telegram_chat_id_2}'] = success
             else:
                 logger.warning("副账号配置不完整，跳过发送")
-                results[f'telegram_{self.config.telegram_chat_id_2}'] = False
+                results[f'telegram_{self.config.telegram_chat_id_2}'] = None
 
         # 邮件通知
-        if all([self.config.email_smtp_server, self.config.email_username, self.config.email_password]):
-            results['email'] = self.send_email(title, content)
-        else:
-            results['email'] = False
+        if all([self.config.email_smtp_server, self.config.email_username, self.config.email_password]) \
+                and wanted('email'):
+            results['email'] = self._send_email(title, content, in_reply_to=reply_to.get('email'))
 
         return results
 
-    @retry_on_failure(max_retries=2)
     def send_email(self, subject: str, content: str, to_email: Optional[str] = None) -> bool:
         """发送邮件通知"""
+        return self._send_email(subject, content, to_email) is not None
+
+    @retry_on_failure(max_retries=2)
+    def _send_email(self, subject: str, content: str, to_email: Optional[str] = None,
+                    in_reply_to: Optional[str] = None) -> Optional[str]:
+        """发送邮件，成功时返回 Message-ID；in_reply_to 使 AI 分析与统计邮件归入同一会话"""
         if not all([self.config.email_smtp_server, self.config.email_username, self.config.email_password]):
             logger.warning("邮件配置不完整，跳过发送")
-            return False
+            return None
 
         try:
+            # smtplib / email 仅在真正发邮件时才导入
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            from email.utils import make_msgid
+
             # 清理内容中的Markdown
             clean_content = self._clean_markdown(content)
 
             msg = MIMEMultipart()
             msg['From'] = self.config.email_username
             msg['To'] = to_email or self.config.email_username
-            msg['Subject'] = subject
+            msg['Subject'] = f"Re: {subject}" if in_reply_to else subject
+            msg['Message-ID'] = make_msgid()
+            if in_reply_to:
+                msg['In-Reply-To'] = in_reply_to
+                msg['References'] = in_reply_to
 
             msg.attach(MIMEText(clean_content, 'plain', 'utf-8'))
 
-            with smtplib.SMTP(self.config.email_smtp_server, 587) as server:
-                server.starttls()
-                server.login(self.config.email_username, self.config.email_password)
-                server.send_message(msg)
+            with span("notify.email"):
+                with smtplib.SMTP(self.config.email_smtp_server, 587,
+                                  timeout=get_deadline().timeout("notify")) as server:
+                    server.starttls()
+                    server.login(self.config.email_username, self.config.email_password)
+                    server.send_message(msg)
 
             logger.info(f"邮件发送成功: {subject}")
-            return True
+            return msg['Message-ID']
 
         except Exception as e:
             logger.error(f"邮件发送失败: {e}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -1,26 +1,41 @@
 # src/notion_client.py - 🔄 优化版
-import requests
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import date, timedelta, datetime
+from . import codec
 from .config import Config
 from .utils import retry_on_failure, setup_logger
+from .profiling import span
+from .deadline import get_deadline
 
 logger = setup_logger(__name__)
 
 
 class NotionClient:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, session=None, rate_limiter=None):
         self.config = config
+        # 常驻进程传入 requests.Session 复用 TLS 连接；CLI 单次运行直接用 requests
+        self.session = session
+        # 多租户批量运行时，同一 Notion token 的所有客户端共享一个限流器
+        self.rate_limiter = rate_limiter
         self.headers = {
             "Authorization": f"Bearer {config.notion_token}",
             "Notion-Version": "2022-06-28",
             "Content-Type": "application/json",
         }
 
-    @retry_on_failure(max_retries=3)
     def _query_tasks(self, start_date: date, end_date: date,
                      additional_filters: Optional[List[Dict]] = None) -> List[Dict]:
         """查询任务的通用方法（时间边界更精确）"""
+        results = list(self.iter_tasks(start_date, end_date, additional_filters))
+        logger.info(f"查询到 {len(results)} 个任务 ({start_date} 到 {end_date})")
+        return results
+
+    def iter_tasks(self, start_date: date, end_date: date,
+                   additional_filters: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """逐页拉取并逐个产出任务（按计划日期升序），内存中只保留当前一页
+
+        每一页单独重试，翻页中途失败不会从第一页重新拉取。
+        """
         from datetime import datetime, time, timedelta
         import pytz
 
@@ -68,13 +83,31 @@ class NotionClient:
             ]
         }
 
-        url = f"https://api.notion.com/v1/databases/{self.config.notion_db_id}/query"
-        response = requests.post(url, headers=self.headers, json=payload)
-        response.raise_for_status()
+        page = 1
+        while True:
+            data = self._query_page(payload, page)
+            yield from data.get("results", [])
 
-        results = response.json().get("results", [])
-        logger.info(f"查询到 {len(results)} 个任务 ({start_date} 到 {end_date})")
-        return results
+            # 多日窗口可能超过单页100条，按 next_cursor 继续翻页
+            if not data.get("has_more") or not data.get("next_cursor"):
+                break
+            payload["start_cursor"] = data["next_cursor"]
+            page += 1
+
+    @retry_on_failure(max_retries=3)
+    def _query_page(self, payload: Dict, page: int) -> Dict:
+        """请求一页查询结果"""
+        import requests
+
+        url = f"https://api.notion.com/v1/databases/{self.config.notion_db_id}/query"
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with span("notion.request", page=page):
+            response = (self.session or requests).post(url, headers=self.headers, data=codec.dumps(payload),
+                                                       timeout=get_deadline().timeout("fetch"))
+            response.raise_for_status()
+            # 一页 100 个任务的响应体直接从字节解码（装有 orjson 时不经过 str 和标准库 json）
+            return codec.response_json(response)
 
     def query_period_tasks(self, period: str) -> List[Dict]:
         """根据周期查询任务"""
@@ -85,6 +118,8 @@ class NotionClient:
     @retry_on_failure(max_retries=3)
     def create_review_page(self, title: str, content: str, parent_id: str) -> str:
         """创建复盘页面"""
+        import requests
+
         payload = {
             "parent": {"page_id": parent_id},
             "properties": {
@@ -103,13 +138,14 @@ class NotionClient:
             ]
         }
 
-        response = requests.post(
+        response = (self.session or requests).post(
             "https://api.notion.com/v1/pages",
             headers=self.headers,
-            json=payload
+            data=codec.dumps(payload),
+            timeout=get_deadline().timeout("notify")
         )
         response.raise_for_status()
-        return response.json()["id"]
+        return codec.response_json(response)["id"]
 
     def query_three_days_tasks(self) -> Dict[str, List[Dict]]:
         """查询最近三天的任务，按天分组返回"""
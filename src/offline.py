@@ -0,0 +1,295 @@
+# src/offline.py - 离线模式：导入 Notion 数据库导出（CSV / JSON），从本地存储查询任务
+import codecs
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .notion_client import NotionClient
+from .records import local_date_of, parse_datetime
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 导出文件按块解码，块大小只决定单次解码占用的内存
+CHUNK_SIZE = 1 << 20
+# 每积累这么多任务写一次分区，导入的内存占用与导出文件大小无关
+FLUSH_ROWS = 5000
+# 与 Notion API 的查询条件一致，只导入已完成的任务
+DONE_STATUS = "Done"
+
+# 导出的列名（CSV 表头 / 扁平 JSON 的键），与数据库属性同名
+TITLE, CATEGORY, PRIORITY, PLANNED, STATUS = "任务名称", "分类", "优先级", "计划日期", "状态"
+NUMBER_FIELDS = ("XP", "番茄数", "实际用时(min)")
+PAGE_PROPERTIES = (TITLE, CATEGORY, PRIORITY, PLANNED, STATUS) + NUMBER_FIELDS
+
+# Notion CSV 的日期随账号设置而不同，如 “June 5, 2025 8:00 AM (EDT) → 10:00 AM”、“2025/06/05 08:00”
+DATETIME_FORMATS = ("%B %d, %Y %I:%M %p", "%B %d, %Y %H:%M", "%Y/%m/%d %H:%M", "%m/%d/%Y %I:%M %p")
+DATE_FORMATS = ("%B %d, %Y", "%Y/%m/%d", "%m/%d/%Y")
+TIME_FORMATS = ("%I:%M %p", "%H:%M")
+_TZ_SUFFIX = re.compile(r"\s*\([^)]*\)\s*$")
+# Notion API 查询结果的外层：{"object": "list", "results": [...]}
+_RESULTS = re.compile(r'\{\s*(?:"object"\s*:\s*"list"\s*,\s*)?"results"\s*:\s*\[')
+
+
+def _parse_moment(value: str, day: Optional[date] = None) -> Optional[str]:
+    """导出中的单个时间 → ISO 字符串：仅日期时为 YYYY-MM-DD，带时刻时为本地时间（不带时区）
+
+    day 为开始日期：结束时间与开始同一天时 Notion 只导出时刻。
+    """
+    value = _TZ_SUFFIX.sub("", value.strip())
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value if len(value) == 10 else parsed.isoformat()
+    except ValueError:
+        pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).isoformat()
+        except ValueError:
+            continue
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    if day is not None:
+        for fmt in TIME_FORMATS:
+            try:
+                return datetime.combine(day, datetime.strptime(value, fmt).time()).isoformat()
+            except ValueError:
+                continue
+    raise ValueError(f"无法解析日期: {value}")
+
+
+def parse_export_date(value: str) -> Tuple[Optional[str], Optional[str]]:
+    """解析导出的计划日期（“开始 → 结束”），返回 (start, end) 两个 ISO 字符串"""
+    start_text, _, end_text = (value or "").partition("→")
+    start = _parse_moment(start_text)
+    if start is None:
+        return None, None
+    end = _parse_moment(end_text, date.fromisoformat(start[:10])) if end_text.strip() else None
+    return start, end
+
+
+def _number(value) -> float:
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value or "").replace(",", "").strip()
+    return float(text) if text else 0
+
+
+def normalize_row(row: Dict) -> Optional[Dict]:
+    """CSV 行 / 扁平 JSON 对象 / API 页面 → 与 Notion API 同构的精简页面，未完成的任务返回 None
+
+    只保留汇总用到的属性；CSV 行没有页面 id，由 ingest_export 按内容生成。
+    """
+    if "properties" in row:
+        props = row["properties"] or {}
+        status = ((props.get(STATUS) or {}).get("select") or {}).get("name")
+        if status and status != DONE_STATUS:
+            return None
+        page = {"id": row.get("id"), "properties": {key: props[key] for key in PAGE_PROPERTIES if key in props}}
+        if row.get("last_edited_time"):
+            page["last_edited_time"] = row["last_edited_time"]
+        return page
+
+    status = str(row.get(STATUS) or "").strip()
+    if status and status != DONE_STATUS:
+        return None
+    start, end = parse_export_date(str(row.get(PLANNED) or ""))
+    props = {
+        TITLE: {"title": [{"plain_text": str(row.get(TITLE) or "").strip()}]},
+        CATEGORY: {"select": {"name": str(row.get(CATEGORY) or "").strip() or "未分类"}},
+        PRIORITY: {"select": {"name": str(row.get(PRIORITY) or "").strip()}},
+        PLANNED: {"date": {"start": start, "end": end}},
+    }
+    for key in NUMBER_FIELDS:
+        props[key] = {"formula": {"number": _number(row.get(key))}}
+    page = {"id": row.get("id"), "properties": props}
+    if row.get("last_edited_time"):
+        page["last_edited_time"] = row["last_edited_time"]
+    return page
+
+
+def _decoded_chunks(mapped) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for offset in range(0, len(mapped), CHUNK_SIZE):
+        yield decoder.decode(mapped[offset:offset + CHUNK_SIZE])
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _iter_csv(mapped) -> Iterator[Dict]:
+    # 按行切分字节再解码：换行符不会出现在 UTF-8 多字节字符中间；带换行的引号字段由 csv 跨行拼接
+    lines = (line.decode("utf-8-sig" if i == 0 else "utf-8")
+             for i, line in enumerate(iter(mapped.readline, b"")))
+    yield from csv.DictReader(lines)
+
+
+def _iter_json(mapped) -> Iterator[Dict]:
+    """JSON 数组、API 查询结果 {"results": [...]} 或 JSON Lines，按块解码并逐个产出对象"""
+    decoder = json.JSONDecoder()
+    chunks = _decoded_chunks(mapped)
+    buffer, pos = "", 0
+
+    def fill() -> bool:
+        nonlocal buffer, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer, pos = buffer[pos:] + chunk, 0
+        return True
+
+    def peek(separators: str = "") -> Optional[str]:
+        """跳过空白和分隔符，返回下一个字符（文件结束时为 None）"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in separators):
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return None
+
+    def decode() -> Dict:
+        nonlocal pos
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                # 对象跨越了块边界：补读一块再试
+                if not fill():
+                    raise
+        if not isinstance(value, dict):
+            raise ValueError(f"导出中的元素应为对象，实际为 {type(value).__name__}")
+        return value
+
+    first = peek()
+    if first is None:
+        return
+    while first == "{" and len(buffer) - pos < 256 and fill():
+        pass  # 外层 {"object": "list", "results": [ 可能跨越块边界
+    match = _RESULTS.match(buffer, pos) if first == "{" else None
+    if first == "[" or match:
+        pos = match.end() if match else pos + 1
+        while peek(",") not in (None, "]"):
+            yield decode()
+        return
+    while peek() is not None:
+        yield decode()
+
+
+def iter_export(path: str) -> Iterator[Dict]:
+    """内存映射读取导出文件，逐行（CSV）或逐个对象（JSON）产出，不把整个文件读入内存"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in (".csv", ".json", ".jsonl", ".ndjson"):
+        raise ValueError(f"不支持的导出格式: {path}（需要 .csv / .json / .jsonl）")
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from (_iter_csv(mapped) if suffix == ".csv" else _iter_json(mapped))
+
+
+def _start_key(task: Dict, tz) -> float:
+    start = ((task["properties"].get(PLANNED) or {}).get("date") or {}).get("start")
+    return parse_datetime(start, tz).timestamp()
+
+
+def ingest_export(path: str, store, timezone: str, replace: bool = True,
+                  flush_rows: int = FLUSH_ROWS) -> Dict[str, int]:
+    """把导出文件按计划日期的本地日期写入 store 的 tasks 分区，返回各项计数
+
+    导出视为数据库在其日期范围内的完整快照：本次出现的日期整天覆盖（同一天的任务分散在多批中时追加），
+    replace 为 True 时删除该范围（最早到最晚的计划日期）内导出中已不存在的日期，
+    范围之外的已有日期保持不变（如先导入全量历史、再导入最近一个月的导出）。
+    分区内的任务按计划日期升序，与 API 一致。
+    """
+    import pytz
+
+    tz = pytz.timezone(timezone)
+    pending: Dict[date, List[Dict]] = {}
+    written: Set[date] = set()
+    counts = {"rows": 0, "tasks": 0, "skipped": 0}
+
+    def flush() -> None:
+        for day, tasks in pending.items():
+            existing = store.load_tasks(day) if day in written else []
+            ids = {task.get("id") for task in existing}
+            for task in tasks:
+                if task.get("id") is None:
+                    # CSV 没有页面 id：按内容生成，完全相同的任务依次加序号（回填按 id 去重）
+                    base = "export-" + hashlib.sha1(json.dumps(
+                        task, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:20]
+                    task["id"], n = base, 0
+                    while task["id"] in ids:
+                        n += 1
+                        task["id"] = f"{base}-{n}"
+                ids.add(task["id"])
+            store.save_tasks(day, sorted(existing + tasks, key=lambda task: _start_key(task, tz)))
+            written.add(day)
+        pending.clear()
+
+    buffered = 0
+    for row in iter_export(path):
+        counts["rows"] += 1
+        try:
+            task = normalize_row(row)
+            day = local_date_of(task["properties"][PLANNED]["date"]["start"], tz) if task else None
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning(f"⚠️ 跳过无法解析的第 {counts['rows']} 条记录: {e}")
+            day = None
+        if day is None:
+            # 未完成或没有计划日期的任务与 API 查询一样不导入
+            counts["skipped"] += 1
+            continue
+        pending.setdefault(day, []).append(task)
+        counts["tasks"] += 1
+        buffered += 1
+        if buffered >= flush_rows:
+            flush()
+            buffered = 0
+    flush()
+
+    if replace and written:
+        first, last = min(written), max(written)
+        removed = [day for day in store.partition_days("tasks") if first <= day <= last and day not in written]
+        for day in removed:
+            store.delete_partition("tasks", day)
+        if removed:
+            logger.info(f"🗑️ 删除导出中已不存在的 {len(removed)} 天: {', '.join(day.isoformat() for day in removed)}")
+    counts["days"] = len(written)
+    logger.info(f"📦 已导入 {path}: {counts['tasks']} 个任务, {counts['days']} 天, 跳过 {counts['skipped']} 条")
+    return counts
+
+
+class OfflineNotionClient(NotionClient):
+    """离线模式：任务来自导入本地存储的数据库导出，不访问 Notion API
+
+    查询语义与 NotionClient 相同（计划日期的本地日期落在窗口内，按计划日期升序），
+    因此汇总、报告、回填等命令无需改动即可离线运行。
+    """
+
+    def __init__(self, config, store):
+        super().__init__(config)
+        self.store = store
+
+    def iter_tasks(self, start_date: date, end_date: date,
+                   additional_filters: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        if additional_filters:
+            raise ValueError("离线模式不支持额外的查询过滤条件")
+        day = start_date
+        while day <= end_date:
+            yield from self.store.load_tasks(day)
+            day += timedelta(days=1)
+
+    def create_review_page(self, title: str, content: str, parent_id: str) -> str:
+        raise RuntimeError("离线模式不能创建 Notion 页面")
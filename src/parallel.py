@@ -0,0 +1,150 @@
+# src/parallel.py - 多进程解析与按天汇总：全量历史回填时把任务分片交给进程池
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from .records import TaskRecord, parse_task
+from .rollup import DayRollup, build_day_rollups
+from .taxonomy import ENTERTAINMENT, SLEEP
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 少于此数时进程启动与数据传输的开销得不偿失，仍在本进程内解析
+PARALLEL_MIN_TASKS = 20000
+# 每个分片的任务数：足够大以摊薄每次提交的开销，又能在各进程间均匀分配
+CHUNK_TASKS = 2000
+
+PackedRecord = tuple  # 见 pack_record
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_ZONES: Dict[int, timezone] = {}
+
+
+def _pack_moment(moment: Optional[datetime]) -> Optional[Tuple[int, Optional[int]]]:
+    if moment is None:
+        return None
+    micros = (moment - _EPOCH) // _MICROSECOND
+    # 带偏移量的 ISO 时间解析为固定偏移；仅日期或不带时区的值由配置的时区本地化，偏移记为 None
+    if isinstance(moment.tzinfo, timezone):
+        return micros, int(moment.utcoffset().total_seconds())
+    return micros, None
+
+
+def _unpack_moment(packed: Optional[Tuple[int, Optional[int]]], tz) -> Optional[datetime]:
+    if packed is None:
+        return None
+    micros, offset = packed
+    moment = _EPOCH + timedelta(microseconds=micros)
+    if offset is None:
+        # 重新挂上配置的时区（pytz 按该时刻选择夏令时/冬令时），与本进程解析的结果一致
+        return moment.astimezone(tz)
+    zone = _ZONES.get(offset)
+    if zone is None:
+        zone = _ZONES[offset] = timezone(timedelta(seconds=offset))
+    return moment.astimezone(zone)
+
+
+def pack_record(record: TaskRecord) -> PackedRecord:
+    """TaskRecord → 只含基本类型的元组，跨进程传输比 pickle 数据类和带 pytz 时区的时间便宜得多
+
+    时间保存为 UTC 微秒数和原始 UTC 偏移（本地化到配置时区的时间只记时区），
+    还原后时刻、本地时间和时区对象都与原记录一致。
+    """
+    return (record.id, record.title, record.category, record.is_mit, record.xp, record.tomatoes,
+            record.actual_minutes, _pack_moment(record.start), _pack_moment(record.end),
+            record.local_date.toordinal() if record.local_date else 0, record.activities)
+
+
+def unpack_record(packed: PackedRecord, tz) -> TaskRecord:
+    """pack_record 的逆操作；tz 为解析时使用的时区"""
+    task_id, title, category, is_mit, xp, tomatoes, minutes, start, end, ordinal, activities = packed
+    return TaskRecord(id=task_id, title=title, category=category, is_mit=is_mit, xp=xp, tomatoes=tomatoes,
+                      actual_minutes=minutes, start=_unpack_moment(start, tz), end=_unpack_moment(end, tz),
+                      local_date=date.fromordinal(ordinal) if ordinal else None,
+                      is_sleep=SLEEP in activities, is_entertainment=ENTERTAINMENT in activities,
+                      activities=activities)
+
+
+# 子进程的解析上下文，由 _init_worker 在进程启动时设置一次
+_worker_tz = None
+_worker_taxonomy = None
+
+
+def _init_worker(timezone_name: str, taxonomy) -> None:
+    import pytz
+
+    global _worker_tz, _worker_taxonomy
+    _worker_tz = pytz.timezone(timezone_name)
+    _worker_taxonomy = taxonomy
+
+
+def _parse_chunk(tasks: List[Dict]) -> List[PackedRecord]:
+    return [pack_record(parse_task(task, _worker_tz, _worker_taxonomy)) for task in tasks]
+
+
+def _rollup_chunk(days: List[Tuple[int, List[PackedRecord], List[PackedRecord]]]) -> List[Tuple[int, List[DayRollup]]]:
+    """按天重建汇总行（部分聚合），父进程只需收回每天几行结果"""
+    return [(ordinal, build_day_rollups(date.fromordinal(ordinal), [unpack_record(row, _worker_tz) for row in rows],
+                                        _worker_tz, [unpack_record(row, _worker_tz) for row in spills]))
+            for ordinal, rows, spills in days]
+
+
+class ParallelParser:
+    """进程池解析：页面分片交给子进程解析为紧凑记录，按天汇总也在子进程中完成
+
+    同一个汇总器的多次调用共用一个进程池（首次使用时创建，用 spawn 启动，
+    与回填的线程池并存也不会继承其他线程持有的锁）。
+    """
+
+    def __init__(self, workers: int, timezone_name: str, taxonomy, chunk_tasks: int = CHUNK_TASKS):
+        self.workers = workers
+        self.timezone_name = timezone_name
+        self.taxonomy = taxonomy
+        self.chunk_tasks = chunk_tasks
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._tz = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.timezone_name, self.taxonomy))
+                logger.info(f"🧵 并行解析: 启动 {self.workers} 个进程")
+            return self._pool
+
+    def parse(self, tasks: List[Dict]) -> List[TaskRecord]:
+        import pytz
+
+        if self._tz is None:
+            self._tz = pytz.timezone(self.timezone_name)
+        chunks = [tasks[i:i + self.chunk_tasks] for i in range(0, len(tasks), self.chunk_tasks)]
+        return [unpack_record(row, self._tz) for rows in self._executor().map(_parse_chunk, chunks) for row in rows]
+
+    def build_rollups(self, days: List[date], groups: Dict[Optional[date], List[int]],
+                      spills: Dict[date, List[int]], records: List[TaskRecord]) -> Dict[date, List[DayRollup]]:
+        """重建指定日期的汇总行，按任务数把日期均匀切成若干分片"""
+        chunks, chunk, size = [], [], 0
+        for day in days:
+            chunk.append((day.toordinal(), [pack_record(records[i]) for i in groups[day]],
+                          [pack_record(records[i]) for i in spills.get(day, [])]))
+            size += len(groups[day])
+            if size >= self.chunk_tasks:
+                chunks.append(chunk)
+                chunk, size = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return {date.fromordinal(ordinal): rows
+                for built in self._executor().map(_rollup_chunk, chunks) for ordinal, rows in built}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
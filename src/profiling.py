@@ -0,0 +1,135 @@
+# src/profiling.py - 轻量级分段计时（span）
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Profiler:
+    """记录流水线各阶段耗时，支持嵌套与多线程
+
+    每个 span 记录名称、完整路径（如 report.daily/llm/llm.request）、
+    所在线程、相对启动时间的开始时刻与耗时。开销仅为两次 perf_counter，
+    因此默认常开，--profile 时再输出报告。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+        # 开启后每个 span 结束时都写日志，即使进程被 Actions 超时杀掉也能看到已完成的阶段
+        self.log_spans = False
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        """计时上下文；yield 出的 attrs 字典可在块内追加属性（如结果条数）"""
+        stack = self._stack()
+        path = "/".join(stack + [name])
+        stack.append(name)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record = {
+                "name": name,
+                "path": path,
+                "thread": threading.current_thread().name,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+            }
+            if attrs:
+                record["attrs"] = attrs
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.spans.append(record)
+            if self.log_spans:
+                logger.info(f"⏱️ {path}: {record['duration_ms']:.1f}ms" + (f" ❌ {error}" if error else ""))
+
+    def bind(self, func: Callable) -> Callable:
+        """包装提交到线程池的函数，使子线程中的 span 挂在当前 span 之下"""
+        parent = list(self._stack())
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            self._local.stack = list(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.stack = []
+        return wrapper
+
+    def summary(self) -> Dict[str, Dict]:
+        """按路径汇总：调用次数、总耗时、最大耗时"""
+        with self._lock:
+            spans = list(self.spans)
+        result: Dict[str, Dict] = {}
+        for record in sorted(spans, key=lambda r: r["start_ms"]):
+            item = result.setdefault(record["path"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            item["count"] += 1
+            item["total_ms"] = round(item["total_ms"] + record["duration_ms"], 3)
+            item["max_ms"] = max(item["max_ms"], record["duration_ms"])
+        return result
+
+    def report(self) -> Dict:
+        """生成 JSON 计时报告"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda r: r["start_ms"])
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": self.summary(),
+            "spans": spans,
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        logger.info(f"📝 计时报告已写入 {path}")
+
+    def log_summary(self) -> None:
+        """把各阶段耗时以表格形式打到日志"""
+        report = self.report()
+        logger.info("=" * 60)
+        logger.info(f"⏱️ 阶段耗时（总计 {report['total_ms'] / 1000:.2f}s）:")
+        for path, item in report["stages"].items():
+            indent = "  " * path.count("/")
+            logger.info(f"   {indent}{path.rsplit('/', 1)[-1]}: {item['total_ms']:.1f}ms"
+                        f" ×{item['count']} (max {item['max_ms']:.1f}ms)")
+        logger.info("=" * 60)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = []
+        self.started = time.perf_counter()
+
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """进程级默认 Profiler"""
+    return _profiler
+
+
+def span(name: str, **attrs):
+    """在默认 Profiler 上记录一个 span"""
+    return _profiler.span(name, **attrs)
+
@@ -0,0 +1,98 @@
+# src/records.py - Notion 页面 → 扁平任务记录
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+from .taxonomy import DEFAULT_TAXONOMY, ENTERTAINMENT, SLEEP, ActivityTaxonomy
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class TaskRecord:
+    """从 Notion 页面解析出的任务字段，每个任务只解析一次
+
+    start / end 均为带时区的时间；end 为 None 表示页面没有结束时间。
+    """
+    id: Optional[str]
+    title: str
+    category: str
+    is_mit: bool
+    xp: float
+    tomatoes: float
+    actual_minutes: float
+    start: Optional[datetime]
+    end: Optional[datetime]
+    local_date: Optional[date]
+    is_sleep: bool
+    is_entertainment: bool
+    activities: Tuple[str, ...] = ()  # 命中的活动类别（按配置顺序，含 sleep / entertainment）
+
+    @property
+    def span_end(self) -> Optional[datetime]:
+        """没有结束时间的任务视为在开始时刻结束"""
+        return self.end or self.start
+
+
+def _select_name(props: Dict, key: str, default: str) -> str:
+    return ((props.get(key) or {}).get("select") or {}).get("name") or default
+
+
+def _formula_number(props: Dict, key: str) -> float:
+    return ((props.get(key) or {}).get("formula") or {}).get("number") or 0
+
+
+def parse_datetime(value: Optional[str], tz) -> Optional[datetime]:
+    """解析 Notion 的 ISO 时间；仅有日期或不带时区的值按本地时区处理"""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = tz.localize(dt)
+    return dt
+
+
+def local_date_of(start_iso: Optional[str], tz) -> Optional[date]:
+    """计划日期开始时间对应的本地日期（仅有日期的值直接视为本地日期）"""
+    if not start_iso:
+        return None
+    if len(start_iso) == 10:
+        return date.fromisoformat(start_iso)
+    return parse_datetime(start_iso, tz).astimezone(tz).date()
+
+
+def parse_task(task: Dict, tz, taxonomy: Optional[ActivityTaxonomy] = None) -> TaskRecord:
+    """把一个 Notion 页面解析为 TaskRecord（时间无法解析时 start/end 为 None）"""
+    props = task.get("properties") or {}
+
+    title_items = (props.get("任务名称") or {}).get("title") or []
+    title = (title_items[0].get("plain_text") if title_items else None) or "（无标题）"
+    category = _select_name(props, "分类", "未分类")
+
+    date_prop = (props.get("计划日期") or {}).get("date") or {}
+    start_iso = date_prop.get("start")
+    end_iso = date_prop.get("end")
+    start = end = local_date = None
+    try:
+        start = parse_datetime(start_iso, tz)
+        end = parse_datetime(end_iso, tz) if start else None
+        local_date = local_date_of(start_iso, tz)
+    except ValueError:
+        logger.warning(f"无法解析任务日期: {start_iso}, 任务ID: {task.get('id', 'unknown')}")
+
+    activities = (taxonomy or DEFAULT_TAXONOMY).classify(title, category)
+    return TaskRecord(
+        id=task.get("id"),
+        title=title,
+        category=category,
+        is_mit=_select_name(props, "优先级", "") == "MIT",
+        xp=_formula_number(props, "XP"),
+        tomatoes=_formula_number(props, "番茄数"),
+        actual_minutes=_formula_number(props, "实际用时(min)"),
+        start=start,
+        end=end,
+        local_date=local_date,
+        is_sleep=SLEEP in activities,
+        is_entertainment=ENTERTAINMENT in activities,
+        activities=activities,
+    )
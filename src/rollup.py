@@ -0,0 +1,262 @@
+# src/rollup.py - 按本地日期 × 分类物化的汇总行
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .intervals import clip_to_day, sweep
+from .records import TaskRecord
+from .taxonomy import BUILTIN_CLASSES
+
+# 每天额外一行跨分类的合计（合并工时不能按分类直接相加）
+ALL_CATEGORIES = "*"
+# 汇总行的字段或口径变化时递增，使旧的物化结果全部失效
+ROLLUP_VERSION = 3
+
+
+@dataclass
+class DayRollup:
+    """某一本地日期、某一分类的紧凑汇总"""
+    day: Optional[date]
+    category: str
+    count: int = 0
+    xp: float = 0
+    tomatoes: float = 0
+    actual_minutes: float = 0
+    mit_count: int = 0
+    earliest_start: Optional[datetime] = None
+    latest_end: Optional[datetime] = None
+    work_hours: float = 0  # 非睡眠任务合并重叠后、落在当天的时长
+    sleep_hours: float = 0
+    entertainment_hours: float = 0
+    overlap_hours: float = 0  # 多任务并行时长（仅合计行）
+    idle_hours: float = 0  # 任务之间的空档（仅合计行）
+    context_switches: int = 0  # 分类切换次数（仅合计行）
+    activity_hours: Dict[str, float] = field(default_factory=dict)  # 自定义活动类别的时长
+
+    def add(self, record: TaskRecord) -> None:
+        self.count += 1
+        self.xp += record.xp
+        self.tomatoes += record.tomatoes
+        self.actual_minutes += record.actual_minutes
+        self.mit_count += int(record.is_mit)
+        if record.start:
+            if self.earliest_start is None or record.start < self.earliest_start:
+                self.earliest_start = record.start
+            if self.latest_end is None or record.span_end > self.latest_end:
+                self.latest_end = record.span_end
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        for key in ("day", "earliest_start", "latest_end"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DayRollup':
+        data = dict(data)
+        if data.get("day"):
+            data["day"] = date.fromisoformat(data["day"])
+        for key in ("earliest_start", "latest_end"):
+            if data.get(key):
+                data[key] = datetime.fromisoformat(data[key])
+        return cls(**data)
+
+
+def merge_intervals(periods: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """合并重叠的时间段"""
+    sorted_periods = sorted(periods, key=lambda x: x[0])
+    if not sorted_periods:
+        return []
+    merged = [sorted_periods[0]]
+    for current_start, current_end in sorted_periods[1:]:
+        if current_start < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], current_end))
+        else:
+            merged.append((current_start, current_end))
+    return merged
+
+
+def _hours(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 3600
+
+
+def build_day_rollups(day: Optional[date], records: List[TaskRecord], tz=None,
+                      spill: Iterable[TaskRecord] = ()) -> List[DayRollup]:
+    """构建某一天的汇总行：首行为跨分类合计，其后按分类首次出现的顺序
+
+    计数、XP、睡眠和娱乐时长按任务开始日期归属；工作时间线由扫描线引擎计算，
+    给定 tz 时裁剪到当天的本地 0 点到 24 点，spill 为前几天开始、跨午夜延续到当天的任务。
+    """
+    total = DayRollup(day=day, category=ALL_CATEGORIES)
+    rows: Dict[str, DayRollup] = {}
+    work_intervals = []
+
+    for record in records:
+        row = rows.get(record.category)
+        if row is None:
+            row = rows[record.category] = DayRollup(day=day, category=record.category)
+        for target in (total, row):
+            target.add(record)
+
+        # 时间分配只统计同时有开始和结束时间的任务
+        if record.start and record.end:
+            duration = _hours(record.start, record.end)
+            if record.is_sleep:
+                total.sleep_hours += duration
+                row.sleep_hours += duration
+            else:
+                work_intervals.append((record.start, record.end, record.category))
+                if record.is_entertainment:
+                    total.entertainment_hours += duration
+                    row.entertainment_hours += duration
+            for activity in record.activities:
+                if activity not in BUILTIN_CLASSES:
+                    for target in (total, row):
+                        target.activity_hours[activity] = target.activity_hours.get(activity, 0) + duration
+
+    for record in spill:
+        if record.start and record.end and not record.is_sleep:
+            work_intervals.append((record.start, record.end, record.category))
+            rows.setdefault(record.category, DayRollup(day=day, category=record.category))
+
+    if day is not None and tz is not None:
+        work_intervals = clip_to_day(work_intervals, day, tz)
+    account = sweep(work_intervals)
+    total.work_hours = account.busy_hours
+    total.overlap_hours = account.overlap_hours
+    total.idle_hours = account.idle_hours
+    total.context_switches = account.context_switches
+    for category, row in rows.items():
+        row.work_hours = account.category_hours.get(category, 0)
+    return [total] + list(rows.values())
+
+
+def day_fingerprint(tasks: List[Dict], timezone: str, taxonomy: str = "") -> str:
+    """某天任务集合的指纹：任务增删、任一任务被编辑或活动分类规则变化都会改变指纹"""
+    digest = hashlib.sha1(f"{ROLLUP_VERSION}|{timezone}|{taxonomy}".encode())
+    keys = []
+    for task in tasks:
+        edited = task.get("last_edited_time")
+        if edited:
+            keys.append(f"{task.get('id')}@{edited}")
+        else:
+            # 没有编辑时间（如导出数据）时退化为内容哈希
+            keys.append(json.dumps(task, sort_keys=True, ensure_ascii=False, default=str))
+    for key in sorted(keys):
+        digest.update(key.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _activity_hours(totals: List[DayRollup]) -> Dict[str, float]:
+    hours: Dict[str, float] = {}
+    for row in totals:
+        for activity, value in row.activity_hours.items():
+            hours[activity] = hours.get(activity, 0) + value
+    return {activity: round(value, 1) for activity, value in hours.items()}
+
+
+def combine_rollups(rows: Iterable[DayRollup], tz) -> Dict:
+    """把任意天数的汇总行合并为日报/周报/月报统计（与 get_detailed_stats 口径一致）"""
+    totals = []
+    categories: Dict[str, int] = {}
+    category_hours: Dict[str, float] = {}
+    for row in rows:
+        if row.category == ALL_CATEGORIES:
+            totals.append(row)
+        elif row.count:
+            categories[row.category] = categories.get(row.category, 0) + row.count
+            category_hours[row.category] = category_hours.get(row.category, 0) + row.work_hours
+        elif row.work_hours:
+            # 只有跨午夜延续时间的分类
+            category_hours[row.category] = category_hours.get(row.category, 0) + row.work_hours
+
+    total_xp = sum(row.xp for row in totals)
+    total_tomatoes = sum(row.tomatoes for row in totals)
+    starts = [row.earliest_start for row in totals if row.earliest_start]
+    ends = [row.latest_end for row in totals if row.latest_end]
+
+    work_start_str, work_end_str, focus_span_str = "无", "无", "无"
+    if starts and ends:
+        earliest_start, latest_end = min(starts), max(ends)
+        work_start_str = earliest_start.astimezone(tz).strftime("%H:%M")
+        work_end_str = latest_end.astimezone(tz).strftime("%H:%M")
+        focus_span_str = f"{_hours(earliest_start, latest_end):.1f}小时"
+
+    return {
+        "total": sum(row.count for row in totals),
+        "xp": total_xp,
+        "tomatoes": total_tomatoes,
+        "xp_per_tomato": round(total_xp / total_tomatoes, 2) if total_tomatoes > 0 else 0,
+        "cats": categories,
+        "mit_count": sum(row.mit_count for row in totals),
+        "work_start": work_start_str,
+        "work_end": work_end_str,
+        "work_hours": round(sum(row.actual_minutes for row in totals) / 60, 1),
+        "focus_span": focus_span_str,
+        "busy_hours": round(sum(row.work_hours for row in totals), 1),
+        "overlap_hours": round(sum(row.overlap_hours for row in totals), 1),
+        "idle_hours": round(sum(row.idle_hours for row in totals), 1),
+        "context_switches": sum(row.context_switches for row in totals),
+        "category_hours": {category: round(hours, 1) for category, hours in category_hours.items()},
+        "activity_hours": _activity_hours(totals),
+    }
+
+
+class RollupAccumulator:
+    """把逐天到来的汇总行折叠成一行合计 + 每个分类一行，内存与天数无关
+
+    rows() 交给 combine_rollups 的结果与直接合并全部汇总行完全一致（累加顺序相同）。
+    """
+
+    def __init__(self):
+        self.total = DayRollup(day=None, category=ALL_CATEGORIES)
+        self.categories: Dict[str, DayRollup] = {}
+
+    def add(self, rows: Iterable[DayRollup]) -> None:
+        for row in rows:
+            if row.category == ALL_CATEGORIES:
+                target = self.total
+            else:
+                target = self.categories.get(row.category)
+                if target is None:
+                    target = self.categories[row.category] = DayRollup(day=None, category=row.category)
+            _fold(target, row)
+
+    def rows(self) -> List[DayRollup]:
+        return [self.total] + list(self.categories.values())
+
+
+def _fold(target: DayRollup, row: DayRollup) -> None:
+    for key in ("count", "xp", "tomatoes", "actual_minutes", "mit_count", "work_hours", "sleep_hours",
+                "entertainment_hours", "overlap_hours", "idle_hours", "context_switches"):
+        setattr(target, key, getattr(target, key) + getattr(row, key))
+    if row.earliest_start and (target.earliest_start is None or row.earliest_start < target.earliest_start):
+        target.earliest_start = row.earliest_start
+    if row.latest_end and (target.latest_end is None or row.latest_end > target.latest_end):
+        target.latest_end = row.latest_end
+    for activity, hours in row.activity_hours.items():
+        target.activity_hours[activity] = target.activity_hours.get(activity, 0) + hours
+
+
+def trend_stats(rows: Iterable[DayRollup]) -> Dict:
+    """由汇总行得到趋势报告使用的单日统计（与 get_trend_stats 口径一致）"""
+    totals = [row for row in rows if row.category == ALL_CATEGORIES]
+    total_xp = sum(row.xp for row in totals)
+    total_tomatoes = sum(row.tomatoes for row in totals)
+    return {
+        "total": sum(row.count for row in totals),
+        "xp": total_xp,
+        "tomatoes": total_tomatoes,
+        "xp_per_tomato": round(total_xp / total_tomatoes, 2) if total_tomatoes > 0 else 0,
+        "mit_count": sum(row.mit_count for row in totals),
+        "actual_work_hours": round(sum(row.work_hours for row in totals), 1),
+        "sleep_hours": round(sum(row.sleep_hours for row in totals), 1),
+        "entertainment_hours": round(sum(row.entertainment_hours for row in totals), 1),
+        "overlap_hours": round(sum(row.overlap_hours for row in totals), 1),
+        "idle_hours": round(sum(row.idle_hours for row in totals), 1),
+        "context_switches": sum(row.context_switches for row in totals),
+        "activity_hours": _activity_hours(totals),
+    }
@@ -0,0 +1,150 @@
+# src/scheduler.py - 进程内 cron 调度器（serve 模式）
+import signal
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class CronSchedule:
+    """标准 5 段 cron 表达式：分 时 日 月 周
+
+    每段支持 `*`、`*/n`、`a-b`、`a-b/n` 以及逗号列表；周几 0 和 7 都表示周日。
+    与 cron 一致，日和周几同时受限时满足任一即可。
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expression!r}")
+        self.expression = expression
+        fields = [self._parse_field(part, lo, hi) for part, (lo, hi) in zip(parts, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        # 统一为 Python 的 weekday()：周一=0 … 周日=6
+        self.weekdays = {(d - 1) % 7 for d in weekdays}
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(part: str, lo: int, hi: int) -> Set[int]:
+        values = set()
+        for item in part.split(","):
+            step = 1
+            if "/" in item:
+                item, step_str = item.split("/", 1)
+                step = int(step_str)
+                if step <= 0:
+                    raise ValueError(f"cron 步长必须为正数: {part!r}")
+            if item == "*":
+                start, end = lo, hi
+            elif "-" in item:
+                start, end = (int(x) for x in item.split("-", 1))
+            else:
+                start = end = int(item)
+            if start < lo or end > hi or start > end:
+                raise ValueError(f"cron 字段超出范围 [{lo}, {hi}]: {part!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = day.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, moment: datetime) -> datetime:
+        """返回严格晚于 moment 的下一个触发时刻（与 moment 相同的本地挂钟时间语义）"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        # 最多向前找 5 年（覆盖 2 月 29 日这类稀疏表达式）
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"cron 表达式永远不会触发: {self.expression!r}")
+
+
+@dataclass
+class ScheduledJob:
+    """一个定时任务：name 用于日志，action 为无参可调用对象"""
+    name: str
+    schedule: CronSchedule
+    action: Callable[[], None]
+    next_run: Optional[datetime] = field(default=None, compare=False)
+
+
+class Scheduler:
+    """单线程顺序执行的进程内调度器
+
+    所有时间按 timezone 的本地挂钟计算；收到 SIGINT/SIGTERM 后
+    不再启动新任务，等待当前任务完成后退出。
+    """
+
+    def __init__(self, timezone: str, jobs: Optional[List[ScheduledJob]] = None,
+                 poll_seconds: float = 30.0):
+        import pytz
+
+        self.tz = pytz.timezone(timezone)
+        self.jobs: List[ScheduledJob] = list(jobs or [])
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+
+    def add_job(self, name: str, cron: str, action: Callable[[], None]) -> ScheduledJob:
+        job = ScheduledJob(name=name, schedule=CronSchedule(cron), action=action)
+        self.jobs.append(job)
+        return job
+
+    def _now(self) -> datetime:
+        return datetime.now(self.tz).replace(tzinfo=None)
+
+    def _to_aware(self, local: datetime) -> datetime:
+        return self.tz.localize(local)
+
+    def install_signal_handlers(self) -> None:
+        """SIGINT / SIGTERM → 优雅退出"""
+        def handle(signum, _frame):
+            logger.info(f"🛑 收到信号 {signal.Signals(signum).name}，等待当前任务完成后退出...")
+            self.stop_event.set()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run_forever(self) -> None:
+        now = self._now()
+        for job in self.jobs:
+            job.next_run = job.schedule.next_after(now)
+            logger.info(f"🗓️ {job.name}: `{job.schedule.expression}` → 下次运行 {job.next_run}")
+
+        while not self.stop_event.is_set() and self.jobs:
+            job = min(self.jobs, key=lambda j: j.next_run)
+            wait = (self._to_aware(job.next_run) - datetime.now(self.tz)).total_seconds()
+            if wait > 0:
+                # 分段等待：既能及时响应停止信号，也能容忍系统休眠/时钟调整
+                self.stop_event.wait(min(wait, self.poll_seconds))
+                continue
+
+            logger.info(f"▶️ 运行定时任务 {job.name}（计划时间 {job.next_run}）")
+            try:
+                job.action()
+            except Exception as e:
+                logger.error(f"❌ 定时任务 {job.name} 失败: {e}")
+            # 以当前时间为基准计算下一次，任务耗时超过间隔时不会补跑堆积
+            job.next_run = job.schedule.next_after(self._now())
+            logger.info(f"🗓️ {job.name}: 下次运行 {job.next_run}")
+
+        logger.info("👋 调度器已停止")
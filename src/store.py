@@ -0,0 +1,246 @@
+# src/store.py - 本地按天分区存储
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from . import codec
+from .rollup import DayRollup
+from .utils import setup_logger
+
+if TYPE_CHECKING:
+    from .hierarchy import PeriodSummary
+
+logger = setup_logger(__name__)
+
+# 分区文件：键名去重后的 JSON，再经 zlib 压缩；旧版未压缩的 .json 分区仍可读取，重写时替换
+PARTITION_SUFFIX = ".json.z"
+LEGACY_SUFFIX = ".json"
+COMPRESSION_LEVEL = 6
+# 进程内缓存的分区数上限（按最近使用淘汰），常驻服务模式下内存不随运行次数增长
+MEMORY_PARTITIONS = 512
+TABLE = "$table"
+
+
+def _flatten(value: Any, path: Tuple, out: List[Tuple[Tuple, Any]]) -> None:
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            _flatten(item, path + (key,), out)
+    elif isinstance(value, list) and value:
+        for index, item in enumerate(value):
+            _flatten(item, path + (index,), out)
+    else:
+        out.append((path, value))
+
+
+def _unflatten(paths: List[List], values: List) -> Dict:
+    root: Dict = {}
+    for path, value in zip(paths, values):
+        if not path:
+            return value  # 空记录 {} 本身就是唯一的叶子
+        node = root
+        for key, child in zip(path, path[1:]):
+            if isinstance(node, list) and key == len(node):
+                node.append([] if isinstance(child, int) else {})
+            elif isinstance(node, dict) and key not in node:
+                node[key] = [] if isinstance(child, int) else {}
+            node = node[key]
+        if isinstance(node, list):
+            node.append(value)
+        else:
+            node[path[-1]] = value
+    return root
+
+
+def _pack_table(records: List[Dict]) -> Dict:
+    """字典列表 → 行表：每条记录的叶子路径（属性名）按“形状”只保存一次，行内只剩值
+
+    同一数据库的任务页面、同一天的汇总行形状几乎相同，“计划日期”“番茄数”等属性名不再逐条重复。
+    """
+    paths: Dict[Tuple, int] = {}
+    shapes: Dict[Tuple[int, ...], int] = {}
+    rows = []
+    for record in records:
+        leaves: List[Tuple[Tuple, Any]] = []
+        _flatten(record, (), leaves)
+        shape = tuple(paths.setdefault(path, len(paths)) for path, _ in leaves)
+        rows.append([shapes.setdefault(shape, len(shapes))] + [value for _, value in leaves])
+    return {"paths": [list(path) for path in paths], "shapes": [list(shape) for shape in shapes], "rows": rows}
+
+
+class _Slot:
+    """形状骨架中的值占位：row[index]"""
+
+    def __init__(self, index: int):
+        self.index = index
+
+
+def _fill(node: Any, row: List) -> Any:
+    if isinstance(node, _Slot):
+        return row[node.index]
+    if isinstance(node, dict):
+        return {key: _fill(item, row) for key, item in node.items()}
+    return [_fill(item, row) for item in node]
+
+
+def _unpack_table(table: Dict) -> List[Dict]:
+    """行表 → 字典列表：每种形状按路径还原一次骨架（行首为形状编号），每行只需填入值"""
+    paths = table["paths"]
+    skeletons = [_unflatten([paths[index] for index in shape], [_Slot(i + 1) for i in range(len(shape))])
+                 for shape in table["shapes"]]
+    return [_fill(skeletons[row[0]], row) for row in table["rows"]]
+
+
+def encode_partition(payload: Dict) -> bytes:
+    """分区内容 → 压缩字节：顶层的字典列表（任务、汇总行）转为行表"""
+    packed = {key: {TABLE: _pack_table(value)} if value and isinstance(value, list)
+              and all(isinstance(item, dict) for item in value) else value
+              for key, value in payload.items()}
+    return zlib.compress(codec.dumps(packed), COMPRESSION_LEVEL)
+
+
+def decode_partition(data: bytes) -> Dict:
+    payload = codec.loads(zlib.decompress(data))
+    return {key: _unpack_table(value[TABLE]) if isinstance(value, dict) and TABLE in value else value
+            for key, value in payload.items()}
+
+
+class LocalStore:
+    """本地存储：<directory>/<kind>/<YYYY-MM>/<YYYY-MM-DD>.json.z，每个本地日期一个分区
+
+    分区为键名去重、zlib 压缩的紧凑 JSON（见 encode_partition），按天随机读取：
+    周报只读 7 个小分区。分区内容带有指纹，读取时指纹不一致即视为过期。
+    进程内保留最近使用的 MEMORY_PARTITIONS 个分区，同一次运行中并发的多个报告共享读取结果。
+    """
+
+    def __init__(self, directory: str, memory_partitions: int = MEMORY_PARTITIONS):
+        self.directory = directory
+        self.memory_partitions = memory_partitions
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, date], Dict]" = OrderedDict()
+
+    def _remember(self, kind: str, day: date, payload: Dict) -> None:
+        """调用方需持有 self._lock"""
+        self._memory[(kind, day)] = payload
+        self._memory.move_to_end((kind, day))
+        while len(self._memory) > self.memory_partitions:
+            self._memory.popitem(last=False)
+
+    def _path(self, kind: str, day: date, suffix: str = PARTITION_SUFFIX) -> str:
+        return os.path.join(self.directory, kind, day.strftime("%Y-%m"), f"{day.isoformat()}{suffix}")
+
+    def _read(self, kind: str, day: date, cache: bool = True) -> Optional[Dict]:
+        with self._lock:
+            if cache and (kind, day) in self._memory:
+                self._memory.move_to_end((kind, day))
+                return self._memory[(kind, day)]
+        path = self._path(kind, day)
+        try:
+            with open(path, "rb") as f:
+                payload = decode_partition(f.read())
+        except FileNotFoundError:
+            payload = self._read_legacy(kind, day)
+            if payload is None:
+                return None
+        except (OSError, ValueError, TypeError, KeyError, IndexError, zlib.error) as e:
+            logger.warning(f"⚠️ 忽略损坏的分区 {path}: {e}")
+            return None
+        if cache:
+            with self._lock:
+                self._remember(kind, day, payload)
+        return payload
+
+    def _read_legacy(self, kind: str, day: date) -> Optional[Dict]:
+        path = self._path(kind, day, LEGACY_SUFFIX)
+        try:
+            with open(path, "rb") as f:
+                return codec.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 忽略损坏的分区 {path}: {e}")
+            return None
+
+    def _write(self, kind: str, day: date, payload: Dict, cache: bool = True) -> None:
+        path = self._path(kind, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 唯一临时文件 + 原子替换：并发写同一分区时不会互相截断
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encode_partition(payload))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._remove_legacy(kind, day)
+        with self._lock:
+            if cache:
+                self._remember(kind, day, payload)
+            else:
+                self._memory.pop((kind, day), None)
+
+    def partition_days(self, kind: str) -> List[date]:
+        """某类分区已有的全部日期（升序）"""
+        days = []
+        root = os.path.join(self.directory, kind)
+        for month in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+            for name in sorted(os.listdir(os.path.join(root, month))):
+                if not name.endswith((PARTITION_SUFFIX, LEGACY_SUFFIX)):
+                    continue
+                try:
+                    days.append(date.fromisoformat(name[:10]))
+                except ValueError:
+                    continue
+        return sorted(set(days))
+
+    def _remove_legacy(self, kind: str, day: date) -> None:
+        try:
+            os.remove(self._path(kind, day, LEGACY_SUFFIX))
+        except FileNotFoundError:
+            pass
+
+    def delete_partition(self, kind: str, day: date) -> None:
+        with self._lock:
+            self._memory.pop((kind, day), None)
+        try:
+            os.remove(self._path(kind, day))
+        except FileNotFoundError:
+            pass
+        self._remove_legacy(kind, day)
+
+    def load_rollups(self, day: date, fingerprint: str) -> Optional[List[DayRollup]]:
+        """读取某天的汇总行；不存在或任务已变化时返回 None"""
+        payload = self._read("rollups", day)
+        if not payload or payload.get("fingerprint") != fingerprint:
+            return None
+        return [DayRollup.from_dict(row) for row in payload["rows"]]
+
+    def save_rollups(self, day: date, fingerprint: str, rows: List[DayRollup]) -> None:
+        self._write("rollups", day, {"fingerprint": fingerprint, "rows": [row.to_dict() for row in rows]})
+
+    def load_tasks(self, day: date) -> List[Dict]:
+        """读取某天导入的任务（离线模式），没有分区时为空列表
+
+        导入的历史可能有几十万个任务，不保留内存副本。
+        """
+        payload = self._read("tasks", day, cache=False)
+        return payload["tasks"] if payload else []
+
+    def save_tasks(self, day: date, tasks: List[Dict]) -> None:
+        self._write("tasks", day, {"tasks": tasks}, cache=False)
+
+    def load_summary(self, period: str, start: date, fingerprint: str) -> Optional["PeriodSummary"]:
+        """读取某个日/周窗口的 LLM 复盘（分层报告）；不存在或任务已变化时返回 None"""
+        from .hierarchy import PeriodSummary
+
+        payload = self._read(f"{period}_summaries", start)
+        if not payload or payload.get("fingerprint") != fingerprint:
+            return None
+        return PeriodSummary.from_dict(payload)
+
+    def save_summary(self, summary: "PeriodSummary") -> None:
+        self._write(f"{summary.period}_summaries", summary.start, summary.to_dict())
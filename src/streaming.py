@@ -0,0 +1,256 @@
+# src/streaming.py - 流式聚合：Notion 分页 → 解析分类 → 增量汇总，内存占用与窗口大小无关
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from .buckets import Bucketer
+from .checkpoint import TasksDigest
+from .dedup import TitleTally, mit_summary, quiz_questions, quiz_summary
+from .goals import GoalRule, evaluate_goals
+from .records import TaskRecord, parse_task
+from .rollup import DayRollup, RollupAccumulator, build_day_rollups, combine_rollups, day_fingerprint, merge_intervals
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 每个报告为提示词保留的任务数（按信息量：MIT、XP、番茄），其余只计入“其余 N 项”
+DEFAULT_TOP_TASKS = 200
+# Notion 按计划日期升序返回，但“仅日期”的任务按 UTC 0 点排序，可能早于前一天晚间的任务到达，
+# 因此某天要等到出现再往后 SETTLE_LAG_DAYS 天的任务才结算
+SETTLE_LAG_DAYS = 1
+# 三日/趋势报告之外的周期都按日报/周报/月报的口径统计，目标规则按此周期筛选
+GOAL_PERIODS = ("daily", "weekly", "monthly")
+
+Item = Tuple[int, Dict, TaskRecord]  # (到达序号, 原始页面, 解析后的记录)
+
+
+@dataclass
+class StreamResult:
+    """流式聚合得到的某个报告的结果"""
+    stats: object  # 与 TaskSummarizer.get_report_stats 相同：(stats, details) 或逐日趋势序列
+    tasks: List[Dict]  # 为提示词保留的任务（最多 top_n 个，按到达顺序）
+    fingerprint: str  # 窗口内全部任务的指纹（与 tasks_fingerprint 一致）
+    count: int
+
+
+class _GoalTally:
+    """一条关键词/分类目标的增量实测：时长按合并后的区间计，已不可能再与后续任务重叠的区间及时结清"""
+
+    def __init__(self, rule: GoalRule):
+        self.rule = rule
+        self.count = 0
+        self.seconds = 0.0
+        self.minutes = 0.0
+        self.spans: List[Tuple] = []
+
+    def add(self, record: TaskRecord) -> None:
+        if not self.rule.matches(record):
+            return
+        self.count += 1
+        if record.start and record.end:
+            self.spans.append((record.start, record.end))
+        else:
+            self.minutes += record.actual_minutes
+
+    def settle(self, before: Optional[float] = None) -> None:
+        """结清结束时刻不晚于 before（UTC 秒，None 表示全部）的合并区间"""
+        merged = merge_intervals(self.spans)
+        closed = [span for span in merged if before is None or span[1].timestamp() <= before]
+        for start, end in closed:
+            self.seconds += (end - start).total_seconds()
+        self.spans = merged[len(closed):]
+
+    def value(self) -> float:
+        if self.rule.measure == "count":
+            return self.count
+        hours = self.seconds / 3600 + self.minutes / 60
+        return round(hours * 60) if self.rule.measure == "minutes" else round(hours, 1)
+
+
+@dataclass
+class _WindowState:
+    period: str
+    start: date
+    end: date
+    trend: bool
+    goals: List[_GoalTally]
+    digest: TasksDigest = field(default_factory=TasksDigest)
+    count: int = 0
+    rollups: RollupAccumulator = field(default_factory=RollupAccumulator)
+    day_rows: Dict[date, List[DayRollup]] = field(default_factory=dict)  # 仅三日/趋势报告
+    top: List[Tuple] = field(default_factory=list)  # 小顶堆：信息量最低的任务在堆顶
+    omitted: Dict[str, float] = field(default_factory=lambda: {"count": 0, "xp": 0, "tomatoes": 0})
+    mit: Dict = field(default_factory=lambda: {"distinct_mit": 0, "mit_credits": 0, "mit_clusters": []})
+    mit_omitted: int = 0  # 超出 top_n 未保留明细的 MIT 组数
+    quiz: TitleTally = field(default_factory=TitleTally)
+
+
+class StreamingAggregator:
+    """一次遍历任务流，同时为多个报告窗口增量维护统计
+
+    内存中只保留：尚未结算的 1~2 天任务、跨午夜可能延续到之后日期的任务，以及每个报告的
+    top_n 个任务、至多 top_n 组 MIT 明细和至多 top_n 个 Quiz 核心标题的累计（趋势报告另有逐日汇总行）。
+    统计口径与 TaskSummarizer.get_report_stats 一致；配置了本地存储时同样按天复用物化汇总。
+    """
+
+    def __init__(self, summarizer, windows: Dict[str, Tuple[date, date]],
+                 moving_windows: Optional[Dict[str, int]] = None, top_n: int = DEFAULT_TOP_TASKS):
+        if top_n < 1:
+            raise ValueError("top_n 必须为正整数")
+        self.summarizer = summarizer
+        self.tz = summarizer.tz
+        self.top_n = top_n
+        self.moving_windows = moving_windows or {}
+        self.bucketer = Bucketer(self.tz, min(start for start, _ in windows.values()),
+                                 max(end for _, end in windows.values()), windows)
+        self.states: Dict[Tuple[str, date], _WindowState] = {}
+        for period, (start, end) in windows.items():
+            goal_period = period if period in GOAL_PERIODS else "daily"
+            rules = [rule for rule in summarizer.goals if goal_period in rule.periods and not rule.metric]
+            self.states[(period, start)] = _WindowState(period, start, end, period in self.moving_windows,
+                                                        [_GoalTally(rule) for rule in rules],
+                                                        quiz=TitleTally(limit=top_n))
+        self._open: Dict[date, List[Item]] = {}
+        self._carry: List[Item] = []
+        self._settled: Optional[date] = None
+        self._seq = itertools.count()
+        self.late = 0
+
+    def add(self, task: Dict) -> None:
+        record = parse_task(task, self.tz, self.summarizer.taxonomy)
+        item = (next(self._seq), task, record)
+        day = record.local_date
+        keys = self.bucketer.keys(day)
+        if not keys:
+            return
+        for key in keys:
+            state = self.states[key]
+            state.digest.add(task)
+            state.count += 1
+
+        if self._settled is not None and day <= self._settled:
+            # 乱序到达的任务单独结算：计数、XP 等准确，当天的工作时间线可能少合并一部分重叠
+            self.late += 1
+            self._settle(day, [item], cache=False)
+            return
+        self._open.setdefault(day, []).append(item)
+        for open_day in sorted(self._open):
+            if open_day >= day - timedelta(days=SETTLE_LAG_DAYS):
+                break
+            self._settle(open_day, self._open.pop(open_day))
+
+    def feed(self, tasks: Iterable[Dict]) -> Dict[str, StreamResult]:
+        for task in tasks:
+            self.add(task)
+        return self.finish()
+
+    def _bound(self, day: date) -> float:
+        """day 本地 0 点的 UTC 秒"""
+        return self.bucketer.bounds[(day - self.bucketer.start).days]
+
+    def _settle(self, day: date, items: List[Item], cache: bool = True) -> None:
+        day_start, day_end = self._bound(day), self._bound(day + timedelta(days=1))
+        spill = [item for item in self._carry if item[2].end.timestamp() > day_start]
+        records = [record for _, _, record in items]
+
+        store = self.summarizer.store if cache else None
+        rows = None
+        if store is not None:
+            fingerprint = day_fingerprint([task for _, task, _ in items + spill], self.summarizer.config.timezone,
+                                          self.summarizer.taxonomy.digest)
+            rows = store.load_rollups(day, fingerprint)
+        if rows is None:
+            rows = build_day_rollups(day, records, self.tz, [record for _, _, record in spill])
+            if store is not None:
+                store.save_rollups(day, fingerprint, rows)
+
+        # 结束时间越过次日 0 点的任务留待之后的日期计入时间线
+        self._carry = [item for item in self._carry if item[2].end.timestamp() > day_end]
+        self._carry.extend(item for item in items
+                           if item[2].start and item[2].end and item[2].end.timestamp() > day_end)
+        if self._settled is None or day > self._settled:
+            self._settled = day
+
+        mit_details = self.summarizer.get_task_details([record for record in records if record.is_mit])
+        day_mit = mit_summary(mit_details) if mit_details else None
+        # 窗口首日只计窗口内的任务（与 get_report_stats 一致），不含之前跨午夜延续过来的时长
+        keys = self.bucketer.keys(day)
+        own_rows = rows
+        if spill and any(self.states[key].start == day for key in keys):
+            own_rows = build_day_rollups(day, records, self.tz)
+        for key in keys:
+            state = self.states[key]
+            self._add_day(state, day, items, own_rows if day == state.start else rows, day_mit, day_end)
+
+    def _add_day(self, state: _WindowState, day: date, items: List[Item], rows: List[DayRollup],
+                 day_mit: Optional[Dict], day_end: float) -> None:
+        if state.trend:
+            if day in state.day_rows:
+                # 乱序到达的任务并入当天已结算的汇总，每天仍只有一行合计 + 每个分类一行
+                merged = RollupAccumulator()
+                merged.add(state.day_rows[day])
+                merged.add(rows)
+                rows = merged.rows()
+                for row in rows:
+                    row.day = day
+            state.day_rows[day] = rows
+        else:
+            state.rollups.add(rows)
+        for seq, task, record in items:
+            entry = ((record.is_mit, record.xp, record.tomatoes, -seq), task, record)
+            if len(state.top) < self.top_n:
+                heapq.heappush(state.top, entry)
+            else:
+                dropped = heapq.heappushpop(state.top, entry)[2]
+                state.omitted["count"] += 1
+                state.omitted["xp"] += dropped.xp
+                state.omitted["tomatoes"] += dropped.tomatoes
+            if quiz_questions(record.title):
+                state.quiz.add(record.title)
+            for tally in state.goals:
+                tally.add(record)
+        for tally in state.goals:
+            tally.settle(day_end)
+        if day_mit:
+            state.mit["distinct_mit"] += day_mit["distinct_mit"]
+            state.mit["mit_credits"] += day_mit["mit_credits"]
+            # 明细与提示词中的任务一样最多保留 top_n 组，去重数与折算数仍覆盖全部
+            kept = day_mit["mit_clusters"][:max(self.top_n - len(state.mit["mit_clusters"]), 0)]
+            state.mit["mit_clusters"].extend(kept)
+            state.mit_omitted += len(day_mit["mit_clusters"]) - len(kept)
+
+    def finish(self) -> Dict[str, StreamResult]:
+        for day in sorted(self._open):
+            self._settle(day, self._open.pop(day))
+        if self.late:
+            logger.warning(f"⚠️ 流式聚合: {self.late} 个任务乱序到达，已单独结算")
+
+        results = {}
+        for state in self.states.values():
+            kept = sorted(state.top, key=lambda entry: -entry[0][3])
+            results[state.period] = StreamResult(self._stats(state, [record for _, _, record in kept]),
+                                                 [task for _, task, _ in kept], state.digest.hexdigest(),
+                                                 state.count)
+        return results
+
+    def _stats(self, state: _WindowState, records: List[TaskRecord]):
+        summarizer = self.summarizer
+        if state.trend:
+            return summarizer._trend_series(state.day_rows, state.start, state.end,
+                                            self.moving_windows[state.period])
+        if not state.count:
+            return {}, []
+
+        stats = combine_rollups(state.rollups.rows(), self.tz)
+        stats.update({**state.mit, **quiz_summary(state.quiz)})
+        if state.mit_omitted:
+            stats["mit_clusters_omitted"] = state.mit_omitted
+        for tally in state.goals:
+            tally.settle()
+        period = state.period if state.period in GOAL_PERIODS else "daily"
+        stats["goals"] = evaluate_goals(summarizer.goals, stats, [], period,
+                                        measured={tally.rule.name: tally.value() for tally in state.goals})
+        if state.omitted["count"]:
+            stats["omitted"] = dict(state.omitted)
+        return stats, summarizer.get_task_details(records)
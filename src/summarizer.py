@@ -1,19 +1,59 @@
 # src/summarizer.py - 🔄 基于Notion公式的精简修改版
 import os
-from collections import Counter
-from typing import Dict, List, Tuple
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
 from .utils import setup_logger
-from datetime import datetime
-import pytz
+from .records import TaskRecord, local_date_of, parse_task
+from .taxonomy import load_taxonomy
+from .intervals import split_at_midnight
+from .compaction import estimate_tokens, render_task_list
+from .dedup import format_mit_facts, format_quiz_facts, mit_summary
+from .goals import evaluate_goals, format_goal_facts, load_goals
+from .columnar import build_rollups_columnar, resolve_backend
+from .rollup import DayRollup, build_day_rollups, combine_rollups, day_fingerprint, merge_intervals, trend_stats
+from datetime import date, datetime, time, timedelta
 
 logger = setup_logger(__name__)
 
+# 纯统计报告中任务清单的 token 上限（一条 Telegram 消息放得下）
+STATS_TASK_LIST_TOKENS = 1500
+
 
 class TaskSummarizer:
-    def __init__(self, config, templates_dir: str = "templates"):
+    def __init__(self, config, templates_dir: str = "templates", store=None):
         self.config = config
         self.templates_dir = templates_dir
+        # 可选的 LocalStore：持久化按天物化的汇总行，跨运行复用
+        self.store = store
+        # {文件路径: (mtime, 内容)}，常驻进程中避免每次报告都读盘，模板修改后自动失效
+        self._template_cache: Dict[str, Tuple[float, str]] = {}
+
+        import pytz
         self.tz = pytz.timezone(config.timezone)
+        # 睡眠/娱乐及自定义活动类别的识别规则（TAXONOMY_FILE 未配置时使用内置规则）
+        self.taxonomy = load_taxonomy(getattr(config, "taxonomy_file", None))
+        # “每日确保”目标的核对规则（GOALS_FILE 未配置时使用内置规则）
+        self.goals = load_goals(getattr(config, "goals_file", None))
+        # PARSE_WORKERS > 1 时按需创建的进程池（见 _parallel_parser）
+        self._parallel = None
+
+    def filter_tasks_by_date(self, tasks: List[Dict], start_date: date, end_date: date) -> List[Dict]:
+        """按本地日期截取任务（以计划日期的开始时间为准，闭区间）"""
+        selected = []
+        for task in tasks:
+            local_date = self._task_local_date(task)
+            if local_date is not None and start_date <= local_date <= end_date:
+                selected.append(task)
+        return selected
+
+    def group_tasks_by_date(self, tasks: List[Dict]) -> Dict[date, List[Dict]]:
+        """按本地日期分组任务，每个任务只解析一次日期（缺少日期的任务被丢弃）"""
+        groups: Dict[date, List[Dict]] = {}
+        for task in tasks:
+            local_date = self._task_local_date(task)
+            if local_date is not None:
+                groups.setdefault(local_date, []).append(task)
+        return groups
 
     def aggregate_tasks(self, tasks: List[Dict]) -> Tuple[Dict, List[str]]:
         """聚合任务统计信息 - 现在直接从Notion公式读取XP和番茄数"""
@@ -77,178 +117,214 @@ class TaskSummarizer:
             f"任务聚合完成: 总数 {stats['total']}, XP {stats['xp']}, 番茄 {tomatoes_total}, MIT {stats['mit_count']}")
         return stats, titles
 
-    def get_detailed_stats(self, tasks: List[Dict]) -> Tuple[Dict, List[Dict]]:
-        """为日报/周报/月报提供详细的任务数据"""
+    def parse_tasks(self, tasks: List[Dict]) -> List[TaskRecord]:
+        """把 Notion 页面解析为 TaskRecord（每个任务只解析一次）"""
+        parser = self._parallel_parser(len(tasks))
+        if parser is not None:
+            return parser.parse(tasks)
+        return [parse_task(task, self.tz, self.taxonomy) for task in tasks]
+
+    def _parallel_parser(self, task_count: int):
+        """配置了 PARSE_WORKERS 且任务量足够大时返回进程池解析器，否则返回 None"""
+        from .parallel import PARALLEL_MIN_TASKS, ParallelParser
+
+        workers = getattr(self.config, "parse_workers", 0) or 0
+        if workers <= 1 or task_count < PARALLEL_MIN_TASKS:
+            return None
+        if self._parallel is None:
+            self._parallel = ParallelParser(workers, self.config.timezone, self.taxonomy)
+        return self._parallel
+
+    def get_daily_rollups(self, tasks: List[Dict],
+                          records: Optional[List[TaskRecord]] = None) -> Dict[Optional[date], List[DayRollup]]:
+        """按本地日期物化汇总行（每天一行合计 + 每个分类一行）
+
+        配置了本地存储时，任务没有变化的日期直接读取已物化的汇总，只重建变化的日期。
+        跨午夜的任务会把当天之后的部分计入后续日期的工作时间线（仅限 tasks 中已有任务的日期）。
+        records 为与 tasks 一一对应的已解析记录，可避免重复解析。
+        """
+        if records is None:
+            records = self.parse_tasks(tasks)
+
+        groups: Dict[Optional[date], List[int]] = {}
+        for index, record in enumerate(records):
+            groups.setdefault(record.local_date, []).append(index)
+
+        spills: Dict[date, List[int]] = {}
+        next_midnights: Dict[date, datetime] = {}
+        for index, record in enumerate(records):
+            if record.local_date is None or not (record.start and record.end):
+                continue
+            # 绝大多数任务不跨午夜，先与开始日期的下一个本地 0 点比较，避免逐个切分
+            next_midnight = next_midnights.get(record.local_date)
+            if next_midnight is None:
+                next_midnight = next_midnights[record.local_date] = self.tz.localize(
+                    datetime.combine(record.local_date + timedelta(days=1), time()))
+            if record.end <= next_midnight:
+                continue
+            for day, _, _ in split_at_midnight(record.start, record.end, self.tz)[1:]:
+                if day in groups:
+                    spills.setdefault(day, []).append(index)
+
+        cached: Dict[Optional[date], List[DayRollup]] = {}
+        fingerprints: Dict[date, str] = {}
+        pending: List[Optional[date]] = []
+        for day, indexes in groups.items():
+            if day is None or self.store is None:
+                pending.append(day)
+                continue
+            # 跨午夜延续到当天的任务变化时，当天的汇总也要重建
+            fingerprint = day_fingerprint([tasks[i] for i in indexes + spills.get(day, [])],
+                                          self.config.timezone, self.taxonomy.digest)
+            rows = self.store.load_rollups(day, fingerprint)
+            if rows is None:
+                fingerprints[day] = fingerprint
+                pending.append(day)
+            else:
+                cached[day] = rows
+
+        cached.update(self._build_rollups(pending, groups, spills, records))
+        for day, fingerprint in fingerprints.items():
+            self.store.save_rollups(day, fingerprint, cached[day])
+        # 保持任务出现的日期顺序（分类分布等按首次出现排序）
+        rollups = {day: cached[day] for day in groups}
+        rebuilt = len(fingerprints)
+
+        if self.store is not None and groups:
+            logger.info(f"🧮 日汇总: {len(groups)} 天，重建 {rebuilt} 天")
+        return rollups
+
+    def _build_rollups(self, days: List[Optional[date]], groups: Dict[Optional[date], List[int]],
+                       spills: Dict[date, List[int]], records: List[TaskRecord]) -> Dict[Optional[date], List[DayRollup]]:
+        """重建指定日期的汇总行；任务量大且装有 numpy 时一次性列式计算所有日期"""
+        task_count = sum(len(groups[day]) for day in days)
+        dated = [day for day in days if day is not None]
+        parser = self._parallel_parser(task_count) if dated else None
+        if dated and resolve_backend(self.config.aggregation_backend, task_count) == "numpy":
+            built = build_rollups_columnar(
+                {day: [records[i] for i in groups[day]] for day in dated},
+                {day: [records[i] for i in spills.get(day, [])] for day in dated},
+                self.tz)
+            days = [day for day in days if day is None]
+        elif parser is not None:
+            # 没有 numpy 时按天分片，在子进程中重建汇总行
+            built = parser.build_rollups(dated, groups, spills, records)
+            days = [day for day in days if day is None]
+        else:
+            built = {}
+
+        for day in days:
+            built[day] = build_day_rollups(day, [records[i] for i in groups[day]], self.tz,
+                                           [records[i] for i in spills.get(day, [])])
+        return built
+
+    def get_task_details(self, records: List[TaskRecord]) -> List[Dict]:
+        """提示词中的逐任务明细"""
+        details = []
+        for record in records:
+            details.append({
+                "title": record.title,
+                "category": record.category,
+                "start_time": record.start.astimezone(self.tz).strftime('%H:%M') if record.start else 'N/A',
+                "end_time": record.span_end.astimezone(self.tz).strftime('%H:%M') if record.start else 'N/A',
+                "duration_min": record.actual_minutes,
+                "xp": record.xp,
+                "tomatoes": record.tomatoes,
+                "is_mit": record.is_mit,
+                "date": record.local_date.isoformat() if record.local_date else None
+            })
+        return details
+
+    def get_detailed_stats(self, tasks: List[Dict], period: str = "daily") -> Tuple[Dict, List[Dict]]:
+        """为日报/周报/月报提供详细的任务数据
+
+        统计由按天物化的汇总行合并得到，周报/月报的聚合代价与天数成正比。
+        stats["goals"] 为适用于 period 的目标核对结果。
+        """
         if not tasks:
             return {}, []
 
-        task_details_for_prompt = []
-        total_xp = 0
-        total_tomatoes = 0
-        total_actual_minutes = 0
-        categories = Counter()
-        all_start_dts = []
-        all_end_dts = []
-
-        for t in tasks:
-            try:
-                props = t.get("properties", {})
-
-                # 基础信息
-                title = props.get("任务名称", {}).get("title", [{}])[0].get("plain_text", "（无标题）")
-                cat = props.get("分类", {}).get("select", {}).get("name", "未分类")
-                priority = props.get("优先级", {}).get("select", {}).get("name", "")
-                is_mit = priority == "MIT"
-
-                # ✅ 从Notion公式读取
-                xp = props.get("XP", {}).get("formula", {}).get("number", 0) or 0
-                tomatoes = props.get("番茄数", {}).get("formula", {}).get("number", 0) or 0
-                actual_minutes = props.get("实际用时(min)", {}).get("formula", {}).get("number", 0) or 0
-
-                total_xp += xp
-                total_tomatoes += tomatoes
-                total_actual_minutes += actual_minutes
-                categories[cat] += 1
-
-                # 时间信息
-                start_dt, end_dt = None, None
-                date_prop = props.get("计划日期", {}).get("date", {})
-                start_iso = date_prop.get("start")
-                end_iso = date_prop.get("end")
-
-                if start_iso:
-                    try:
-                        start_dt = datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
-                        end_dt = datetime.fromisoformat(
-                            end_iso.replace('Z', '+00:00')) if end_iso and end_iso != start_iso else start_dt
-                    except Exception:
-                        pass
-
-                if start_dt: all_start_dts.append(start_dt)
-                if end_dt: all_end_dts.append(end_dt)
-
-                start_str = start_dt.astimezone(self.tz).strftime('%H:%M') if start_dt else 'N/A'
-                end_str = end_dt.astimezone(self.tz).strftime('%H:%M') if end_dt else 'N/A'
-
-                task_details_for_prompt.append({
-                    "title": title,
-                    "category": cat,
-                    "start_time": start_str,
-                    "end_time": end_str,
-                    "duration_min": actual_minutes,
-                    "xp": xp,
-                    "tomatoes": tomatoes,
-                    "is_mit": is_mit
-                })
-
-            except Exception as e:
-                logger.warning(f"解析任务失败: {e}")
+        records = self.parse_tasks(tasks)
+        rollups = self.get_daily_rollups(tasks, records)
+        return self._detailed_stats(records, (row for rows in rollups.values() for row in rows), period)
+
+    def _detailed_stats(self, records: List[TaskRecord], rows: Iterable[DayRollup],
+                        period: str) -> Tuple[Dict, List[Dict]]:
+        stats = combine_rollups(rows, self.tz)
+        details = self.get_task_details(records)
+        # MIT 去重与 Quiz 题量在本地确定性计算，作为事实交给 LLM
+        stats.update(mit_summary(details))
+        stats["goals"] = evaluate_goals(self.goals, stats, records, period)
+        return stats, details
+
+    def get_report_stats(self, tasks: List[Dict], windows: Dict[str, Tuple[date, date]],
+                         moving_windows: Optional[Dict[str, int]] = None) -> Dict[str, object]:
+        """多个报告共用一份任务时，一次解析、一次按天物化，同时得到各报告的统计
+
+        windows 为 {周期: 窗口}；三日/趋势报告（出现在 moving_windows 中）返回逐日序列，
+        与对窗口内任务调用 get_trend_series 一致，其余返回 (stats, details)，与对窗口内任务调用
+        get_detailed_stats 一致。窗口首日之前开始、跨午夜延续到首日的任务不属于该窗口，
+        其时长不计入首日（即使它属于同时统计的另一个更长的窗口）。
+        """
+        from .buckets import Bucketer
+
+        moving_windows = moving_windows or {}
+        records = self.parse_tasks(tasks)
+        rollups = self.get_daily_rollups(tasks, records)
+        bucketer = Bucketer(self.tz, min(start for start, _ in windows.values()),
+                            max(end for _, end in windows.values()), windows)
+
+        # 每个任务、每天的汇总行各只访问一次，按预先计算的日期 → 窗口映射分发
+        bucket_records: Dict[Tuple[str, date], List[TaskRecord]] = {key: [] for key in bucketer.windows}
+        bucket_rollups: Dict[Tuple[str, date], Dict[Optional[date], List[DayRollup]]] = {
+            key: {} for key in bucketer.windows}
+        for record in records:
+            for key in bucketer.keys(record.local_date):
+                bucket_records[key].append(record)
+        for day, rows in rollups.items():
+            for key in bucketer.keys(day):
+                bucket_rollups[key][day] = rows
+
+        # 共用的按天汇总包含前一天跨午夜延续的时长，窗口首日换成只含当天任务的汇总
+        first_days: Dict[date, List[DayRollup]] = {}
+        for key, (start, _) in bucketer.windows.items():
+            if start not in bucket_rollups[key]:
                 continue
-
-        # 计算时间范围
-        work_start_str, work_end_str, focus_span_str = "无", "无", "无"
-        if all_start_dts and all_end_dts:
-            earliest_start = min(all_start_dts)
-            latest_end = max(all_end_dts)
-            work_start_str = earliest_start.astimezone(self.tz).strftime("%H:%M")
-            work_end_str = latest_end.astimezone(self.tz).strftime("%H:%M")
-            focus_span_hours = (latest_end - earliest_start).total_seconds() / 3600
-            focus_span_str = f"{focus_span_hours:.1f}小时"
-
-        # ✅ 计算效率指标
-        xp_per_tomato = round(total_xp / total_tomatoes, 2) if total_tomatoes > 0 else 0
-
-        stats = {
-            "total": len(tasks),
-            "xp": total_xp,
-            "tomatoes": total_tomatoes,
-            "xp_per_tomato": xp_per_tomato,
-            "cats": dict(categories),
-            "mit_count": sum(1 for t in task_details_for_prompt if t['is_mit']),
-            "work_start": work_start_str,
-            "work_end": work_end_str,
-            "work_hours": round(total_actual_minutes / 60, 1),
-            "focus_span": focus_span_str,
-        }
-
-        return stats, task_details_for_prompt
+            if start not in first_days:
+                midnight = bucketer.bounds[(start - bucketer.start).days]
+                spilled = any(record.local_date and record.local_date < start and record.start and record.end
+                              and record.end.timestamp() > midnight for record in records)
+                first_days[start] = build_day_rollups(
+                    start, [record for record in records if record.local_date == start], self.tz
+                ) if spilled else rollups[start]
+            bucket_rollups[key][start] = first_days[start]
+
+        results: Dict[str, object] = {}
+        for period, (start, end) in windows.items():
+            key = (period, start)
+            if period in moving_windows:
+                results[period] = self._trend_series(bucket_rollups[key], start, end, moving_windows[period])
+            elif bucket_records[key]:
+                results[period] = self._detailed_stats(
+                    bucket_records[key], (row for rows in bucket_rollups[key].values() for row in rows), period)
+            else:
+                results[period] = ({}, [])
+        return results
 
     def get_trend_stats(self, tasks: List[Dict]) -> Dict:
         """为三日报告提供趋势数据"""
         if not tasks:
             return self._empty_trend_stats()
 
-        total_xp = 0
-        total_tomatoes = 0
-        sleep_duration = 0
-        entertainment_duration = 0
-        work_periods = []
-        mit_count = 0
-
-        for t in tasks:
-            try:
-                props = t.get("properties", {})
-
-                # ✅ 从公式读取
-                xp = props.get("XP", {}).get("formula", {}).get("number", 0) or 0
-                tomatoes = props.get("番茄数", {}).get("formula", {}).get("number", 0) or 0
-
-                total_xp += xp
-                total_tomatoes += tomatoes
-
-                priority = props.get("优先级", {}).get("select", {}).get("name", "")
-                if priority == "MIT":
-                    mit_count += 1
-
-                # 分析时间分配
-                title = props.get("任务名称", {}).get("title", [{}])[0].get("plain_text", "")
-                category = props.get("分类", {}).get("select", {}).get("name", "")
-
-                date_prop = props.get("计划日期", {}).get("date", {})
-                start_iso = date_prop.get("start")
-                end_iso = date_prop.get("end")
-
-                if start_iso and end_iso:
-                    start_dt = datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
-                    end_dt = datetime.fromisoformat(end_iso.replace('Z', '+00:00'))
-                    duration_hours = (end_dt - start_dt).total_seconds() / 3600
-
-                    is_sleep = any(k in title.lower() for k in ['睡觉', 'sleep', '补觉'])
-                    is_ent = category == "Entertainment" or any(k in title.lower() for k in ['刷', '视频', '看剧'])
-
-                    if is_sleep:
-                        sleep_duration += duration_hours
-                    else:
-                        work_periods.append((start_dt, end_dt))
-                        if is_ent:
-                            entertainment_duration += duration_hours
+        rollups = self.get_daily_rollups(tasks)
+        return trend_stats(row for rows in rollups.values() for row in rows)
 
-            except Exception as e:
-                logger.warning(f"处理趋势数据失败: {e}")
-                continue
-
-        # 合并工作时段
-        merged_periods = self._merge_overlapping_periods(work_periods)
-        actual_work_hours = sum((end - start).total_seconds() / 3600 for start, end in merged_periods)
-
-        # ✅ 计算效率
-        xp_per_tomato = round(total_xp / total_tomatoes, 2) if total_tomatoes > 0 else 0
+    def build_prompt(self, stats: Dict, task_details: List[Dict], period: str,
+                     task_list: Optional[str] = None) -> str:
+        """构建AI提示词 - 现在使用详细任务数据而不是标题列表
 
-        stats = {
-            "total": len(tasks),
-            "xp": total_xp,
-            "tomatoes": total_tomatoes,
-            "xp_per_tomato": xp_per_tomato,
-            "mit_count": mit_count,
-            "actual_work_hours": round(actual_work_hours, 1),
-            "sleep_hours": round(sleep_duration, 1),
-            "entertainment_hours": round(entertainment_duration, 1),
-        }
-
-        return stats
-
-    def build_prompt(self, stats: Dict, task_details: List[Dict], period: str) -> str:
-        """构建AI提示词 - 现在使用详细任务数据而不是标题列表"""
+        task_list 用于替换任务清单（分层报告中为下级周期的复盘）。
+        """
         template = self._load_template(period)
 
         # 格式化分类分布
@@ -257,29 +333,25 @@ class TaskSummarizer:
         else:
             categories = "无"
 
-        # 格式化详细任务列表（包含XP和番茄数）
-        task_list_lines = []
-        if task_details:
-            # 按分类分组
-            tasks_by_cat = {}
-            for task in task_details:
-                cat = task['category']
-                if cat not in tasks_by_cat:
-                    tasks_by_cat[cat] = []
-                tasks_by_cat[cat].append(task)
-
-            # 按分类输出
-            for cat, tasks_in_cat in sorted(tasks_by_cat.items()):
-                task_list_lines.append(f"【{cat}】")
-                for task in sorted(tasks_in_cat, key=lambda x: x['start_time']):
-                    mit_str = " (MIT)" if task['is_mit'] else ""
-                    time_str = f"{task['start_time']}-{task['end_time']}"
-                    efficiency = f"{task['xp']}/{task['tomatoes']}" if task['tomatoes'] > 0 else "0/0"
-                    task_list_lines.append(
-                        f"- {task['title']}{mit_str} | {time_str} | {efficiency}"
-                    )
-
-        task_list = "\n".join(task_list_lines) if task_list_lines else "无已完成任务"
+        # 分类用时（扫描线合并后的时长）
+        if stats.get("category_hours"):
+            category_hours = ", ".join(f"{k}:{v}h" for k, v in stats["category_hours"].items())
+        else:
+            category_hours = "无"
+
+        # 自定义活动类别用时（运动、学习等，见 TAXONOMY_FILE）
+        activity_parts = self._activity_hours(stats)
+        activity_hours = ", ".join(f"{label}:{hours}h" for label, hours in activity_parts) or "无"
+
+        # 格式化详细任务列表（包含XP和番茄数），超出 token 预算时压缩
+        if task_list is None:
+            budget = getattr(self.config, "prompt_token_budget", 0) or 0
+            overhead = estimate_tokens(template) if budget else 0
+            compacted = render_task_list(task_details, max(budget - overhead, 0) if budget else None)
+            task_list = compacted.text + self._omitted_line(stats)
+            if compacted.level:
+                logger.info(f"🗜️ 任务清单压缩（级别 {compacted.level}）: {compacted.original_tokens} → "
+                            f"{compacted.tokens} tokens，压缩比 {compacted.ratio}，并入“其余”{compacted.dropped} 项")
 
         # ✅ 新增番茄和效率数据
         prompt = template.format(
@@ -293,21 +365,128 @@ class TaskSummarizer:
             work_start=stats.get("work_start", "无"),
             work_end=stats.get("work_end", "无"),
             work_hours=stats.get("work_hours", 0),
-            focus_span=stats.get("focus_span", "无")
+            focus_span=stats.get("focus_span", "无"),
+            busy_hours=stats.get("busy_hours", 0),
+            overlap_hours=stats.get("overlap_hours", 0),
+            idle_hours=stats.get("idle_hours", 0),
+            context_switches=stats.get("context_switches", 0),
+            category_hours=category_hours,
+            activity_hours=activity_hours,
+            mit_facts=format_mit_facts(stats),
+            quiz_facts=format_quiz_facts(stats),
+            goal_facts=format_goal_facts(stats.get("goals") or [])
         )
 
-        logger.info(f"生成 {period} 提示词，长度: {len(prompt)} 字符")
+        logger.info(f"生成 {period} 提示词，长度: {len(prompt)} 字符，约 {estimate_tokens(prompt)} tokens")
         return prompt
 
+    def build_stats_report(self, stats: Dict, task_details: List[Dict], period: str) -> str:
+        """不调用 LLM 的纯统计报告：核心指标 + 目标核对 + MIT/Quiz 结论（--stats-only）"""
+        categories = ", ".join(f"{k}:{v}" for k, v in stats["cats"].items()) or "无"
+        category_hours = ", ".join(f"{k}:{v}h" for k, v in (stats.get("category_hours") or {}).items()) or "无"
+        lines = [
+            f"# {period.title()} Review（统计）",
+            f"已完成任务 {stats['total']} 个，分类分布：{categories}",
+            f"获得 XP {stats['xp']}，消耗番茄 {stats.get('tomatoes', 0)} 个，效率 {stats.get('xp_per_tomato', 0)} XP/番茄",
+            f"工作区间：{stats.get('work_start', '无')} - {stats.get('work_end', '无')}（共 {stats.get('focus_span', '无')}）",
+            f"时间账：实际忙碌 {stats.get('busy_hours', 0)} 小时，多任务并行 {stats.get('overlap_hours', 0)} 小时，"
+            f"空档 {stats.get('idle_hours', 0)} 小时，分类切换 {stats.get('context_switches', 0)} 次",
+            f"分类用时：{category_hours}",
+        ]
+        activity_parts = self._activity_hours(stats)
+        if activity_parts:
+            lines.append("活动用时：" + ", ".join(f"{label}:{hours}h" for label, hours in activity_parts))
+        lines.append(f"MIT：{format_mit_facts(stats)}")
+        lines.append(f"Quiz：{format_quiz_facts(stats)}")
+
+        goals = stats.get("goals") or []
+        if goals:
+            passed = sum(1 for goal in goals if goal["passed"])
+            lines.append("")
+            lines.append(f"目标核对（{passed}/{len(goals)}）")
+            for goal in goals:
+                mark = "✅" if goal["passed"] else "❌"
+                lines.append(f"{mark} {goal['label']}：{goal['value']}{goal['unit']}（目标{goal['target']}）")
+
+        if task_details:
+            lines.append("")
+            lines.append("任务清单")
+            lines.append(render_task_list(task_details, STATS_TASK_LIST_TOKENS).text + self._omitted_line(stats))
+        return "\n".join(lines)
+
+    def _omitted_line(self, stats: Dict) -> str:
+        """流式聚合只保留部分任务明细，其余任务合计为一行"""
+        omitted = stats.get("omitted")
+        if not omitted:
+            return ""
+        return f"\n【其余】\n- 另有 {omitted['count']} 项未列出 | {omitted['xp']}/{omitted['tomatoes']}"
+
+    def build_trend_stats_report(self, daily_stats: Dict[str, Dict], period: str = "trend") -> str:
+        """三日/趋势报告的纯统计版本：逐日一行 + 合计（两阶段推送的第一条消息）"""
+        weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+        lines = [f"# {len(daily_stats)}-Day Trend（统计）"]
+        for date_str in sorted(daily_stats):
+            stats = daily_stats[date_str]
+            weekday = weekdays[datetime.fromisoformat(date_str).weekday()]
+            lines.append(f"{date_str} {weekday}：任务 {stats.get('total', 0)} 个，XP {stats.get('xp', 0)}，"
+                         f"番茄 {stats.get('tomatoes', 0)} 个，工作 {stats.get('actual_work_hours', 0)}h，"
+                         f"睡眠 {stats.get('sleep_hours', 0)}h，娱乐 {stats.get('entertainment_hours', 0)}h，"
+                         f"MIT {stats.get('mit_count', 0)} 个")
+
+        total_xp = sum(stats.get('xp', 0) for stats in daily_stats.values())
+        total_tomatoes = sum(stats.get('tomatoes', 0) for stats in daily_stats.values())
+        lines.append(f"合计：任务 {sum(stats.get('total', 0) for stats in daily_stats.values())} 个，XP {total_xp}，"
+                     f"番茄 {total_tomatoes} 个（{round(total_xp / total_tomatoes, 2) if total_tomatoes else 0} XP/番茄），"
+                     f"工作 {round(sum(stats.get('actual_work_hours', 0) for stats in daily_stats.values()), 1)}h")
+        return "\n".join(lines)
+
+    def get_trend_series(self, tasks: List[Dict], start_date: date, end_date: date,
+                         moving_window: int = 3) -> Dict[str, Dict]:
+        """N 天趋势：逐日统计 + 滑动窗口均值，一次遍历 O(N)
+
+        每天的统计来自日汇总行；ma_* 为截至当天、最近 moving_window 天的均值
+        （窗口开头不足 moving_window 天时按已有天数平均）。
+        """
+        return self._trend_series(self.get_daily_rollups(tasks), start_date, end_date, moving_window)
+
+    def _trend_series(self, rollups: Dict[Optional[date], List[DayRollup]], start_date: date, end_date: date,
+                      moving_window: int) -> Dict[str, Dict]:
+        series: Dict[str, Dict] = {}
+        window: deque = deque()
+        sums = {"xp": 0, "actual_work_hours": 0, "sleep_hours": 0}
+
+        day = start_date
+        while day <= end_date:
+            stats = trend_stats(rollups.get(day, []))
+            window.append(stats)
+            for key in sums:
+                sums[key] += stats[key]
+            if len(window) > moving_window:
+                dropped = window.popleft()
+                for key in sums:
+                    sums[key] -= dropped[key]
+
+            stats["ma_xp"] = round(sums["xp"] / len(window), 1)
+            stats["ma_work_hours"] = round(sums["actual_work_hours"] / len(window), 1)
+            stats["ma_sleep_hours"] = round(sums["sleep_hours"] / len(window), 1)
+            series[day.isoformat()] = stats
+            day += timedelta(days=1)
+        return series
+
     def build_three_day_prompt(self, three_days_stats: Dict[str, Dict]) -> str:
         """构建三天趋势分析提示词"""
-        template = self._load_template("three_days")
+        return self.build_trend_prompt(three_days_stats, "three-days")
 
-        sorted_dates = sorted(three_days_stats.keys())
+    def build_trend_prompt(self, daily_stats: Dict[str, Dict], period: str = "trend") -> str:
+        """构建 N 天趋势分析提示词（三日报告使用 three_days 模板，其余使用 trend 模板）"""
+        template = self._load_template("three_days" if period == "three-days" else "trend")
+
+        sorted_dates = sorted(daily_stats.keys())
         weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
         days_summary_lines = []
+        moving_average_lines = []
 
-        # 三天总计
+        # N 天总计
         total_tasks = 0
         total_xp = 0
         total_tomatoes = 0
@@ -317,7 +496,7 @@ class TaskSummarizer:
         total_mit = 0
 
         for date_str in sorted_dates:
-            stats = three_days_stats[date_str]
+            stats = daily_stats[date_str]
             date_obj = datetime.fromisoformat(date_str)
             weekday = weekdays[date_obj.weekday()]
 
@@ -330,6 +509,8 @@ class TaskSummarizer:
             total_entertainment_hours += stats.get('entertainment_hours', 0)
             total_mit += stats.get('mit_count', 0)
 
+            activity_lines = "".join(f"\n• {label}时间：{hours}小时" for label, hours in self._activity_hours(stats))
+
             # ✅ 格式化单日摘要，包含番茄和效率数据
             day_summary = f"""
 【{date_str} {weekday}】
@@ -337,32 +518,39 @@ class TaskSummarizer:
 • 工作时段：{stats.get('work_start', '无')} - {stats.get('work_end', '无')}
 • 实际工作：{stats.get('actual_work_hours', 0)}小时（不含睡眠）
 • 睡眠时间：{stats.get('sleep_hours', 0)}小时
-• 娱乐时间：{stats.get('entertainment_hours', 0)}小时
+• 娱乐时间：{stats.get('entertainment_hours', 0)}小时{activity_lines}
 • 获得XP：{stats.get('xp', 0)}点
 • 番茄数：{stats.get('tomatoes', 0)}个
 • MIT完成：{stats.get('mit_count', 0)}个
 • 效率指标：{stats.get('xp_per_tomato', 0)} XP/番茄"""
 
             days_summary_lines.append(day_summary)
-
-        # 计算平均值
-        avg_work = total_work_hours / 3 if len(sorted_dates) > 0 else 0
-        avg_sleep = total_sleep_hours / 3 if len(sorted_dates) > 0 else 0
-        avg_entertainment = total_entertainment_hours / 3 if len(sorted_dates) > 0 else 0
+            if "ma_xp" in stats:
+                moving_average_lines.append(
+                    f"• {date_str} {weekday}：XP {stats['ma_xp']}，工作 {stats['ma_work_hours']}小时，"
+                    f"睡眠 {stats['ma_sleep_hours']}小时")
+
+        # 按窗口内实际天数计算平均值
+        day_count = len(sorted_dates)
+        avg_work = round(total_work_hours / day_count, 1) if day_count else 0
+        avg_sleep = round(total_sleep_hours / day_count, 1) if day_count else 0
+        avg_entertainment = round(total_entertainment_hours / day_count, 1) if day_count else 0
         avg_xp_per_tomato = round(total_xp / total_tomatoes, 2) if total_tomatoes > 0 else 0
 
         # 填充模板
         prompt = template.format(
+            days=day_count,
             days_summary=''.join(days_summary_lines),
+            moving_averages="\n".join(moving_average_lines) or "无",
             total_tasks=total_tasks,
             total_xp=total_xp,
             total_tomatoes=total_tomatoes,
             avg_xp_per_tomato=avg_xp_per_tomato,
-            total_work_hours=total_work_hours,
+            total_work_hours=round(total_work_hours, 1),
             avg_work=avg_work,
-            total_sleep_hours=total_sleep_hours,
+            total_sleep_hours=round(total_sleep_hours, 1),
             avg_sleep=avg_sleep,
-            total_entertainment_hours=total_entertainment_hours,
+            total_entertainment_hours=round(total_entertainment_hours, 1),
             avg_entertainment=avg_entertainment,
             total_mit=total_mit
         )
@@ -373,12 +561,36 @@ class TaskSummarizer:
         """加载提示词模板"""
         template_file = os.path.join(self.templates_dir, f"{period}_prompt.txt")
         if os.path.exists(template_file):
+            mtime = os.path.getmtime(template_file)
+            cached = self._template_cache.get(template_file)
+            if cached and cached[0] == mtime:
+                return cached[1]
             with open(template_file, 'r', encoding='utf-8') as f:
-                return f.read().strip()
+                template = f.read().strip()
+            self._template_cache[template_file] = (mtime, template)
+            return template
         return self._get_default_template(period)
 
     def _get_default_template(self, period: str) -> str:
         """获取默认模板"""
+        if period in ("three_days", "trend"):
+            # 趋势报告的占位符与日/周/月报不同
+            return """# {days}-Day Trend Review
+{days_summary}
+
+{days}天合计：任务 {total_tasks} 个，XP {total_xp}，番茄 {total_tomatoes} 个（{avg_xp_per_tomato} XP/番茄），MIT {total_mit} 个
+日均工作 {avg_work} 小时，日均睡眠 {avg_sleep} 小时，日均娱乐 {avg_entertainment} 小时
+
+滑动均值：
+{moving_averages}
+
+请用中文输出，要求简洁实用：
+1. **趋势** - 指出工作、睡眠、XP 的变化方向
+2. **瓶颈** - 指出 1 个最需要优化的方面
+3. **行动** - 提供 3 条具体可执行的建议
+
+注意：回复字数控制在 400 字以内，重点突出可操作性。"""
+
         period_map = {
             "daily": ("今天", "明天", "日"),
             "weekly": ("本周", "下周", "周"),
@@ -404,17 +616,19 @@ MIT 任务 {{mit_count}} 个
 
 注意：回复字数控制在 300 字以内，重点突出可操作性。"""
 
+    def _task_local_date(self, task: Dict) -> Optional[date]:
+        """任务开始时间对应的本地日期"""
+        date_prop = (task.get("properties", {}).get("计划日期") or {}).get("date") or {}
+        start_iso = date_prop.get("start")
+        try:
+            return local_date_of(start_iso, self.tz)
+        except ValueError:
+            logger.warning(f"无法解析任务日期: {start_iso}, 任务ID: {task.get('id', 'unknown')}")
+            return None
+
     def _merge_overlapping_periods(self, periods: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
         """合并重叠的时间段"""
-        if not periods: return []
-        sorted_periods = sorted(periods, key=lambda x: x[0])
-        merged = [sorted_periods[0]]
-        for current_start, current_end in sorted_periods[1:]:
-            if current_start < merged[-1][1]:
-                merged[-1] = (merged[-1][0], max(merged[-1][1], current_end))
-            else:
-                merged.append((current_start, current_end))
-        return merged
+        return merge_intervals(periods)
 
     def _empty_trend_stats(self) -> Dict:
         """返回三日报告所需的空统计字典"""
@@ -426,7 +640,14 @@ MIT 任务 {{mit_count}} 个
             "mit_count": 0,
             "actual_work_hours": 0,
             "sleep_hours": 0,
-            "entertainment_hours": 0
+            "entertainment_hours": 0,
+            "overlap_hours": 0,
+            "idle_hours": 0,
+            "context_switches": 0,
+            "activity_hours": {}
         }
 
-
+    def _activity_hours(self, stats: Dict) -> List[Tuple[str, float]]:
+        """[(显示名, 时长)]，按分类规则文件中的顺序"""
+        hours = stats.get("activity_hours") or {}
+        return [(cls.label, hours[cls.name]) for cls in self.taxonomy.custom_classes if cls.name in hours]
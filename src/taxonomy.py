@@ -0,0 +1,161 @@
+# src/taxonomy.py - 可配置的活动分类（睡眠、娱乐、运动、学习……）
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 内置类名：睡眠不计入工作时间线，二者在统计中有专门字段
+SLEEP = "sleep"
+ENTERTAINMENT = "entertainment"
+BUILTIN_CLASSES = (SLEEP, ENTERTAINMENT)
+
+DEFAULT_CLASSES = [
+    {"name": SLEEP, "label": "睡眠", "keywords": ["睡觉", "sleep", "补觉"]},
+    {"name": ENTERTAINMENT, "label": "娱乐", "keywords": ["刷", "视频", "看剧"],
+     "categories": ["Entertainment"], "exclude": [SLEEP]},
+]
+
+# 标题缓存上限，超出后整体清空（周期性任务的标题数量远小于此值）
+TITLE_CACHE_LIMIT = 50000
+
+
+@dataclass(frozen=True)
+class ActivityClass:
+    """一个活动类别：标题包含任一关键词（不区分大小写）或分类命中即归入该类"""
+    name: str
+    label: str
+    keywords: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()  # 这些类命中时本类不成立（如睡眠任务不算娱乐）
+
+
+class ActivityTaxonomy:
+    """把所有类别的关键词编译成一个正则，每个 (标题, 分类) 只匹配一次并缓存结果"""
+
+    def __init__(self, classes: Iterable[ActivityClass]):
+        self.classes: List[ActivityClass] = list(classes)
+        names = [cls.name for cls in self.classes]
+        duplicated = sorted({name for name in names if names.count(name) > 1})
+        if duplicated:
+            raise ValueError(f"活动类别重复: {', '.join(duplicated)}")
+        for cls in self.classes:
+            unknown = set(cls.exclude) - set(names)
+            if unknown:
+                raise ValueError(f"活动类别 {cls.name} 的 exclude 引用了未知类别: {', '.join(sorted(unknown))}")
+
+        owners: Dict[str, set] = {}
+        by_category: Dict[str, set] = {}
+        for cls in self.classes:
+            for keyword in cls.keywords:
+                if keyword:
+                    owners.setdefault(keyword.lower(), set()).add(cls.name)
+            for category in cls.categories:
+                by_category.setdefault(category, set()).add(cls.name)
+
+        # 同一位置只取最长的关键词；它包含的较短关键词必然同时命中，预先并入其类别集合
+        self._keyword_classes: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(name for other, other_names in owners.items() if other in keyword
+                               for name in other_names)
+            for keyword in owners
+        }
+        alternation = "|".join(re.escape(keyword) for keyword in sorted(owners, key=len, reverse=True))
+        # 零宽前瞻让匹配可以重叠，"刷视频" 同时命中 "刷" 和 "视频"
+        self._pattern = re.compile(f"(?=({alternation}))") if owners else None
+        self._by_category = {category: frozenset(names) for category, names in by_category.items()}
+
+        self._cache: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self.digest = hashlib.sha1(json.dumps([asdict(cls) for cls in self.classes], ensure_ascii=False,
+                                              sort_keys=True).encode()).hexdigest()[:12]
+
+    @property
+    def custom_classes(self) -> List[ActivityClass]:
+        """睡眠、娱乐之外用户自定义的类别（统计为 activity_hours）"""
+        return [cls for cls in self.classes if cls.name not in BUILTIN_CLASSES]
+
+    def classify(self, title: str, category: str) -> Tuple[str, ...]:
+        """返回任务命中的类别名（按配置顺序）"""
+        key = (title, category)
+        matched = self._cache.get(key)
+        if matched is None:
+            if len(self._cache) >= TITLE_CACHE_LIMIT:
+                self._cache.clear()
+            matched = self._cache[key] = self._match(title, category)
+        return matched
+
+    def _match(self, title: str, category: str) -> Tuple[str, ...]:
+        matched = set(self._by_category.get(category, ()))
+        if self._pattern is not None:
+            for match in self._pattern.finditer(title.lower()):
+                matched |= self._keyword_classes[match.group(1)]
+        # 按配置顺序依次应用互斥规则
+        for cls in self.classes:
+            if cls.name in matched and any(name in matched for name in cls.exclude):
+                matched.discard(cls.name)
+        return tuple(cls.name for cls in self.classes if cls.name in matched)
+
+
+def _build(entries: List[Dict]) -> ActivityTaxonomy:
+    classes = []
+    for index, entry in enumerate(entries):
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"第 {index + 1} 个活动类别缺少 name")
+        unknown = set(entry) - {"name", "label", "keywords", "categories", "exclude"}
+        if unknown:
+            raise ValueError(f"活动类别 {name} 包含未知配置项: {', '.join(sorted(unknown))}")
+        classes.append(ActivityClass(
+            name=name,
+            label=entry.get("label") or name,
+            keywords=tuple(entry.get("keywords", ())),
+            categories=tuple(entry.get("categories", ())),
+            exclude=tuple(entry.get("exclude", ())),
+        ))
+    return ActivityTaxonomy(classes)
+
+
+DEFAULT_TAXONOMY = _build(DEFAULT_CLASSES)
+
+# {路径: (mtime, 分类体系)}，同一文件在常驻进程和多租户之间共享编译结果与标题缓存
+_loaded: Dict[str, Tuple[float, ActivityTaxonomy]] = {}
+_lock = threading.Lock()
+
+
+def load_taxonomy(path: Optional[str]) -> ActivityTaxonomy:
+    """加载活动分类文件；未配置时使用内置的睡眠/娱乐规则
+
+    格式::
+
+        {
+          "classes": [
+            {"name": "sleep", "label": "睡眠", "keywords": ["睡觉", "sleep", "补觉"]},
+            {"name": "entertainment", "label": "娱乐", "keywords": ["刷", "视频", "看剧"],
+             "categories": ["Entertainment"], "exclude": ["sleep"]},
+            {"name": "exercise", "label": "运动", "keywords": ["健身", "跑步"], "categories": ["Health"]}
+          ]
+        }
+
+    sleep / entertainment 为内置类名（省略则不再识别睡眠或娱乐），其余类别按开始日期统计时长。
+    """
+    if not path:
+        return DEFAULT_TAXONOMY
+
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    taxonomy = _build(data.get("classes", []))
+    logger.info(f"🏷️ 从 {path} 加载 {len(taxonomy.classes)} 个活动类别: "
+                f"{', '.join(cls.name for cls in taxonomy.classes)}")
+    with _lock:
+        _loaded[path] = (mtime, taxonomy)
+    return taxonomy
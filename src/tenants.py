@@ -0,0 +1,177 @@
+# src/tenants.py - 多租户批量运行
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+from .config import Config
+from .llm_client import LLM_FAILURE_PREFIX
+from .utils import RateLimiter, setup_logger
+from .profiling import get_profiler, span
+
+logger = setup_logger(__name__)
+
+# Notion 官方限制：每个集成平均 3 次请求/秒
+DEFAULT_NOTION_RPS = 3.0
+
+CONFIG_FIELDS = {f.name for f in fields(Config)}
+
+
+@dataclass
+class Tenant:
+    """一个租户：名称 + 独立的配置（token、数据库、时区、LLM、推送目标）"""
+    name: str
+    config: Config
+
+
+def _resolve(value):
+    """支持 "env:VAR" 写法，避免把密钥直接写进租户文件"""
+    if isinstance(value, str) and value.startswith("env:"):
+        return os.getenv(value[4:])
+    return value
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """加载租户配置文件
+
+    格式::
+
+        {
+          "defaults": {"deepseek_key": "env:DEEPSEEK_KEY", "llm_model": "deepseek-chat"},
+          "tenants": [
+            {"name": "alice", "notion_token": "env:NOTION_TOKEN_ALICE", "notion_db_id": "...",
+             "timezone": "America/Toronto", "telegram_bot_token": "env:TG_BOT", "telegram_chat_id": "123"}
+          ]
+        }
+
+    除 name 外的键与 Config 字段同名，defaults 会合并到每个租户。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    defaults = data.get("defaults", {})
+    tenants = []
+    names = set()
+    for index, entry in enumerate(data.get("tenants", [])):
+        merged = {**defaults, **entry}
+        name = merged.pop("name", None) or f"tenant-{index + 1}"
+        if name in names:
+            raise ValueError(f"租户名称重复: {name}")
+        names.add(name)
+
+        unknown = set(merged) - CONFIG_FIELDS
+        if unknown:
+            raise ValueError(f"租户 {name} 包含未知配置项: {', '.join(sorted(unknown))}")
+
+        values = {key: _resolve(value) for key, value in merged.items()}
+        if not values.get("notion_token") or not values.get("notion_db_id"):
+            raise ValueError(f"租户 {name} 缺少 notion_token 或 notion_db_id")
+        if not values.get("llm_provider"):
+            # 与 Config.from_env 一致：按已配置的 key 推断 provider
+            values["llm_provider"] = "openai" if values.get("openai_key") and not values.get("deepseek_key") \
+                else "deepseek"
+
+        tenants.append(Tenant(name=name, config=Config(**values)))
+
+    if not tenants:
+        raise ValueError(f"租户文件 {path} 中没有任何租户")
+    logger.info(f"👥 从 {path} 加载 {len(tenants)} 个租户: {', '.join(t.name for t in tenants)}")
+    return tenants
+
+
+def run_batch(tenants: List[Tenant], periods: List[str], is_yesterday: bool = False,
+              dry_run: bool = False, workers: int = 4, llm_concurrency: int = 2,
+              notion_rps: float = DEFAULT_NOTION_RPS, run_dir: Optional[str] = None,
+              from_stage: Optional[str] = None, trend_days: int = 7, force: bool = False) -> Dict[str, Dict]:
+    """并发处理所有租户，返回 {租户名: {status, seconds, error, deliveries}}
+
+    - 所有租户共享一个 requests.Session（Notion / Telegram 连接池）
+    - 同一 Notion token 共享一个令牌桶限流器
+    - LLM 调用受全局并发上限约束，相同凭据的租户复用同一个 LLMClient
+    - 指定 run_dir 时每个租户的检查点写入 <run_dir>/<租户名>/（dry_run 时不写检查点）
+    """
+    import requests
+    from .main import FETCH_TIMEOUT_PREFIX, PreviewSender, build_clients, deliver_reports, open_checkpoints, run_reports
+
+    if dry_run:
+        # 没有推送的运行不留检查点，否则之后的正式运行会续跑并推送 dry-run 的答案
+        run_dir = None
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=max(10, workers * 2))
+    session.mount("https://", adapter)
+
+    rate_limiters: Dict[str, RateLimiter] = {}
+    for tenant in tenants:
+        token = tenant.config.notion_token
+        if token not in rate_limiters:
+            rate_limiters[token] = RateLimiter(notion_rps, burst=int(notion_rps))
+
+    llm_slots = threading.Semaphore(max(1, llm_concurrency))
+    llm_clients = {}
+    llm_lock = threading.Lock()
+
+    def shared_llm(cfg: Config):
+        from .llm_client import LLMClient
+
+        key = (cfg.llm_provider, cfg.deepseek_key, cfg.openai_key, cfg.llm_model)
+        with llm_lock:
+            if key not in llm_clients:
+                llm_clients[key] = LLMClient(cfg, limiter=llm_slots)
+            return llm_clients[key]
+
+    def run_tenant(tenant: Tenant) -> Dict:
+        started = time.perf_counter()
+        result = {"status": "ok", "error": None, "deliveries": {}}
+        try:
+            with span(f"tenant.{tenant.name}"):
+                notion, summarizer, llm, notifier = build_clients(
+                    tenant.config, session=session,
+                    rate_limiter=rate_limiters[tenant.config.notion_token],
+                    llm=shared_llm(tenant.config)
+                )
+                checkpoints = open_checkpoints(
+                    tenant.config, periods, is_yesterday,
+                    os.path.join(run_dir, tenant.name) if run_dir else None, from_stage, trend_days, force
+                )
+                # 两阶段推送（PROGRESSIVE_DELIVERY / progressive_delivery）：先发统计报告，AI 分析以回复补发
+                preview = PreviewSender(notifier, is_yesterday, dry_run, trend_days) \
+                    if tenant.config.progressive_delivery else None
+                progressive = {"preview": preview} if preview else {}
+                answers = run_reports(notion, summarizer, llm, periods, is_yesterday, checkpoints,
+                                      trend_days, **progressive)
+                failed = [p for p, answer in answers.items() if answer.startswith(LLM_FAILURE_PREFIX)]
+                overran = [p for p, answer in answers.items() if answer.startswith(FETCH_TIMEOUT_PREFIX)]
+                if failed or overran:
+                    result["status"] = "failed"
+                    result["error"] = "; ".join(
+                        f"{reason}: {', '.join(names)}"
+                        for reason, names in (("LLM 调用失败", failed), ("查询超时", overran)) if names)
+                result["deliveries"] = deliver_reports(
+                    notifier, answers, is_yesterday, dry_run, checkpoints, trend_days,
+                    preview.refs if preview else None)
+        except Exception as e:
+            logger.error(f"❌ 租户 {tenant.name} 运行失败: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - started, 2)
+        return result
+
+    profiler = get_profiler()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {tenant.name: pool.submit(profiler.bind(run_tenant), tenant) for tenant in tenants}
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        session.close()
+
+    logger.info("=" * 60)
+    logger.info(f"👥 批量运行完成（{len(tenants)} 个租户）:")
+    for name, result in results.items():
+        mark = "✅" if result["status"] == "ok" else "❌"
+        detail = f" - {result['error']}" if result["error"] else ""
+        logger.info(f"   {mark} {name}: {result['seconds']}s{detail}")
+    logger.info("=" * 60)
+    return results
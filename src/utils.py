@@ -1,9 +1,11 @@
 # src/utils.py - 工具函数
 import logging
+import threading
 import time
 from functools import wraps
 from datetime import datetime, date, timedelta  # 添加 timedelta
-import pytz
+from typing import List, Optional, Tuple
+from .deadline import DeadlineExceeded
 
 
 def setup_logger(name: str = "task_master") -> logging.Logger:
@@ -23,13 +25,15 @@ def setup_logger(name: str = "task_master") -> logging.Logger:
 
 
 def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
-    """重试装饰器"""
+    """重试装饰器（阶段时间预算用完时不再重试）"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             for attempt in range(max_retries):
                 try:
                     return func(*args, **kwargs)
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
                     if attempt == max_retries - 1:
                         raise e
@@ -40,24 +44,98 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
     return decorator
 
 
-def get_date_range(period: str, timezone: str = "Asia/Shanghai") -> tuple[date, date]:
-    """获取日期范围"""
+class RateLimiter:
+    """线程安全的令牌桶限流器：平均 rate 次/秒，允许 burst 次突发"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate 必须为正数")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """取得一个令牌，必要时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_date_range(period: str, timezone: str = "Asia/Shanghai",
+                   reference: Optional[date] = None) -> tuple[date, date]:
+    """获取日期范围（reference 为参考日期，默认今天）"""
+    if reference is not None:
+        now = reference
+    else:
+        import pytz
+        now = datetime.now(pytz.timezone(timezone)).date()
+
+    from .buckets import bucket_window
+    return bucket_window(period, now)
+
+
+def get_report_window(period: str, timezone: str = "Asia/Shanghai",
+                      is_yesterday: bool = False, days: int = 3) -> tuple[date, date]:
+    """获取某个报告需要覆盖的日期窗口（闭区间，本地日期）
+
+    is_yesterday: 日报取昨天；周报/月报取昨天所在的自然周/月；三日/趋势报告始终截至昨天。
+    days: 趋势报告（trend）覆盖的天数。
+    """
+    import pytz
+
     tz = pytz.timezone(timezone)
-    now = datetime.now(tz).date()
+    today = datetime.now(tz).date()
+
+    yesterday = today - timedelta(days=1)
+
+    if period == "daily":
+        target = yesterday if is_yesterday else today
+        return target, target
+    elif period == "three-days":
+        # 昨天、前天、大前天
+        return today - timedelta(days=3), yesterday
+    elif period == "trend":
+        return today - timedelta(days=days), yesterday
+    # is_yesterday 时取昨天所在的周/月，便于周一/每月1号生成上一周期的报告
+    return get_date_range(period, timezone, reference=yesterday if is_yesterday else None)
+
+
+def iter_period_windows(period: str, start: date, end: date, days: int = 3) -> List[Tuple[date, date]]:
+    """枚举 [start, end] 内某个周期的全部报告窗口（用于历史回填）
+
+    - daily: 每天一个窗口
+    - three-days / trend: 以每天为最后一天的连续三天 / days 天
+    - weekly / monthly: 与区间有交集的每个自然周（周一至周日）/ 自然月
+    """
+    if start > end:
+        raise ValueError(f"开始日期 {start} 晚于结束日期 {end}")
 
+    windows = []
     if period == "daily":
-        return now, now
-    elif period == "weekly":
-        start = now - timedelta(days=now.weekday())
-        end = start + timedelta(days=6)
-        return start, end
-    elif period == "monthly":
-        start = now.replace(day=1)
-        if start.month == 12:
-            next_month = date(start.year + 1, 1, 1)
-        else:
-            next_month = date(start.year, start.month + 1, 1)
-        end = next_month - timedelta(days=1)
-        return start, end
+        day = start
+        while day <= end:
+            windows.append((day, day))
+            day += timedelta(days=1)
+    elif period in ("three-days", "trend"):
+        span_days = 3 if period == "three-days" else days
+        day = start
+        while day <= end:
+            windows.append((day - timedelta(days=span_days - 1), day))
+            day += timedelta(days=1)
+    elif period in ("weekly", "monthly"):
+        window = get_date_range(period, reference=start)
+        while window[0] <= end:
+            windows.append(window)
+            window = get_date_range(period, reference=window[1] + timedelta(days=1))
     else:
-        raise ValueError(f"不支持的周期: {period}")
\ No newline at end of file
+        raise ValueError(f"不支持的周期: {period}")
+    return windows
@@ -0,0 +1,60 @@
+# tests/test_backfill.py - 历史回填测试
+import argparse
+import pytest
+from datetime import date
+from unittest.mock import MagicMock
+from src.config import Config
+from src.summarizer import TaskSummarizer
+from src.utils import iter_period_windows
+from src.backfill import parse_backfill_range, run_backfill, window_label
+
+
+def test_iter_period_windows_weekly_covers_partial_weeks():
+    """与区间有交集的每个自然周都会被枚举"""
+    windows = iter_period_windows("weekly", date(2025, 1, 1), date(2025, 1, 13))
+    assert windows == [
+        (date(2024, 12, 30), date(2025, 1, 5)),
+        (date(2025, 1, 6), date(2025, 1, 12)),
+        (date(2025, 1, 13), date(2025, 1, 19)),
+    ]
+    assert [window_label("weekly", *w) for w in windows] == ["2025-W01", "2025-W02", "2025-W03"]
+
+
+def test_iter_period_windows_monthly_and_three_days():
+    months = iter_period_windows("monthly", date(2024, 12, 15), date(2025, 2, 1))
+    assert [window_label("monthly", *m) for m in months] == ["2024-12", "2025-01", "2025-02"]
+    assert iter_period_windows("three-days", date(2025, 3, 1), date(2025, 3, 1)) == [
+        (date(2025, 2, 27), date(2025, 3, 1))
+    ]
+
+
+def test_parse_backfill_range():
+    assert parse_backfill_range("2025-01-01..2025-12-31") == (date(2025, 1, 1), date(2025, 12, 31))
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_backfill_range("2025-12-31..2025-01-01")
+
+
+def test_run_backfill_skips_existing_and_keeps_failures_pending(tmp_path):
+    """已有报告跳过；LLM 失败的窗口不落盘"""
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    task = {
+        "id": "1",
+        "properties": {
+            "任务名称": {"title": [{"plain_text": "学习"}]},
+            "计划日期": {"date": {"start": "2025-01-02T15:00:00.000+00:00"}},
+        }
+    }
+    notion = MagicMock()
+    notion._query_tasks.return_value = [task]
+    llm = MagicMock()
+    llm.ask_llm.return_value = "[LLM 调用失败] timeout"
+
+    (tmp_path / "daily").mkdir()
+    (tmp_path / "daily" / "2025-01-01.md").write_text("old", encoding="utf-8")
+
+    results = run_backfill(notion, TaskSummarizer(config=cfg), llm, "daily",
+                           date(2025, 1, 1), date(2025, 1, 3), output_dir=str(tmp_path))
+
+    assert results == {"2025-01-01": "skipped", "2025-01-02": "failed", "2025-01-03": "written"}
+    notion._query_tasks.assert_called_once_with(date(2025, 1, 2), date(2025, 1, 3))
+    assert not (tmp_path / "daily" / "2025-01-02.md").exists()
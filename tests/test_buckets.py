@@ -0,0 +1,76 @@
+# tests/test_buckets.py - 多粒度分桶与多报告一次遍历统计测试
+from datetime import date, datetime, timedelta, timezone
+import pytz
+from src.buckets import Bucketer, local_midnight
+from src.config import Config
+from src.summarizer import TaskSummarizer
+from tests.test_rollup import make_week
+from tests.test_summarizer import make_task
+
+TORONTO = pytz.timezone("America/Toronto")
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_day_bounds_follow_dst():
+    bucketer = Bucketer(TORONTO, date(2025, 3, 8), date(2025, 11, 3), {})
+    hours = {bucketer.start + timedelta(days=i): (bucketer.bounds[i + 1] - bucketer.bounds[i]) / 3600
+             for i in range(bucketer.days)}
+    assert hours[date(2025, 3, 9)] == 23 and hours[date(2025, 11, 2)] == 25 and hours[date(2025, 6, 1)] == 24
+    # 夏令时期间本地 0 点为 04:00 UTC，冬令时为 05:00 UTC
+    assert bucketer.bounds[(date(2025, 6, 1) - bucketer.start).days] == utc(2025, 6, 1, 4).timestamp()
+    assert bucketer.bounds[-1] == utc(2025, 11, 4, 5).timestamp()
+
+
+def test_midnight_dst_transitions():
+    """古巴的夏令时在 0 点切换：0 点不存在时取切换时刻，0 点出现两次时取第一次"""
+    havana = pytz.timezone("America/Havana")
+    assert local_midnight(havana, date(2025, 3, 9)) == utc(2025, 3, 9, 5)
+    assert local_midnight(havana, date(2025, 11, 2)) == utc(2025, 11, 2, 4)
+    bucketer = Bucketer(havana, date(2025, 3, 8), date(2025, 3, 10), {})
+    assert bucketer.bounds[2] - bucketer.bounds[1] == 23 * 3600
+
+
+def test_keys_cover_overlapping_windows():
+    bucketer = Bucketer(TORONTO, date(2025, 5, 26), date(2025, 6, 8),
+                        {"weekly": (date(2025, 6, 2), date(2025, 6, 8)),
+                         "three-days": (date(2025, 6, 5), date(2025, 6, 7))})
+    assert bucketer.keys(date(2025, 6, 1)) == ()
+    assert bucketer.keys(date(2025, 6, 7)) == (("weekly", date(2025, 6, 2)), ("three-days", date(2025, 6, 5)))
+    assert bucketer.windows[("three-days", date(2025, 6, 5))] == (date(2025, 6, 5), date(2025, 6, 7))
+    assert bucketer.keys(date(2025, 6, 9)) == () and bucketer.keys(None) == ()
+
+
+def test_report_stats_match_separate_passes():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    tasks = make_week()
+    windows = {"daily": (date(2025, 6, 7), date(2025, 6, 7)), "weekly": (date(2025, 6, 2), date(2025, 6, 8)),
+               "three-days": (date(2025, 6, 5), date(2025, 6, 7)), "monthly": (date(2025, 7, 1), date(2025, 7, 31))}
+    shared = summarizer.get_report_stats(tasks, windows, {"three-days": 3})
+
+    for period in ("daily", "weekly"):
+        window_tasks = summarizer.filter_tasks_by_date(tasks, *windows[period])
+        assert shared[period] == summarizer.get_detailed_stats(window_tasks, period)
+    assert shared["three-days"] == summarizer.get_trend_series(
+        summarizer.filter_tasks_by_date(tasks, *windows["three-days"]), *windows["three-days"], 3)
+    assert shared["monthly"] == ({}, [])
+
+
+def test_report_stats_exclude_spill_from_before_window():
+    """前一天 23:00 开始、跨午夜的任务属于周报，但不计入日报首日的工作时长"""
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    tasks = [make_task("late", "熬夜写代码", "2025-06-07T03:00:00+00:00", "2025-06-07T06:00:00+00:00", "Work"),
+             make_task("day", "读书", "2025-06-07T14:00:00+00:00", "2025-06-07T15:00:00+00:00")]
+    windows = {"weekly": (date(2025, 6, 2), date(2025, 6, 8)), "daily": (date(2025, 6, 7), date(2025, 6, 7)),
+               "trend": (date(2025, 6, 7), date(2025, 6, 8))}
+    shared = summarizer.get_report_stats(tasks, windows, {"trend": 2})
+
+    daily_tasks = summarizer.filter_tasks_by_date(tasks, *windows["daily"])
+    assert [task["id"] for task in daily_tasks] == ["day"]
+    assert shared["daily"] == summarizer.get_detailed_stats(daily_tasks, "daily")
+    assert shared["daily"][0]["busy_hours"] == 1
+    assert shared["trend"] == summarizer.get_trend_series(daily_tasks, *windows["trend"], 2)
+    assert shared["weekly"] == summarizer.get_detailed_stats(tasks, "weekly")
+    assert shared["weekly"][0]["busy_hours"] == 4
@@ -0,0 +1,153 @@
+# tests/test_checkpoint.py - 分阶段检查点与续跑测试
+from datetime import date
+from unittest.mock import MagicMock
+from src.checkpoint import RunCheckpoint, open_checkpoint
+from src.config import Config
+from src.main import deliver_reports, open_checkpoints, run_reports
+from src.summarizer import TaskSummarizer
+from src.utils import get_report_window
+from tests.test_summarizer import make_task
+
+PERIODS = ["three-days"]
+
+
+def make_clients():
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = []
+    llm = MagicMock()
+    llm.ask_llm.return_value = "# 三日分析"
+    return cfg, notion, TaskSummarizer(config=cfg), llm
+
+
+def test_rerun_resumes_after_answer(tmp_path):
+    """LLM 已成功时，重跑既不查询 Notion 也不再调用 LLM"""
+    cfg, notion, summarizer, llm = make_clients()
+    checkpoints = open_checkpoints(cfg, PERIODS, True, str(tmp_path))
+    run_reports(notion, summarizer, llm, PERIODS, True, checkpoints)
+
+    checkpoints = open_checkpoints(cfg, PERIODS, True, str(tmp_path))
+    answers = run_reports(notion, summarizer, llm, PERIODS, True, checkpoints)
+
+    assert answers == {"three-days": "# 三日分析"}
+    notion._query_tasks.assert_called_once()
+    llm.ask_llm.assert_called_once()
+
+
+def test_failed_answer_is_not_checkpointed(tmp_path):
+    cfg, notion, summarizer, llm = make_clients()
+    llm.ask_llm.return_value = "[LLM 调用失败] timeout"
+    checkpoints = open_checkpoints(cfg, PERIODS, True, str(tmp_path))
+    run_reports(notion, summarizer, llm, PERIODS, True, checkpoints)
+
+    checkpoint = checkpoints["three-days"]
+    assert checkpoint.has("prompt")
+    assert not checkpoint.has("answer")
+    assert checkpoint.first_incomplete() == "answer"
+
+
+def test_from_stage_forces_recompute(tmp_path):
+    cfg, notion, summarizer, llm = make_clients()
+    run_reports(notion, summarizer, llm, PERIODS, True, open_checkpoints(cfg, PERIODS, True, str(tmp_path)))
+
+    checkpoints = open_checkpoints(cfg, PERIODS, True, str(tmp_path), from_stage="prompt")
+    assert checkpoints["three-days"].has("stats")
+    assert not checkpoints["three-days"].has("prompt")
+    run_reports(notion, summarizer, llm, PERIODS, True, checkpoints)
+
+    notion._query_tasks.assert_called_once()
+    assert llm.ask_llm.call_count == 2
+
+
+def test_delivery_retries_only_failed_channels(tmp_path):
+    window = (date(2025, 6, 1), date(2025, 6, 3))
+    checkpoint = open_checkpoint(str(tmp_path), "three-days", window)
+    notifier = MagicMock()
+    notifier.notify_all.return_value = {"telegram_1": True, "email": False}
+    deliver_reports(notifier, {"three-days": "x"}, checkpoints={"three-days": checkpoint})
+    assert not checkpoint.is_complete()
+
+    checkpoint = open_checkpoint(str(tmp_path), "three-days", window)
+    notifier.notify_all.return_value = {"email": True}
+    results = deliver_reports(notifier, {"three-days": "x"}, checkpoints={"three-days": checkpoint})
+
+    assert notifier.notify_all.call_args.kwargs["only"] == ["email"]
+    assert results["three-days"] == {"telegram_1": True, "email": True}
+    assert checkpoint.is_complete()
+    # 完整成功的运行再次打开时从头开始
+    assert open_checkpoint(str(tmp_path), "three-days", window).first_incomplete() == "tasks"
+
+
+def test_disabled_checkpoint_writes_nothing(tmp_path):
+    checkpoint = RunCheckpoint(None, "daily")
+    compute = MagicMock(return_value=[1, 2])
+    stage = checkpoint.stage("tasks")(compute)
+    assert stage() == [1, 2] and stage() == [1, 2]
+    compute.assert_called_once()
+    assert not checkpoint.has("tasks")
+
+
+def run_once(cfg, notion, summarizer, llm, notifier, tmp_path, force=False):
+    checkpoints = open_checkpoints(cfg, PERIODS, True, str(tmp_path), force=force)
+    answers = run_reports(notion, summarizer, llm, PERIODS, True, checkpoints)
+    deliver_reports(notifier, answers, True, checkpoints=checkpoints)
+    return answers
+
+
+def test_unchanged_window_skips_llm_and_delivery(tmp_path):
+    """上次已成功推送且任务没有变化时，只重新查询，不调用 LLM、不重复推送（--force 除外）"""
+    cfg, notion, summarizer, llm = make_clients()
+    yesterday = get_report_window("daily", cfg.timezone, is_yesterday=True)[0].isoformat()
+    task = make_task("a", "写代码", yesterday)
+    task["last_edited_time"] = "2025-06-01T00:00:00.000Z"
+    notion._query_tasks.return_value = [task]
+    notifier = MagicMock()
+    notifier.notify_all.return_value = {"telegram_1": True}
+
+    run_once(cfg, notion, summarizer, llm, notifier, tmp_path)
+    answers = run_once(cfg, notion, summarizer, llm, notifier, tmp_path)
+    assert answers == {"three-days": "# 三日分析"}
+    assert notion._query_tasks.call_count == 2
+    llm.ask_llm.assert_called_once()
+    notifier.notify_all.assert_called_once()
+
+    # 任务被编辑后重新生成并推送
+    task["last_edited_time"] = "2025-06-02T00:00:00.000Z"
+    run_once(cfg, notion, summarizer, llm, notifier, tmp_path)
+    assert llm.ask_llm.call_count == 2 and notifier.notify_all.call_count == 2
+
+    run_once(cfg, notion, summarizer, llm, notifier, tmp_path, force=True)
+    assert llm.ask_llm.call_count == 3 and notifier.notify_all.call_count == 3
+
+
+def test_dry_run_does_not_leave_checkpoints(tmp_path, monkeypatch):
+    """dry-run 之后的正式运行重新查询任务，推送的是包含新任务的报告而不是 dry-run 的答案"""
+    import src.main as main_module
+
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto", run_dir=str(tmp_path),
+                 store_dir="")
+    day = get_report_window("daily", cfg.timezone, True)[0].isoformat()
+    first = [make_task("1", "写代码", day, category="Work")]
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.side_effect = [first, first + [make_task("2", "预览后补记的阅读", day)]]
+    llm = MagicMock()
+    llm.ask_llm.side_effect = lambda prompt, **kwargs: prompt
+    notifier = MagicMock()
+    notifier.notify_all.return_value = {"telegram": True}
+    monkeypatch.setattr(main_module.Config, "from_env", classmethod(lambda cls: cfg))
+    monkeypatch.setattr(main_module, "build_clients",
+                        lambda *args, **kwargs: (notion, TaskSummarizer(config=cfg), llm, notifier))
+
+    monkeypatch.setattr("sys.argv", ["main", "--period", "daily", "--yesterday", "--dry-run"])
+    main_module.main()
+    assert not any(tmp_path.iterdir())
+    notifier.notify_all.assert_not_called()
+
+    monkeypatch.setattr("sys.argv", ["main", "--period", "daily", "--yesterday"])
+    main_module.main()
+    assert notion._query_tasks.call_count == 2
+    assert "预览后补记的阅读" in notifier.notify_all.call_args[0][1]
+    window = get_report_window("daily", cfg.timezone, True)
+    assert RunCheckpoint(str(tmp_path), "daily", window).is_complete()
@@ -0,0 +1,47 @@
+# tests/test_codec.py - JSON 编解码层测试
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+import pytest
+from src import codec
+from src.config import Config
+from src.notion_client import NotionClient
+from tests.test_summarizer import make_task
+
+
+@pytest.fixture(params=["auto", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(codec, "_backend", ("json", codec._std_loads, codec._std_dumps))
+    return codec.backend_name()
+
+
+def test_round_trip_from_bytes(backend):
+    page = make_task("1", "早起学习", "2025-06-05T13:00:00+00:00", xp=10)
+    encoded = codec.dumps(page)
+    assert isinstance(encoded, bytes) and "早起学习".encode() in encoded and b", " not in encoded
+    assert codec.loads(encoded) == codec.loads(memoryview(encoded)) == codec.loads(encoded.decode()) == page
+    with pytest.raises(ValueError):
+        codec.loads(b"{\"results\": [")
+
+
+def test_notion_pages_decoded_from_response_bytes(backend):
+    pages = [{"results": [make_task("1", "写代码", "2025-06-05T13:00:00+00:00")], "has_more": True,
+              "next_cursor": "c1"},
+             {"results": [make_task("2", "读书", "2025-06-05T15:00:00+00:00")], "has_more": False}]
+    session = MagicMock()
+    session.post.side_effect = [MagicMock(content=codec.dumps(page)) for page in pages]
+    notion = NotionClient(Config(notion_token="t", notion_db_id="d"), session=session)
+
+    tasks = notion._query_tasks(date(2025, 6, 5), date(2025, 6, 5))
+    assert [task["id"] for task in tasks] == ["1", "2"]
+    sent = [codec.loads(call.kwargs["data"]) for call in session.post.call_args_list]
+    assert "start_cursor" not in sent[0] and sent[1]["start_cursor"] == "c1"
+
+
+def test_dates_encoded_like_orjson(backend):
+    """各后端对日期、时间的编码一致（ISO 8601），不支持的类型抛出 TypeError"""
+    moment = datetime(2025, 6, 5, 9, 30, tzinfo=timezone(timedelta(hours=-4)))
+    payload = {"day": date(2025, 6, 5), "at": moment, "n": [1, 2.5, None]}
+    assert codec.dumps(payload) == b'{"day":"2025-06-05","at":"2025-06-05T09:30:00-04:00","n":[1,2.5,null]}'
+    with pytest.raises(TypeError):
+        codec.dumps({"x": object()})
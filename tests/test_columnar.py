@@ -0,0 +1,42 @@
+# tests/test_columnar.py - NumPy 列式聚合后端测试
+import pytest
+from src.columnar import COLUMNAR_MIN_TASKS, resolve_backend
+from src.config import Config
+from src.summarizer import TaskSummarizer
+from tests.test_rollup import make_week
+from tests.test_summarizer import make_task
+from tests.test_taxonomy import taxonomy_file  # noqa: F401
+
+pytest.importorskip("numpy")
+
+
+def rollups_with(backend, tasks, taxonomy_file=None):
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto",
+                                              aggregation_backend=backend, taxonomy_file=taxonomy_file))
+    return summarizer.get_daily_rollups(tasks)
+
+
+def test_columnar_rollups_match_python(taxonomy_file):  # noqa: F811
+    """列式后端逐行、逐字段（含数值类型）与纯 Python 结果一致"""
+    tasks = make_week() + [
+        make_task("x1", "通宵写代码", "2025-06-03T23:00:00-04:00", "2025-06-04T02:30:00-04:00", "Work", xp=2.5),
+        make_task("x2", "全天任务", "2025-06-04"),
+        make_task("x3", "无结束", "2025-06-04T10:00:00-04:00", category="Life"),
+        make_task("x5", "跑步", "2025-06-05T06:00:00-04:00", "2025-06-05T07:00:00-04:00", "Health"),
+        make_task("x4", "跨到下一天的学习", "2025-06-06T22:00:00-04:00", "2025-06-07T01:00:00-04:00", "Reading"),
+    ]
+
+    expected = rollups_with("python", tasks, taxonomy_file)
+    actual = rollups_with("numpy", tasks, taxonomy_file)
+
+    assert list(actual) == list(expected)
+    for day in expected:
+        assert [row.to_dict() for row in actual[day]] == [row.to_dict() for row in expected[day]]
+        for ours, theirs in zip(actual[day], expected[day]):
+            assert type(ours.xp) is type(theirs.xp)
+
+
+def test_auto_backend_threshold():
+    assert resolve_backend("auto", COLUMNAR_MIN_TASKS - 1) == "python"
+    assert resolve_backend("auto", COLUMNAR_MIN_TASKS) == "numpy"
+    assert resolve_backend("python", 10 ** 6) == "python"
@@ -0,0 +1,81 @@
+# tests/test_compaction.py - 提示词任务清单压缩测试
+from src.compaction import (LEVEL_DROP, LEVEL_DUPLICATES, LEVEL_NEAR_DUPLICATES, LEVEL_NONE,
+                            estimate_tokens, normalize_title, render_task_list)
+from src.config import Config
+from src.summarizer import TaskSummarizer
+
+
+def detail(title, category="Study", start="09:00", xp=1, tomatoes=1, is_mit=False):
+    return {"title": title, "category": category, "start_time": start, "end_time": "10:00",
+            "duration_min": 25, "xp": xp, "tomatoes": tomatoes, "is_mit": is_mit}
+
+
+def month_of_quizzes():
+    details = []
+    for day in range(30):
+        details.append(detail(f"D333 Quiz {10 * (day % 5 + 1)}题", start=f"{day % 24:02d}:00", xp=3, tomatoes=2))
+        details.append(detail("背单词", start=f"{day % 24:02d}:30", xp=1, tomatoes=1))
+    details.append(detail("完成 CPA 第三章", category="Work", xp=20, tomatoes=6, is_mit=True))
+    return details
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("复盘") == 2
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_normalize_title_keeps_course_codes():
+    assert normalize_title("D333 Quiz 20题") == normalize_title("d333  quiz 50题") == "d333 quiz N题"
+    assert normalize_title("D333 Quiz") != normalize_title("D334 Quiz")
+
+
+def test_within_budget_is_unchanged():
+    details = [detail("阅读", start="08:00"), detail("写代码", category="Work", is_mit=True)]
+    result = render_task_list(details, budget_tokens=10000)
+
+    assert result.level == LEVEL_NONE
+    assert result.ratio == 1.0
+    assert result.text == "【Study】\n- 阅读 | 08:00-10:00 | 1/1\n【Work】\n- 写代码 (MIT) | 09:00-10:00 | 1/1"
+
+
+def test_duplicates_then_near_duplicates_are_merged():
+    details = month_of_quizzes()
+    full = render_task_list(details)
+
+    duplicates = render_task_list(details, budget_tokens=full.tokens - 1)
+    assert duplicates.level == LEVEL_DUPLICATES
+    assert "- 背单词 ×30 | 30/30" in duplicates.text
+    assert "- D333 Quiz 10题 ×6 | 18/12" in duplicates.text
+
+    near = render_task_list(details, budget_tokens=duplicates.tokens - 1)
+    assert near.level == LEVEL_NEAR_DUPLICATES
+    assert "- D333 Quiz N题（N=10、20、30、40、50） ×30 | 90/60" in near.text
+    assert near.ratio < 0.2
+
+
+def test_least_informative_groups_are_dropped_first():
+    details = month_of_quizzes() + [detail(f"杂事{i}", category="Life", xp=0, tomatoes=0) for i in range(20)]
+    result = render_task_list(details, budget_tokens=60)
+
+    assert result.level == LEVEL_DROP
+    # MIT 任务保留，零 XP 的杂事先被并入“其余”
+    assert "完成 CPA 第三章" in result.text
+    assert "- 其余" in result.text
+    assert result.dropped >= 20
+    assert result.tokens < result.original_tokens
+
+
+def test_build_prompt_respects_budget():
+    config = Config(notion_token="t", notion_db_id="d", prompt_token_budget=1000)
+    summarizer = TaskSummarizer(config=config)
+    stats = {"total": 61, "xp": 110, "cats": {"Study": 60, "Work": 1}, "mit_count": 1}
+
+    compact = summarizer.build_prompt(stats, month_of_quizzes(), "daily")
+    full = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", prompt_token_budget=0)) \
+        .build_prompt(stats, month_of_quizzes(), "daily")
+
+    assert estimate_tokens(compact) <= 1000 < estimate_tokens(full)
+    assert full.count("| 3/2") == 30
+    assert compact.count("| 3/2") == 0
+    assert "完成 CPA 第三章 (MIT)" in compact
@@ -0,0 +1,112 @@
+# tests/test_deadline.py - 运行截止时间、分阶段预算与降级结果测试
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from src import codec
+from src import deadline as deadline_module
+from src.config import Config
+from src.deadline import Deadline, DeadlineExceeded, start_deadline
+from src.main import handle_daily_report
+from src.notion_client import NotionClient
+from src.summarizer import TaskSummarizer
+from tests.test_goals import day_tasks
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def reset_deadline():
+    yield
+    start_deadline(0)
+
+
+def test_stage_budgets_bound_request_timeouts():
+    clock = FakeClock()
+    deadline = Deadline(100, clock=clock)
+    assert deadline.timeout("fetch") == 30
+    clock.now = 20
+    assert deadline.timeout("fetch") == 10  # 查询只能用到 30%
+    assert deadline.timeout("notify") == 15
+
+    clock.now = 31
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout("fetch")
+    assert deadline.timeout("llm") == 54  # LLM 用到 85%，剩余留给推送
+    assert not deadline.expired() and Deadline(0).remaining() is None
+
+
+def test_notion_query_uses_budget_and_is_not_retried(monkeypatch):
+    session = MagicMock()
+    session.post.return_value.content = codec.dumps({"results": [], "has_more": False})
+    notion = NotionClient(Config(notion_token="t", notion_db_id="d"), session=session)
+    notion._query_tasks(date(2025, 6, 5), date(2025, 6, 5))
+    assert session.post.call_args.kwargs["timeout"] == 30
+
+    clock = FakeClock()
+    monkeypatch.setattr(deadline_module, "_deadline", Deadline(10, clock=clock))
+    clock.now = 5
+    session.post.reset_mock()
+    with pytest.raises(DeadlineExceeded):
+        notion._query_tasks(date(2025, 6, 5), date(2025, 6, 5))
+    session.post.assert_not_called()
+
+
+def test_cancelled_llm_falls_back_to_stats_report():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    llm = MagicMock()
+    llm.ask_llm.return_value = "[LLM 调用失败] llm 阶段超出时间预算（RUN_TIMEOUT=60s）"
+
+    answer = handle_daily_report(None, summarizer, llm, tasks=day_tasks())
+    assert answer.startswith("[LLM 调用失败]")  # 不写入答案检查点，续跑时重试
+    assert "目标核对（3/4）" in answer
+
+    # 两阶段推送已经发出统计报告，不再重复附带
+    answer = handle_daily_report(None, summarizer, llm, tasks=day_tasks(), preview=lambda text: None)
+    assert "目标核对" not in answer
+
+
+def test_fetch_overrun_degrades_instead_of_aborting(tmp_path, monkeypatch, capsys):
+    """查询超时：沿用上次成功运行的报告（只打印不重复推送），没有时推送超时说明，最终以状态码 1 退出"""
+    import src.main as main_module
+
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto", run_dir=str(tmp_path),
+                 store_dir="")
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = []
+    llm = MagicMock()
+    llm.ask_llm.return_value = "# 三日分析"
+    notifier = MagicMock()
+    notifier.notify_all.return_value = {"telegram": True}
+    monkeypatch.setattr(main_module.Config, "from_env", classmethod(lambda cls: cfg))
+    monkeypatch.setattr(main_module, "build_clients",
+                        lambda *args, **kwargs: (notion, TaskSummarizer(config=cfg), llm, notifier))
+
+    monkeypatch.setattr("sys.argv", ["main", "--period", "three-days", "--yesterday"])
+    main_module.main()
+    notifier.notify_all.assert_called_once()
+    capsys.readouterr()
+
+    notion._query_tasks.side_effect = DeadlineExceeded("fetch 阶段超出时间预算（RUN_TIMEOUT=60s）")
+    monkeypatch.setattr("sys.argv", ["main", "--period", "daily,three-days", "--yesterday"])
+    with pytest.raises(SystemExit) as exc:
+        main_module.main()
+    assert exc.value.code == 1
+    assert "以下为上次成功运行的报告" in capsys.readouterr().out
+    llm.ask_llm.assert_called_once()
+    # 三日报告已推送过，只有日报推送了超时说明
+    assert notifier.notify_all.call_count == 2
+    assert notifier.notify_all.call_args[0][1].startswith(main_module.FETCH_TIMEOUT_PREFIX)
+
+    # 恢复后数据没有变化，继续沿用上次的三日报告
+    notion._query_tasks.side_effect = None
+    monkeypatch.setattr("sys.argv", ["main", "--period", "three-days", "--yesterday"])
+    main_module.main()
+    llm.ask_llm.assert_called_once()
+    assert notifier.notify_all.call_count == 2
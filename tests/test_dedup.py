@@ -0,0 +1,52 @@
+# tests/test_dedup.py - MIT 去重与 Quiz 题量测试
+from src.config import Config
+from src.dedup import cluster_titles, core_title, format_mit_facts, mit_summary, quiz_questions
+from src.summarizer import TaskSummarizer
+from tests.test_summarizer import make_task
+
+
+def detail(title, is_mit=True, date="2025-06-05"):
+    return {"title": title, "is_mit": is_mit, "date": date}
+
+
+def test_core_title_strips_counts():
+    assert core_title("D333 Quiz 10题") == core_title("d333 quiz 30 题") == "d333quiz"
+    assert core_title("Gemini Quiz 50 questions") == "geminiquiz"
+    assert quiz_questions("D333 Quiz 30 道题") == 30
+    assert quiz_questions("写代码") == 0
+
+
+def test_cluster_near_duplicates():
+    titles = ["D333 Quiz 10题", "CPA 第三章", "D333 Quiz 20题", "BQ 练习 第2周", "BQ练习第3周", "CPA 第四章"]
+    assert cluster_titles(titles) == [[0, 2], [1], [3, 4], [5]]
+
+
+def test_same_quiz_counts_as_one_mit():
+    """同一 Quiz 的 10/20/30 题只算一个 MIT；Gemini Quiz 100 题算两个"""
+    summary = mit_summary([
+        detail("D333 Quiz 10题"), detail("D333 Quiz 20题"), detail("D333 Quiz 30题"),
+        detail("Gemini Quiz 100题"), detail("完成 CPA 第三章"),
+        detail("D333 Quiz 15题", is_mit=False),
+    ])
+
+    assert summary["distinct_mit"] == 3
+    assert summary["mit_credits"] == 1 + 2 + 1
+    assert summary["quiz_questions"] == 175
+    assert summary["quiz_minutes"] == 525
+
+
+def test_mit_rule_is_applied_per_day():
+    summary = mit_summary([detail("D333 Quiz 20题", date="2025-06-05"),
+                           detail("D333 Quiz 30题", date="2025-06-06")])
+    assert summary["distinct_mit"] == 2
+
+
+def test_facts_in_daily_prompt():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    tasks = [make_task(str(n), f"D333 Quiz {n}题", f"2025-06-05T{8 + n // 10:02d}:00:00-04:00", priority="MIT")
+             for n in (10, 20, 30)]
+    stats, details = summarizer.get_detailed_stats(tasks)
+
+    assert format_mit_facts(stats) == "标记 3 个，去重后 1 项，按题量折算 1 个（D333 Quiz 10题 等 3 个，共 60 题 → 1 个）"
+    prompt = summarizer.build_prompt(stats, details, "daily")
+    assert "- Quiz 题量：共 60 题，按每题 3 分钟折合 180 分钟（3.0 小时）" in prompt
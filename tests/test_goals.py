@@ -0,0 +1,77 @@
+# tests/test_goals.py - “每日确保”目标规则引擎测试
+import json
+import pytest
+from src.config import Config
+from src.goals import load_goals
+from src.main import handle_daily_report
+from src.summarizer import TaskSummarizer
+from tests.test_summarizer import make_task
+
+
+def day_tasks():
+    return [
+        make_task("1", "D333 Quiz 50题", "2025-06-05T08:00:00-04:00", "2025-06-05T10:30:00-04:00", priority="MIT"),
+        make_task("2", "CPA 第三章", "2025-06-05T10:00:00-04:00", "2025-06-05T12:00:00-04:00", priority="MIT"),
+        make_task("3", "吃维生素C", "2025-06-05T12:30:00-04:00", category="Health"),
+        make_task("4", "跑步", "2025-06-05T18:00:00-04:00", "2025-06-05T18:20:00-04:00", "Health"),
+        make_task("5", "项目开发", "2025-06-05T14:00:00-04:00", "2025-06-05T17:00:00-04:00", "Work", priority="MIT"),
+    ]
+
+
+def goal_map(stats):
+    return {goal["name"]: goal for goal in stats["goals"]}
+
+
+def test_default_daily_goals():
+    """学习按合并后的时长计（8:00-12:00 共 4 小时），锻炼 20 分钟未达标"""
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    stats, _ = summarizer.get_detailed_stats(day_tasks())
+    goals = goal_map(stats)
+
+    assert set(goals) == {"study", "exercise", "mit", "vitamins"}
+    assert (goals["study"]["value"], goals["study"]["passed"]) == (4, True)
+    assert (goals["exercise"]["value"], goals["exercise"]["target"], goals["exercise"]["passed"]) == (20, "≥30分钟", False)
+    assert (goals["mit"]["value"], goals["mit"]["passed"]) == (3, True)
+    assert goals["vitamins"]["passed"]
+
+
+def test_weekly_rules_and_goal_file(tmp_path):
+    path = tmp_path / "goals.json"
+    path.write_text(json.dumps({"goals": [
+        {"name": "work", "label": "工作", "categories": ["Work"], "measure": "hours", "min": 2, "max": 8,
+         "periods": ["daily", "weekly"]},
+        {"name": "quiz", "label": "Quiz", "metric": "quiz_questions", "max": 40, "unit": "题"},
+    ]}), encoding="utf-8")
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto",
+                                              goals_file=str(path)))
+
+    daily = goal_map(summarizer.get_detailed_stats(day_tasks(), "daily")[0])
+    assert (daily["work"]["value"], daily["work"]["target"], daily["work"]["passed"]) == (3, "2~8小时", True)
+    assert (daily["quiz"]["value"], daily["quiz"]["passed"]) == (50, False)
+    assert set(goal_map(summarizer.get_detailed_stats(day_tasks(), "weekly")[0])) == {"work"}
+
+
+@pytest.mark.parametrize("entry", [
+    {"name": "a", "metric": "unknown", "min": 1},
+    {"name": "a", "keywords": ["x"]},
+    {"name": "a", "min": 1},
+    {"name": "a", "metric": "xp", "keywords": ["x"], "min": 1},
+    {"name": "a", "keywords": ["x"], "measure": "days", "min": 1},
+])
+def test_invalid_goal_file(tmp_path, entry):
+    path = tmp_path / "goals.json"
+    path.write_text(json.dumps({"goals": [entry]}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_goals(str(path))
+
+
+def test_goals_in_prompt_and_stats_only_report():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    stats, details = summarizer.get_detailed_stats(day_tasks())
+
+    prompt = summarizer.build_prompt(stats, details, "daily")
+    assert "- 目标核对：达成 3/4：学习 4小时（目标≥4小时，达成）；锻炼 20分钟（目标≥30分钟，未达成）" in prompt
+
+    report = handle_daily_report(None, summarizer, None, tasks=day_tasks())
+    assert "目标核对（3/4）" in report
+    assert "❌ 锻炼：20分钟（目标≥30分钟）" in report
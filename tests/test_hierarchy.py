@@ -0,0 +1,62 @@
+# tests/test_hierarchy.py - 分层报告（周报复用日报复盘、月报复用周报复盘）测试
+from datetime import date
+from unittest.mock import MagicMock
+import pytest
+from src.config import Config
+from src.hierarchy import HierarchicalReporter, child_windows
+from src.main import handle_daily_report, handle_period_report
+from src.store import LocalStore
+from src.summarizer import TaskSummarizer
+from tests.test_rollup import make_week
+
+WEEK = (date(2025, 6, 2), date(2025, 6, 8))
+
+
+@pytest.fixture
+def summarizer(tmp_path):
+    config = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto", hierarchical_reports=True)
+    return TaskSummarizer(config=config, store=LocalStore(str(tmp_path)))
+
+
+def echo_llm():
+    llm = MagicMock()
+    llm.ask_llm.side_effect = lambda prompt, **kwargs: f"复盘#{llm.ask_llm.call_count}"
+    return llm
+
+
+def test_month_splits_into_full_weeks_and_edge_days():
+    children = child_windows("monthly", (date(2025, 6, 1), date(2025, 6, 30)))
+    assert children[0] == ("daily", (date(2025, 6, 1), date(2025, 6, 1)))
+    assert [window for period, window in children if period == "weekly"] == [
+        (date(2025, 6, d), date(2025, 6, d + 6)) for d in (2, 9, 16, 23)]
+    assert children[-1] == ("daily", (date(2025, 6, 30), date(2025, 6, 30)))
+
+
+def test_weekly_prompt_reuses_daily_summaries(summarizer):
+    tasks = [task for task in make_week() if task["id"][0] != "1"]  # 6月2日~7日
+    llm = echo_llm()
+
+    prompt = HierarchicalReporter(summarizer, llm).build_prompt("weekly", WEEK, tasks)
+    assert llm.ask_llm.call_count == 6
+    assert "【2025-06-02 周一】任务 3 个，XP 11，MIT 1 个" in prompt
+    assert "- 写代码" not in prompt  # 原始任务清单不再进入周报提示词
+
+    # 再次生成只读缓存；某天的任务被编辑后只补齐这一天
+    HierarchicalReporter(summarizer, llm).build_prompt("weekly", WEEK, tasks)
+    assert llm.ask_llm.call_count == 6
+    tasks[0]["last_edited_time"] = "2025-06-09T00:00:00.000Z"
+    HierarchicalReporter(summarizer, llm).build_prompt("weekly", WEEK, tasks)
+    assert llm.ask_llm.call_count == 7
+
+
+def test_daily_run_feeds_weekly_report(summarizer):
+    tasks = [task for task in make_week() if task["id"][0] in "23"]
+    llm = echo_llm()
+    handle_daily_report(None, summarizer, llm, tasks=[task for task in tasks if task["id"][0] == "2"])
+    assert llm.ask_llm.call_count == 1
+
+    # 周报只补齐 6月3日，再调用一次生成周报本身
+    handle_period_report(None, summarizer, llm, "weekly", tasks=tasks, window=WEEK)
+    assert llm.ask_llm.call_count == 3
+    weekly_prompt = llm.ask_llm.call_args[0][0]
+    assert "复盘#1" in weekly_prompt and "复盘#2" in weekly_prompt
@@ -0,0 +1,57 @@
+# tests/test_intervals.py - 扫描线时间区间引擎测试
+import pytz
+from datetime import date, datetime
+from src.config import Config
+from src.intervals import split_at_midnight, sweep
+from src.summarizer import TaskSummarizer
+from tests.test_summarizer import make_task
+
+TZ = pytz.timezone("America/Toronto")
+
+
+def at(day, hour, minute=0):
+    return TZ.localize(datetime(2025, 6, day, hour, minute))
+
+
+def test_sweep_time_account():
+    account = sweep([
+        (at(5, 9), at(5, 11), "Work"),
+        (at(5, 10), at(5, 12), "Study"),     # 与 Work 重叠 1 小时
+        (at(5, 13), at(5, 14), "Work"),      # 12:00-13:00 空档
+        (at(5, 14), at(5, 15), "Work"),      # 首尾相接，不算空档
+        (at(5, 16), at(5, 16), "Life"),      # 零长度不计时
+    ])
+
+    assert account.busy_hours == 5
+    assert account.overlap_hours == 1
+    assert account.idle_hours == 1
+    assert account.idle_gaps == [(at(5, 12), at(5, 13))]
+    assert account.category_hours == {"Work": 4, "Study": 2}
+    # Work → Study → Work
+    assert account.context_switches == 2
+
+
+def test_split_at_midnight_handles_dst():
+    """跨午夜的任务按本地日期切段；夏令时开始当天只有 23 小时"""
+    start = TZ.localize(datetime(2025, 3, 8, 22))
+    end = TZ.localize(datetime(2025, 3, 10, 1))
+    pieces = split_at_midnight(start, end, TZ)
+
+    assert [day for day, _, _ in pieces] == [date(2025, 3, 8), date(2025, 3, 9), date(2025, 3, 10)]
+    hours = [(piece_end - piece_start).total_seconds() / 3600 for _, piece_start, piece_end in pieces]
+    assert hours == [2, 23, 1]
+
+
+def test_detailed_stats_time_account():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    tasks = [
+        make_task("1", "写代码", "2025-06-05T23:00:00-04:00", "2025-06-06T01:00:00-04:00", "Work"),
+        make_task("2", "阅读", "2025-06-06T08:00:00-04:00", "2025-06-06T09:00:00-04:00", "Study"),
+    ]
+    stats, _ = summarizer.get_detailed_stats(tasks)
+
+    # 6月5日只计 23:00-24:00，6月6日的 00:00-01:00 计入当天时间线
+    assert stats["busy_hours"] == 3.0
+    assert stats["category_hours"] == {"Work": 2.0, "Study": 1.0}
+    assert stats["idle_hours"] == 7.0
+    assert stats["context_switches"] == 1
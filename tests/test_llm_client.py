@@ -25,7 +25,7 @@ def test_ask_llm_with_reasoner_model(base_config):
     base_config.llm_model = "deepseek-reasoner"
 
     # Patch the OpenAI client to avoid real network calls
-    with patch('src.llm_client.OpenAI') as mock_openai:
+    with patch('openai.OpenAI') as mock_openai:
         # Create a mock instance for the client and its methods
         mock_client_instance = MagicMock()
         mock_openai.return_value = mock_client_instance
@@ -57,7 +57,7 @@ def test_ask_llm_with_chat_model(base_config):
     # Set model in config
     base_config.llm_model = "deepseek-chat"
 
-    with patch('src.llm_client.OpenAI') as mock_openai:
+    with patch('openai.OpenAI') as mock_openai:
         mock_client_instance = MagicMock()
         mock_openai.return_value = mock_client_instance
 
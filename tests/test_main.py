@@ -0,0 +1,136 @@
+# tests/test_main.py - 入口逻辑测试
+import argparse
+import subprocess
+import sys
+import pytest
+from unittest.mock import MagicMock
+from src import codec
+from src.config import Config
+from src.main import PreviewSender, build_clients, deliver_reports, parse_periods, run_reports
+from src.notifier import Notifier
+from src.summarizer import TaskSummarizer
+
+
+def test_parse_periods_list():
+    """--period 支持逗号分隔的多个周期并去重"""
+    assert parse_periods("daily, three-days,daily") == ["daily", "three-days"]
+
+
+def test_parse_periods_invalid():
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_periods("daily,yearly")
+
+
+def test_run_reports_fetches_union_window_once():
+    """多报告模式只查询一次 Notion，并为每个周期各调用一次 LLM"""
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = []
+    llm = MagicMock()
+    llm.ask_llm.return_value = "ok"
+
+    answers = run_reports(notion, TaskSummarizer(config=cfg), llm, ["daily", "three-days"], is_yesterday=True)
+
+    notion._query_tasks.assert_called_once()
+    start, end = notion._query_tasks.call_args[0]
+    assert (end - start).days == 2
+    assert set(answers) == {"daily", "three-days"}
+    # 日报无任务时不调用 LLM，三日报告调用一次
+    llm.ask_llm.assert_called_once()
+
+
+def test_import_main_is_lazy():
+    """导入入口模块时不应加载 openai / requests / smtplib / pytz 等重依赖"""
+    code = (
+        "import sys, src.main; "
+        "heavy = ['openai', 'requests', 'smtplib', 'email.mime', 'pytz', 'dotenv']; "
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_stats_only_clients_skip_llm():
+    """--stats-only 不创建 LLM 客户端：不导入 openai，也不要求配置 API Key"""
+    code = (
+        "import sys; from src.config import Config; from src.main import build_clients; "
+        "clients = build_clients(Config(notion_token='t', notion_db_id='d', store_dir=''), with_llm=False); "
+        "print(clients[2], 'openai' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "None False"
+    with pytest.raises(ValueError, match="API Key"):
+        build_clients(Config(notion_token="t", notion_db_id="d", store_dir=""))
+
+
+def test_trend_report_fetches_window_once():
+    """--period trend --days N 只查询一次 N 天窗口"""
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = []
+    llm = MagicMock()
+    llm.ask_llm.return_value = "ok"
+
+    answers = run_reports(notion, TaskSummarizer(config=cfg), llm, ["trend"], trend_days=30)
+
+    notion._query_tasks.assert_called_once()
+    start, end = notion._query_tasks.call_args[0]
+    assert (end - start).days == 29
+    assert answers == {"trend": "ok"}
+    assert "过去30天" in llm.ask_llm.call_args[0][0]
+
+
+def test_progressive_delivery_replies_to_stats_message():
+    """两阶段推送：统计报告先于 LLM 推送，AI 分析回复同一条消息；LLM 失败时不推送失败文本"""
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto", telegram_bot_token="b",
+                 telegram_chat_id="1")
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = []
+    notifier = Notifier(cfg, session=MagicMock())
+    notifier.session.post.return_value = MagicMock(status_code=200,
+                                                   content=codec.dumps({"result": {"message_id": 42}}))
+    events = []
+    llm = MagicMock()
+    llm.ask_llm.side_effect = lambda prompt, **kwargs: events.append("llm") or "# 三日分析"
+    preview = PreviewSender(notifier, is_yesterday=True)
+    notifier.notify_preview = MagicMock(side_effect=lambda *args: events.append("stats") or {"telegram_1": 42})
+
+    answers = run_reports(notion, TaskSummarizer(config=cfg), llm, ["three-days"], True, preview=preview)
+    deliver_reports(notifier, answers, True, previews=preview.refs)
+
+    assert events == ["stats", "llm"]
+    assert "3-Day Trend（统计）" in notifier.notify_preview.call_args[0][1]
+    payload = notifier.session.post.call_args.kwargs["json"]
+    assert payload["reply_to_message_id"] == 42 and "三日分析" in payload["text"]
+
+    notifier.session.post.reset_mock()
+    deliver_reports(notifier, {"three-days": "[LLM 调用失败] timeout"}, True, previews=preview.refs)
+    notifier.session.post.assert_not_called()
+
+
+def test_run_reports_aggregates_shared_tasks_in_one_pass():
+    """多报告共用的任务只解析、聚合一次，各报告的统计阶段直接取用"""
+    from datetime import datetime, timedelta
+    import pytz
+    from tests.test_summarizer import make_task
+
+    cfg = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    yesterday = (datetime.now(pytz.timezone(cfg.timezone)) - timedelta(days=1)).date()
+    notion = MagicMock()
+    notion.config = cfg
+    notion._query_tasks.return_value = [make_task("1", "写代码", f"{yesterday}T09:00:00", f"{yesterday}T10:00:00")]
+    llm = MagicMock()
+    llm.ask_llm.return_value = "ok"
+    summarizer = TaskSummarizer(config=cfg)
+    summarizer.get_report_stats = MagicMock(wraps=summarizer.get_report_stats)
+    summarizer.get_detailed_stats = MagicMock(side_effect=AssertionError("重复聚合"))
+    summarizer.get_trend_series = MagicMock(side_effect=AssertionError("重复聚合"))
+
+    answers = run_reports(notion, summarizer, llm, ["daily", "three-days"], is_yesterday=True)
+
+    assert answers == {"daily": "ok", "three-days": "ok"}
+    summarizer.get_report_stats.assert_called_once()
+    assert "写代码" in llm.ask_llm.call_args_list[0][0][0] + llm.ask_llm.call_args_list[1][0][0]
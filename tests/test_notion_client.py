@@ -2,6 +2,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from datetime import date
+from src import codec
 from src.config import Config
 from src.notion_client import NotionClient, calc_xp
 
@@ -58,7 +59,7 @@ def test_query_tasks_success(mock_post, notion_client):
     """测试成功查询任务"""
     mock_response = Mock()
     mock_response.raise_for_status.return_value = None
-    mock_response.json.return_value = {
+    mock_response.content = codec.dumps({
         "results": [
             {
                 "id": "test_id",
@@ -69,7 +70,7 @@ def test_query_tasks_success(mock_post, notion_client):
                 }
             }
         ]
-    }
+    })
     mock_post.return_value = mock_response
 
     start_date = date(2024, 1, 1)
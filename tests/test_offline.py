@@ -0,0 +1,87 @@
+# tests/test_offline.py - Notion 数据库导出的离线导入与查询测试
+import json
+from datetime import date
+import pytest
+from src import offline
+from src.config import Config
+from src.offline import OfflineNotionClient, ingest_export, iter_export, parse_export_date
+from src.store import LocalStore
+from src.summarizer import TaskSummarizer
+from tests.test_summarizer import make_task
+
+CSV_EXPORT = (
+    "﻿任务名称,分类,优先级,计划日期,状态,XP,番茄数,实际用时(min)\n"
+    "早起学习,Study,MIT,\"June 5, 2025 8:00 AM (EDT) → 10:00 AM\",Done,10,4,120\n"
+    "\"读书\n笔记\",Study,,\"June 5, 2025 11:00 PM → June 6, 2025 1:00 AM\",Done,5,2,\n"
+    "喝水,Health,,\"June 6, 2025\",Done,1,,\n"
+    "喝水,Health,,\"June 6, 2025\",Done,1,,\n"
+    "还没做,Work,,\"June 6, 2025 9:00 AM\",Not started,5,1,\n"
+    "周报,Work,,2025/06/09 09:30,Done,3,1,30\n"
+)
+
+
+def config():
+    return Config(notion_token="", notion_db_id="d", timezone="America/Toronto", offline=True)
+
+
+def test_parse_export_dates():
+    assert parse_export_date("June 5, 2025 8:00 AM (EDT) → 10:00 AM") == ("2025-06-05T08:00:00", "2025-06-05T10:00:00")
+    assert parse_export_date("2025/06/09 09:30") == ("2025-06-09T09:30:00", None)
+    assert parse_export_date("June 6, 2025") == ("2025-06-06", None)
+    assert parse_export_date("2025-06-05T13:00:00.000+00:00") == ("2025-06-05T13:00:00+00:00", None)
+    assert parse_export_date("") == (None, None)
+    with pytest.raises(ValueError):
+        parse_export_date("下周三")
+
+
+def test_ingest_csv_and_report_offline(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(CSV_EXPORT, encoding="utf-8")
+    store = LocalStore(str(tmp_path / "store"))
+
+    counts = ingest_export(str(path), store, "America/Toronto", flush_rows=2)
+    assert counts == {"rows": 6, "tasks": 5, "skipped": 1, "days": 3}
+    assert [day.isoformat() for day in store.partition_days("tasks")] == ["2025-06-05", "2025-06-06", "2025-06-09"]
+
+    notion = OfflineNotionClient(config(), store)
+    tasks = notion._query_tasks(date(2025, 6, 2), date(2025, 6, 8))
+    assert len(tasks) == 4 and len({task["id"] for task in tasks}) == 4  # 相同的两行得到不同 id
+
+    summarizer = TaskSummarizer(config=config())
+    stats, details = summarizer.get_detailed_stats(tasks, "weekly")
+    assert (stats["total"], stats["xp"], stats["mit_count"]) == (4, 17, 1)
+    assert summarizer.filter_tasks_by_date(tasks, date(2025, 6, 5), date(2025, 6, 5)) == tasks[:2]
+
+    # 重新导入同一份导出，id 与内容不变，指纹随之稳定
+    ingest_export(str(path), store, "America/Toronto")
+    assert notion._query_tasks(date(2025, 6, 2), date(2025, 6, 8)) == tasks
+
+
+def test_ingest_json_streams_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(offline, "CHUNK_SIZE", 16)
+    pages = [make_task(str(i), f"任务{i}", f"2025-06-0{i}T14:00:00+00:00", xp=i) for i in range(1, 6)]
+    pages[2]["properties"]["状态"] = {"select": {"name": "In progress"}}
+    api_dump = tmp_path / "export.json"
+    api_dump.write_text(json.dumps({"object": "list", "results": pages, "has_more": False}, ensure_ascii=False),
+                        encoding="utf-8")
+    json_lines = tmp_path / "export.jsonl"
+    json_lines.write_text("\n".join(json.dumps(page, ensure_ascii=False) for page in pages[:2]), encoding="utf-8")
+
+    assert [row["id"] for row in iter_export(str(api_dump))] == ["1", "2", "3", "4", "5"]
+    store = LocalStore(str(tmp_path / "store"))
+    assert ingest_export(str(api_dump), store, "America/Toronto")["tasks"] == 4
+
+    # 导出只覆盖其日期范围：范围之外已导入的日期保留
+    assert ingest_export(str(json_lines), store, "America/Toronto")["days"] == 2
+    assert store.partition_days("tasks") == [date(2025, 6, d) for d in (1, 2, 4, 5)]
+    tasks = OfflineNotionClient(config(), store)._query_tasks(date(2025, 6, 1), date(2025, 6, 30))
+    assert tasks == pages[:2] + pages[3:]
+
+    # 范围之内导出中已不存在的日期被删除
+    json_lines.write_text("\n".join(json.dumps(page, ensure_ascii=False) for page in (pages[0], pages[4])),
+                          encoding="utf-8")
+    assert ingest_export(str(json_lines), store, "America/Toronto")["days"] == 2
+    assert store.partition_days("tasks") == [date(2025, 6, 1), date(2025, 6, 5)]
+
+    with pytest.raises(ValueError):
+        list(iter_export(str(tmp_path / "export.xlsx")))
@@ -0,0 +1,79 @@
+# tests/test_parallel.py - 多进程解析与按天汇总测试
+from dataclasses import replace
+from src import parallel
+from src.config import Config
+from src.parallel import ParallelParser, pack_record, unpack_record
+from src.store import LocalStore
+from src.summarizer import TaskSummarizer
+from tests.test_goals import day_tasks
+from tests.test_rollup import make_week
+from tests.test_summarizer import make_task
+
+
+def all_tasks():
+    return make_week() + day_tasks() + [
+        make_task("x", "熬夜写代码", "2025-06-04T03:00:00+00:00", "2025-06-04T06:00:00+00:00", "Work", xp=5),
+        make_task("y", "全天复习", "2025-06-06", category="Study", priority="MIT"),
+        make_task("z", "通宵", "2025-06-05T02:00:00.123+00:00", "2025-06-05T05:00:00+00:00", "Life"),
+    ]
+
+
+def dst_tasks():
+    """夏令时切换前后：不带时区的时间与仅日期的值按配置时区本地化"""
+    return [
+        make_task("d1", "跨切换写作", "2025-03-08T23:30:00", "2025-03-09T04:00:00", "Work", xp=3),
+        make_task("d2", "切换日复习", "2025-03-09", category="Study"),
+        make_task("d3", "回拨夜", "2025-11-02T00:30:00", "2025-11-02T03:30:00", "Life"),
+        make_task("d4", "带偏移", "2025-11-02T01:30:00-04:00", "2025-11-02T01:30:00-05:00", "Work"),
+    ]
+
+
+def moments(record):
+    """时刻连同时区对象（pytz 的夏令时/冬令时对象或固定偏移）"""
+    return [(moment, moment.tzinfo, moment.isoformat()) for moment in (record.start, record.end) if moment]
+
+
+def test_packed_records_round_trip():
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto"))
+    for record in summarizer.parse_tasks(all_tasks() + dst_tasks()):
+        restored = unpack_record(pack_record(record), summarizer.tz)
+        assert restored == record
+        assert moments(restored) == moments(record)
+
+
+def test_parallel_stats_match_serial(monkeypatch, tmp_path):
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_TASKS", 10)
+    config = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    tasks = all_tasks()
+    serial = TaskSummarizer(config=config).get_detailed_stats(tasks, "weekly")
+
+    summarizer = TaskSummarizer(config=replace(config, parse_workers=2), store=LocalStore(str(tmp_path)))
+    summarizer._parallel = ParallelParser(2, config.timezone, summarizer.taxonomy, chunk_tasks=4)
+    try:
+        assert summarizer.get_detailed_stats(tasks, "weekly") == serial
+        # 子进程建好的汇总行写入本地存储后，下次直接读取
+        assert TaskSummarizer(config=config, store=LocalStore(str(tmp_path))).get_detailed_stats(
+            tasks, "weekly") == serial
+    finally:
+        summarizer._parallel.close()
+
+    # 任务量不足阈值时不启动进程池
+    assert TaskSummarizer(config=replace(config, parse_workers=2))._parallel_parser(9) is None
+
+
+def test_parallel_parse_keeps_configured_timezone():
+    config = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    summarizer = TaskSummarizer(config=config)
+    tasks = dst_tasks() + all_tasks()
+    serial = summarizer.parse_tasks(tasks)
+
+    parser = ParallelParser(2, config.timezone, summarizer.taxonomy, chunk_tasks=3)
+    try:
+        parsed = parser.parse(tasks)
+    finally:
+        parser.close()
+    assert parsed == serial
+    assert [moments(record) for record in parsed] == [moments(record) for record in serial]
+    # 跨夏令时切换的任务仍挂着配置时区，开始为冬令时、结束为夏令时
+    assert parsed[0].start.tzinfo.zone == "America/Toronto"
+    assert (parsed[0].start.utcoffset().total_seconds(), parsed[0].end.utcoffset().total_seconds()) == (-18000, -14400)
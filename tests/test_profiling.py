@@ -0,0 +1,49 @@
+# tests/test_profiling.py - 分段计时测试
+import json
+import threading
+import pytest
+from src.profiling import Profiler
+
+
+def test_nested_spans_record_paths():
+    """嵌套 span 记录完整路径，并可在块内追加属性"""
+    profiler = Profiler()
+    with profiler.span("report.daily"):
+        with profiler.span("prompt") as attrs:
+            attrs["chars"] = 42
+
+    stages = profiler.summary()
+    assert list(stages) == ["report.daily", "report.daily/prompt"]
+    prompt_span = [s for s in profiler.spans if s["name"] == "prompt"][0]
+    assert prompt_span["attrs"] == {"chars": 42}
+
+
+def test_span_records_errors():
+    profiler = Profiler()
+    with pytest.raises(ValueError):
+        with profiler.span("llm"):
+            raise ValueError("boom")
+
+    assert profiler.spans[0]["error"] == "ValueError"
+
+
+def test_bind_keeps_parent_path_in_worker_thread(tmp_path):
+    """线程池中的 span 通过 bind 挂到提交时的父 span 之下"""
+    profiler = Profiler()
+
+    def work():
+        with profiler.span("llm"):
+            pass
+
+    with profiler.span("reports"):
+        worker = threading.Thread(target=profiler.bind(work))
+        worker.start()
+        worker.join()
+
+    assert "reports/llm" in profiler.summary()
+
+    out = tmp_path / "profile.json"
+    profiler.write_json(str(out))
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert report["stages"]["reports/llm"]["count"] == 1
+    assert report["total_ms"] >= report["stages"]["reports"]["total_ms"]
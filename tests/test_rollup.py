@@ -0,0 +1,92 @@
+# tests/test_rollup.py - 按天物化汇总测试
+import pytest
+from src.config import Config
+from src.rollup import ALL_CATEGORIES, DayRollup, build_day_rollups
+from src.store import LocalStore
+from src.summarizer import TaskSummarizer
+from tests.test_summarizer import make_task
+
+
+def make_week():
+    tasks = []
+    for day in range(1, 8):
+        tasks.append(make_task(f"{day}a", "写代码", f"2025-06-0{day}T13:00:00+00:00",
+                               f"2025-06-0{day}T15:00:00+00:00", "Work", "MIT", xp=10, tomatoes=4, minutes=120))
+        tasks.append(make_task(f"{day}b", "刷视频", f"2025-06-0{day}T14:00:00+00:00",
+                               f"2025-06-0{day}T16:00:00+00:00", "Entertainment", xp=1, minutes=60))
+        tasks.append(make_task(f"{day}c", "睡觉", f"2025-06-0{day}T04:00:00+00:00",
+                               f"2025-06-0{day}T11:00:00+00:00", "Life"))
+    for task in tasks:
+        task["last_edited_time"] = "2025-06-08T00:00:00.000Z"
+    return tasks
+
+
+@pytest.fixture
+def config():
+    return Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+
+
+def test_day_rollups_per_category(config):
+    summarizer = TaskSummarizer(config=config)
+    rows = build_day_rollups(None, summarizer.parse_tasks(make_week()[:3]))
+
+    total = rows[0]
+    assert total.category == ALL_CATEGORIES
+    assert (total.count, total.xp, total.tomatoes, total.mit_count) == (3, 11, 4, 1)
+    # 工作与娱乐重叠 1 小时，合并后 3 小时；睡眠单独统计
+    assert total.work_hours == 3
+    assert total.sleep_hours == 7
+    assert total.entertainment_hours == 2
+    assert [row.category for row in rows[1:]] == ["Work", "Entertainment", "Life"]
+    assert rows[1].work_hours == 2
+
+
+def test_rollup_round_trip():
+    row = build_day_rollups(None, [])[0]
+    assert DayRollup.from_dict(row.to_dict()) == row
+
+
+def test_weekly_stats_from_rollups(config):
+    tasks = make_week()
+    stats, details = TaskSummarizer(config=config).get_detailed_stats(tasks)
+
+    assert stats["total"] == 21
+    assert stats["xp"] == 77
+    assert stats["cats"] == {"Work": 7, "Entertainment": 7, "Life": 7}
+    assert stats["mit_count"] == 7
+    assert stats["work_hours"] == 21.0
+    assert len(details) == 21
+
+
+def test_only_changed_days_are_rebuilt(config, tmp_path, monkeypatch):
+    """任务没有变化的日期复用已物化的汇总，只重建被编辑的那一天"""
+    import src.summarizer as summarizer_module
+
+    built = []
+    original = summarizer_module.build_day_rollups
+    monkeypatch.setattr(summarizer_module, "build_day_rollups",
+                        lambda day, *args: built.append(day) or original(day, *args))
+
+    tasks = make_week()
+    first = TaskSummarizer(config=config, store=LocalStore(str(tmp_path))).get_detailed_stats(tasks)[0]
+    assert len(built) == 7
+
+    built.clear()
+    tasks[0]["last_edited_time"] = "2025-06-09T00:00:00.000Z"
+    tasks[0]["properties"]["XP"]["formula"]["number"] = 20
+    # 新进程（新的 LocalStore 实例）同样只重建变化的一天
+    second = TaskSummarizer(config=config, store=LocalStore(str(tmp_path))).get_detailed_stats(tasks)[0]
+
+    assert len(built) == 1
+    assert second["xp"] == first["xp"] + 10
+
+
+def test_date_only_tasks_mix_with_timed_tasks(config):
+    """仅有日期的任务按本地时区处理，不再与带时区的时间比较出错"""
+    tasks = [
+        make_task("1", "全天任务", "2025-06-05"),
+        make_task("2", "写代码", "2025-06-05T13:00:00+00:00", "2025-06-05T14:00:00+00:00"),
+    ]
+    stats, _ = TaskSummarizer(config=config).get_detailed_stats(tasks)
+    assert stats["work_start"] == "00:00"
+    assert stats["work_end"] == "10:00"
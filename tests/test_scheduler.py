@@ -0,0 +1,55 @@
+# tests/test_scheduler.py - 进程内调度器测试
+import threading
+import pytest
+from datetime import datetime
+from src.scheduler import CronSchedule, Scheduler
+
+
+def test_cron_daily_next_after():
+    schedule = CronSchedule("0 7 * * *")
+    assert schedule.next_after(datetime(2025, 6, 5, 6, 59)) == datetime(2025, 6, 5, 7, 0)
+    # 正好在触发时刻时返回下一次
+    assert schedule.next_after(datetime(2025, 6, 5, 7, 0)) == datetime(2025, 6, 6, 7, 0)
+
+
+def test_cron_weekday_and_month_rollover():
+    monday = CronSchedule("0 8 * * 1")
+    assert monday.next_after(datetime(2025, 6, 5, 12, 0)) == datetime(2025, 6, 9, 8, 0)
+
+    first_of_month = CronSchedule("0 9 1 * *")
+    assert first_of_month.next_after(datetime(2025, 12, 15)) == datetime(2026, 1, 1, 9, 0)
+
+    # 周日可写作 0 或 7
+    assert CronSchedule("30 21 * * 7").next_after(datetime(2025, 6, 5)) == datetime(2025, 6, 8, 21, 30)
+
+
+def test_cron_steps_ranges_and_dom_or_dow():
+    schedule = CronSchedule("*/15 9-10 * * *")
+    assert schedule.next_after(datetime(2025, 6, 5, 9, 50)) == datetime(2025, 6, 5, 10, 0)
+    assert schedule.next_after(datetime(2025, 6, 5, 10, 45)) == datetime(2025, 6, 6, 9, 0)
+
+    # 日和周几同时受限时满足任一即可（cron 语义）
+    either = CronSchedule("0 0 13 * 5")
+    assert either.next_after(datetime(2025, 6, 1)) == datetime(2025, 6, 6, 0, 0)
+
+
+def test_cron_invalid_expression():
+    with pytest.raises(ValueError):
+        CronSchedule("0 25 * * *")
+    with pytest.raises(ValueError):
+        CronSchedule("0 7 * *")
+
+
+def test_scheduler_stops_without_running_future_jobs():
+    """停止信号后不再启动新任务"""
+    scheduler = Scheduler("America/Toronto", poll_seconds=0.05)
+    calls = []
+    scheduler.add_job("daily", "0 7 * * *", lambda: calls.append(1))
+
+    worker = threading.Thread(target=scheduler.run_forever)
+    worker.start()
+    scheduler.stop()
+    worker.join(timeout=2)
+
+    assert not worker.is_alive()
+    assert calls == []
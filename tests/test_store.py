@@ -0,0 +1,65 @@
+# tests/test_store.py - 本地分区存储格式测试
+import json
+import os
+from datetime import date
+from src.config import Config
+from src.store import LocalStore, decode_partition, encode_partition
+from src.summarizer import TaskSummarizer
+from tests.test_rollup import make_week
+from tests.test_summarizer import make_task
+
+
+def test_partition_round_trip_keeps_irregular_records():
+    tasks = make_week() + [
+        make_task("x", "写代码", "2025-06-05", priority="MIT"),
+        {"id": "y", "properties": {"任务名称": {"title": [{"plain_text": "a"}, {"plain_text": "b"}]},
+                                   "标签": {"multi_select": []}, "备注": {}, "XP": None}},
+        {},
+    ]
+    payload = {"fingerprint": "abc", "tasks": tasks, "rows": [], "note": {"a": [1, {"b": None}]}}
+    assert decode_partition(encode_partition(payload)) == payload
+
+
+def test_compact_partitions_are_smaller_and_read_by_day(tmp_path):
+    config = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    tasks = make_week() * 20
+    store = LocalStore(str(tmp_path))
+    store.save_tasks(date(2025, 6, 5), tasks)
+
+    path = os.path.join(str(tmp_path), "tasks", "2025-06", "2025-06-05.json.z")
+    plain = json.dumps({"tasks": tasks}, ensure_ascii=False, separators=(",", ":")).encode()
+    assert os.path.getsize(path) * 10 < len(plain)
+    assert store.load_tasks(date(2025, 6, 5)) == tasks and store.load_tasks(date(2025, 6, 6)) == []
+
+    # 汇总行经存储往返后统计不变
+    summarizer = TaskSummarizer(config=config, store=store)
+    expected = summarizer.get_detailed_stats(make_week(), "weekly")
+    assert TaskSummarizer(config=config, store=LocalStore(str(tmp_path))).get_detailed_stats(
+        make_week(), "weekly") == expected
+
+
+def test_legacy_json_partitions_are_read_and_replaced(tmp_path):
+    store = LocalStore(str(tmp_path))
+    legacy = os.path.join(str(tmp_path), "tasks", "2025-06", "2025-06-04.json")
+    os.makedirs(os.path.dirname(legacy))
+    with open(legacy, "w", encoding="utf-8") as f:
+        json.dump({"tasks": make_week()[:2]}, f, ensure_ascii=False)
+    with open(legacy.replace("04.json", "05.json.z"), "wb") as f:
+        f.write(b"not zlib")
+
+    assert store.partition_days("tasks") == [date(2025, 6, 4), date(2025, 6, 5)]
+    assert store.load_tasks(date(2025, 6, 4)) == make_week()[:2]
+    assert store.load_tasks(date(2025, 6, 5)) == []  # 损坏的分区视为不存在
+
+    store.save_tasks(date(2025, 6, 4), make_week()[:1])
+    assert not os.path.exists(legacy)
+    assert LocalStore(str(tmp_path)).load_tasks(date(2025, 6, 4)) == make_week()[:1]
+
+
+def test_memory_cache_is_bounded(tmp_path):
+    store = LocalStore(str(tmp_path), memory_partitions=2)
+    for day in range(1, 5):
+        store.save_rollups(date(2025, 6, day), "f", [])
+    assert list(store._memory) == [("rollups", date(2025, 6, 3)), ("rollups", date(2025, 6, 4))]
+    assert store.load_rollups(date(2025, 6, 1), "f") == []  # 被淘汰的分区重新从磁盘读取
+    assert len(store._memory) == 2 and ("rollups", date(2025, 6, 1)) in store._memory
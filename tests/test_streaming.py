@@ -0,0 +1,157 @@
+# tests/test_streaming.py - 流式聚合（逐页拉取、增量汇总、只保留前 N 个任务）测试
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+from src.checkpoint import tasks_fingerprint
+from src.config import Config
+from src.dedup import format_quiz_facts
+from src.checkpoint import RunCheckpoint
+from src.main import run_reports
+from src.store import LocalStore
+from src.streaming import StreamingAggregator
+from src.summarizer import TaskSummarizer
+from tests.test_goals import day_tasks
+from tests.test_rollup import make_week
+from tests.test_summarizer import make_task
+
+WINDOWS = {"weekly": (date(2025, 6, 2), date(2025, 6, 8)), "daily": (date(2025, 6, 5), date(2025, 6, 5)),
+           "three-days": (date(2025, 6, 4), date(2025, 6, 6))}
+
+
+def sorted_tasks():
+    """与 Notion 一样按计划日期升序：一周的任务 + 目标相关任务 + 一个跨午夜的任务 + 一个仅日期的任务"""
+    tasks = make_week() + day_tasks() + [
+        make_task("x", "熬夜写代码", "2025-06-04T03:00:00+00:00", "2025-06-04T06:00:00+00:00", "Work", xp=5),
+        make_task("y", "D333 Quiz 30题", "2025-06-06", category="Study", priority="MIT"),
+    ]
+    # 仅日期的值按 UTC 0 点排序（多伦多前一天晚上 8 点）
+    return sorted(tasks, key=lambda task: datetime.fromisoformat(
+        task["properties"]["计划日期"]["date"]["start"].replace("Z", "+00:00")
+        + ("" if "T" in task["properties"]["计划日期"]["date"]["start"] else "T00:00:00+00:00")))
+
+
+def summarizer_for(tmp_path=None):
+    config = Config(notion_token="t", notion_db_id="d", timezone="America/Toronto")
+    return TaskSummarizer(config=config, store=LocalStore(str(tmp_path)) if tmp_path else None)
+
+
+def test_streaming_matches_batch_aggregation(tmp_path):
+    summarizer = summarizer_for(tmp_path)
+    tasks = sorted_tasks()
+    batch = summarizer.get_report_stats(tasks, WINDOWS, {"three-days": 3})
+    streamed = StreamingAggregator(summarizer_for(), WINDOWS, {"three-days": 3}).feed(iter(tasks))
+
+    for period, window in WINDOWS.items():
+        assert streamed[period].stats == batch[period]
+        window_tasks = summarizer.filter_tasks_by_date(tasks, *window)
+        assert streamed[period].fingerprint == tasks_fingerprint(window_tasks)
+        assert streamed[period].count == len(window_tasks)
+    assert streamed["daily"].stats[0]["goals"][0]["value"] == 4  # 学习时长按合并后的区间
+
+    # 配置了本地存储时复用批量聚合已物化的日汇总
+    cached = StreamingAggregator(summarizer, WINDOWS, {"three-days": 3}).feed(iter(tasks))
+    assert cached["weekly"].stats == batch["weekly"]
+
+
+def test_streaming_keeps_only_top_tasks():
+    summarizer = summarizer_for()
+    tasks = sorted_tasks()
+    result = StreamingAggregator(summarizer, {"weekly": WINDOWS["weekly"]}, top_n=3).feed(iter(tasks))["weekly"]
+    stats, details = result.stats
+
+    assert stats["total"] == result.count == len(summarizer.filter_tasks_by_date(tasks, *WINDOWS["weekly"]))
+    assert len(result.tasks) == len(details) == 3 and all(detail["is_mit"] for detail in details)
+    assert stats["omitted"]["count"] == stats["total"] - 3
+    assert f"另有 {stats['total'] - 3} 项未列出" in summarizer.build_prompt(stats, details, "weekly")
+
+
+def test_run_reports_streams_pages(monkeypatch):
+    import src.main as main_module
+
+    summarizer = summarizer_for()
+    summarizer.config.streaming_aggregation = True
+    monkeypatch.setattr(main_module, "get_report_window", lambda period, *args, **kwargs: WINDOWS[period])
+    notion = MagicMock()
+    notion.config = summarizer.config
+    notion.iter_tasks.side_effect = lambda start, end: iter(sorted_tasks())
+    llm = MagicMock()
+    llm.ask_llm.return_value = "ok"
+
+    answers = run_reports(notion, summarizer, llm, ["daily", "weekly"])
+
+    assert answers == {"daily": "ok", "weekly": "ok"}
+    notion._query_tasks.assert_not_called()
+    assert notion.iter_tasks.call_args[0] == (date(2025, 6, 2), date(2025, 6, 8))
+    assert any("D333 Quiz 50题" in call[0][0] for call in llm.ask_llm.call_args_list)
+
+
+def test_late_task_merges_into_trend_day():
+    tasks = sorted_tasks()
+    late = make_task("late", "补记", "2025-06-04T15:00:00+00:00", "2025-06-04T15:30:00+00:00", "Life", xp=3)
+    aggregator = StreamingAggregator(summarizer_for(), {"three-days": WINDOWS["three-days"]}, {"three-days": 3})
+    for task in tasks:
+        aggregator.add(task)
+    aggregator.add(late)
+    result = aggregator.finish()["three-days"]
+
+    assert aggregator.late == 1
+    rows = aggregator.states[("three-days", date(2025, 6, 4))].day_rows[date(2025, 6, 4)]
+    assert [row.category for row in rows].count("*") == 1 and all(row.day == date(2025, 6, 4) for row in rows)
+    batch = summarizer_for().get_report_stats(tasks + [late], {"three-days": WINDOWS["three-days"]},
+                                              {"three-days": 3})["three-days"]
+    assert result.stats["2025-06-04"]["total"] == batch["2025-06-04"]["total"]
+    assert result.stats["2025-06-04"]["xp"] == batch["2025-06-04"]["xp"]
+
+
+def test_streamed_reports_use_full_count(monkeypatch, tmp_path, caplog):
+    import src.main as main_module
+
+    summarizer = summarizer_for()
+    summarizer.config.streaming_aggregation = True
+    summarizer.config.stream_top_tasks = 1
+    monkeypatch.setattr(main_module, "get_report_window", lambda period, *args, **kwargs: WINDOWS[period])
+    notion = MagicMock()
+    notion.config = summarizer.config
+    notion.iter_tasks.side_effect = lambda start, end: iter(sorted_tasks())
+    llm = MagicMock()
+    llm.ask_llm.return_value = "ok"
+    checkpoint = RunCheckpoint(str(tmp_path), "weekly", WINDOWS["weekly"])
+
+    with caplog.at_level("INFO"):
+        assert run_reports(notion, summarizer, llm, ["weekly"], checkpoints={"weekly": checkpoint}) == {"weekly": "ok"}
+
+    count = len(summarizer.filter_tasks_by_date(sorted_tasks(), *WINDOWS["weekly"]))
+    assert f"找到 {count} 个已完成任务" in caplog.text
+    # 只保留了前 N 个任务，不能作为 tasks 检查点供续跑复用
+    assert not checkpoint.has("tasks") and checkpoint.has("stats") and checkpoint.has("answer")
+
+
+def letters(n):
+    """互不相同、去掉数字后也不相同的标题片段"""
+    return "".join(chr(ord("a") + int(digit)) for digit in str(n))
+
+
+def quiz_window(days):
+    start = date(2025, 1, 1)
+    tasks = []
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        tasks.append(make_task(f"m{i}", f"{letters(i)}复盘", f"{day}T14:00:00+00:00", priority="MIT", xp=1))
+        tasks.append(make_task(f"q{i}", f"{letters(i)} quiz 10题", f"{day}T15:00:00+00:00"))
+    return tasks, (start, start + timedelta(days=days - 1))
+
+
+def test_streaming_state_stays_bounded():
+    """MIT 明细与 Quiz 分组只保留 top_n 组，窗口再大状态也不增长，合计仍覆盖全部任务"""
+    sizes = []
+    for days in (20, 200):
+        tasks, window = quiz_window(days)
+        aggregator = StreamingAggregator(summarizer_for(), {"weekly": window}, top_n=5)
+        stats, _ = aggregator.feed(iter(tasks))["weekly"].stats
+        state = aggregator.states[("weekly", window[0])]
+        sizes.append((len(state.quiz), len(state.mit["mit_clusters"])))
+
+        assert (stats["distinct_mit"], stats["quiz_questions"]) == (days, days * 10)
+        assert stats["quiz_omitted"]["count"] + sum(c["count"] for c in stats["quiz_clusters"]) == days
+        assert stats["mit_clusters_omitted"] == days - 5
+        assert f"其余 {stats['quiz_omitted']['count']} 次" in format_quiz_facts(stats)
+    assert sizes == [(5, 5), (5, 5)]
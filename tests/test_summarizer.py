@@ -0,0 +1,76 @@
+# tests/test_summarizer.py - 汇总器测试
+import pytest
+from datetime import date
+from src.config import Config
+from src.summarizer import TaskSummarizer
+
+
+@pytest.fixture
+def summarizer():
+    return TaskSummarizer(config=Config(
+        notion_token="test_token",
+        notion_db_id="test_db_id",
+        timezone="America/Toronto"
+    ))
+
+
+def make_task(task_id, title, start, end=None, category="Study", priority="", xp=0, tomatoes=0, minutes=0):
+    return {
+        "id": task_id,
+        "properties": {
+            "任务名称": {"title": [{"plain_text": title}]},
+            "分类": {"select": {"name": category}},
+            "优先级": {"select": {"name": priority}},
+            "计划日期": {"date": {"start": start, "end": end}},
+            "XP": {"formula": {"number": xp}},
+            "番茄数": {"formula": {"number": tomatoes}},
+            "实际用时(min)": {"formula": {"number": minutes}},
+        }
+    }
+
+
+def test_filter_tasks_by_local_date(summarizer):
+    """按本地日期切分任务（UTC 凌晨属于前一天的本地时间）"""
+    tasks = [
+        make_task("1", "早起学习", "2025-06-05T13:00:00.000+00:00"),
+        make_task("2", "深夜复盘", "2025-06-06T03:30:00.000+00:00"),  # 多伦多 6月5日 23:30
+        make_task("3", "全天任务", "2025-06-06"),
+    ]
+
+    june_5 = summarizer.filter_tasks_by_date(tasks, date(2025, 6, 5), date(2025, 6, 5))
+    june_6 = summarizer.filter_tasks_by_date(tasks, date(2025, 6, 6), date(2025, 6, 6))
+
+    assert [t["id"] for t in june_5] == ["1", "2"]
+    assert [t["id"] for t in june_6] == ["3"]
+
+
+def test_filter_tasks_skips_missing_dates(summarizer):
+    """缺少计划日期的任务不会落入任何窗口"""
+    task = make_task("1", "无日期", None)
+    task["properties"]["计划日期"] = {"date": None}
+
+    assert summarizer.filter_tasks_by_date([task], date(2025, 1, 1), date(2025, 12, 31)) == []
+
+
+def test_trend_series_moving_average(summarizer):
+    """N 天趋势逐日输出，缺失的日期按 0 计入，滑动均值按窗口内已有天数平均"""
+    tasks = [
+        make_task("1", "写代码", "2025-06-01T13:00:00+00:00", xp=10),
+        make_task("2", "写代码", "2025-06-02T13:00:00+00:00", xp=20),
+        make_task("3", "写代码", "2025-06-04T13:00:00+00:00", xp=30),
+    ]
+
+    series = summarizer.get_trend_series(tasks, date(2025, 6, 1), date(2025, 6, 5), moving_window=3)
+
+    assert list(series) == ["2025-06-01", "2025-06-02", "2025-06-03", "2025-06-04", "2025-06-05"]
+    assert [s["xp"] for s in series.values()] == [10, 20, 0, 30, 0]
+    assert [s["ma_xp"] for s in series.values()] == [10.0, 15.0, 10.0, 16.7, 10.0]
+
+
+def test_trend_prompt_averages_use_day_count(summarizer):
+    """日均值按窗口实际天数计算，而不是固定除以 3"""
+    stats = {f"2025-06-0{d}": {**summarizer._empty_trend_stats(), "actual_work_hours": 6} for d in range(1, 8)}
+    prompt = summarizer.build_trend_prompt(stats, "trend")
+
+    assert "过去7天" in prompt
+    assert "总工作时间：42小时（日均6.0小时）" in prompt
@@ -0,0 +1,88 @@
+# tests/test_taxonomy.py - 活动分类规则测试
+import json
+import pytest
+from src.config import Config
+from src.store import LocalStore
+from src.summarizer import TaskSummarizer
+from src.taxonomy import DEFAULT_TAXONOMY, ActivityClass, ActivityTaxonomy, load_taxonomy
+from tests.test_summarizer import make_task
+
+CLASSES = {
+    "classes": [
+        {"name": "sleep", "label": "睡眠", "keywords": ["睡觉", "sleep"]},
+        {"name": "entertainment", "label": "娱乐", "keywords": ["刷", "视频"], "categories": ["Entertainment"],
+         "exclude": ["sleep", "study"]},
+        {"name": "exercise", "label": "运动", "keywords": ["跑步", "gym"], "categories": ["Health"]},
+        {"name": "study", "label": "学习", "keywords": ["刷题", "阅读"]},
+    ]
+}
+
+
+@pytest.fixture
+def taxonomy_file(tmp_path):
+    path = tmp_path / "taxonomy.json"
+    path.write_text(json.dumps(CLASSES, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_default_rules():
+    assert DEFAULT_TAXONOMY.classify("午后补觉", "Life") == ("sleep",)
+    assert DEFAULT_TAXONOMY.classify("刷视频", "Life") == ("entertainment",)
+    # 睡眠任务不算娱乐
+    assert DEFAULT_TAXONOMY.classify("看剧到睡觉", "Entertainment") == ("sleep",)
+    assert DEFAULT_TAXONOMY.classify("写代码", "Work") == ()
+
+
+def test_overlapping_keywords_and_exclusions(taxonomy_file):
+    taxonomy = load_taxonomy(taxonomy_file)
+
+    # "刷题" 同时包含 "刷"，学习命中后娱乐被排除
+    assert taxonomy.classify("刷题两小时", "Work") == ("study",)
+    assert taxonomy.classify("GYM 后刷视频", "Work") == ("entertainment", "exercise")
+    assert taxonomy.classify("散步", "Health") == ("exercise",)
+
+
+def test_titles_are_classified_once():
+    taxonomy = ActivityTaxonomy([ActivityClass(name="sleep", label="睡眠", keywords=("睡觉",))])
+    first = taxonomy.classify("睡觉", "Life")
+    assert taxonomy.classify("睡觉", "Life") is first
+    assert len(taxonomy._cache) == 1
+
+
+def test_invalid_taxonomy(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps({"classes": [{"name": "a", "exclude": ["b"]}]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="未知类别"):
+        load_taxonomy(str(path))
+
+
+def test_custom_activity_hours(taxonomy_file, tmp_path):
+    summarizer = TaskSummarizer(config=Config(notion_token="t", notion_db_id="d", timezone="America/Toronto",
+                                              taxonomy_file=taxonomy_file))
+    tasks = [
+        make_task("1", "晨间跑步", "2025-06-05T06:00:00-04:00", "2025-06-05T07:00:00-04:00", "Health"),
+        make_task("2", "阅读论文", "2025-06-05T09:00:00-04:00", "2025-06-05T10:30:00-04:00", "Study"),
+        make_task("3", "刷视频", "2025-06-05T21:00:00-04:00", "2025-06-05T22:00:00-04:00", "Life"),
+    ]
+
+    stats, details = summarizer.get_detailed_stats(tasks)
+    assert stats["activity_hours"] == {"exercise": 1.0, "study": 1.5}
+    assert "活动用时：运动:1.0h, 学习:1.5h" in summarizer.build_prompt(stats, details, "daily")
+
+    trend = summarizer.get_trend_stats(tasks)
+    assert trend["entertainment_hours"] == 1.0
+    assert "• 运动时间：1.0小时" in summarizer.build_trend_prompt({"2025-06-05": trend})
+
+
+def test_rule_changes_rebuild_rollups(taxonomy_file, tmp_path):
+    """分类规则变化后，已物化的日汇总失效"""
+    tasks = [make_task("1", "跑步", "2025-06-05T06:00:00-04:00", "2025-06-05T07:00:00-04:00", "Life")]
+    tasks[0]["last_edited_time"] = "2025-06-05T12:00:00.000Z"
+    store_dir = str(tmp_path / "store")
+
+    def activity_hours(path):
+        config = Config(notion_token="t", notion_db_id="d", taxonomy_file=path)
+        return TaskSummarizer(config=config, store=LocalStore(store_dir)).get_detailed_stats(tasks)[0]["activity_hours"]
+
+    assert activity_hours(None) == {}
+    assert activity_hours(taxonomy_file) == {"exercise": 1.0}
@@ -0,0 +1,75 @@
+# tests/test_tenants.py - 多租户批量运行测试
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.tenants import load_tenants, run_batch
+from src.utils import RateLimiter
+
+
+@pytest.fixture
+def tenants_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN_ALICE", "secret-alice")
+    data = {
+        "defaults": {"deepseek_key": "ds-key", "llm_model": "deepseek-chat"},
+        "tenants": [
+            {"name": "alice", "notion_token": "env:TOKEN_ALICE", "notion_db_id": "db-a",
+             "timezone": "America/Toronto"},
+            {"name": "bob", "notion_token": "token-bob", "notion_db_id": "db-b",
+             "timezone": "Asia/Shanghai", "llm_model": "deepseek-reasoner"},
+        ]
+    }
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_load_tenants_merges_defaults_and_env(tenants_file):
+    alice, bob = load_tenants(tenants_file)
+
+    assert alice.name == "alice"
+    assert alice.config.notion_token == "secret-alice"
+    assert alice.config.llm_model == "deepseek-chat"
+    assert alice.config.llm_provider == "deepseek"
+    assert bob.config.llm_model == "deepseek-reasoner"
+    assert bob.config.timezone == "Asia/Shanghai"
+
+
+def test_load_tenants_rejects_unknown_keys(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": [
+        {"name": "x", "notion_token": "t", "notion_db_id": "d", "notion_tokne": "typo"}
+    ]}), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="notion_tokne"):
+        load_tenants(str(path))
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    # 第一次立即通过，之后每次约间隔 50ms
+    assert time.monotonic() - started >= 0.09
+
+
+def test_run_batch_reports_per_tenant_status(tenants_file, monkeypatch):
+    """单个租户失败不影响其他租户，结果逐个上报"""
+    def fake_build_clients(cfg, session=None, rate_limiter=None, llm=None):
+        assert rate_limiter is not None and llm is not None
+        return MagicMock(config=cfg), MagicMock(), llm, MagicMock()
+
+    def fake_run_reports(notion, summarizer, llm, periods, is_yesterday=False, checkpoints=None, trend_days=7):
+        if notion.config.notion_db_id == "db-b":
+            raise RuntimeError("Notion 401")
+        return {period: "ok" for period in periods}
+
+    monkeypatch.setattr("src.main.build_clients", fake_build_clients)
+    monkeypatch.setattr("src.main.run_reports", fake_run_reports)
+
+    results = run_batch(load_tenants(tenants_file), ["daily"], dry_run=True)
+
+    assert results["alice"]["status"] == "ok"
+    assert results["bob"]["status"] == "failed"
+    assert "Notion 401" in results["bob"]["error"]